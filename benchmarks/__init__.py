@@ -0,0 +1 @@
+"""Benchmarks and load tests run against local backend fakes."""
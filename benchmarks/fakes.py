@@ -0,0 +1,334 @@
+"""Local stand-ins for every patent data backend.
+
+Used by the benchmark suite and load-test harness so performance can be
+measured without network access, API keys or cloud CLIs:
+
+- FakePatentServer: HTTP server answering the USPTO ODP search endpoint and
+  the Google Patents xhr endpoint
+- install_fake_clis(): writes fake `bq` and `snow` executables and puts
+  them first on PATH
+
+Every fake has configurable latency, error rate and payload size.
+
+Usage:
+    with FakePatentServer(BackendConfig(latency=0.02, rows=50)) as server:
+        with fake_backends(server, cli_config):
+            search_by_assignee("Allegion", 50)
+"""
+import json
+import os
+import random
+import stat
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, Optional
+from unittest.mock import patch
+
+
+ASSIGNEES = [
+    "ASSA ABLOY AB",
+    "Allegion, Inc.",
+    "dormakaba Holding AG",
+    "Spectrum Brands, Inc.",
+    "Stanley Black & Decker, Inc.",
+    "August Home, Inc.",
+]
+
+TITLE_WORDS = [
+    "smart", "lock", "electronic", "access", "control", "biometric", "credential",
+    "mobile", "door", "keyless", "entry", "wireless", "deadbolt", "RFID", "NFC",
+]
+
+CPC_CODES = ["E05B47/00", "E05B47/0001", "G07C9/00", "E05B49/00", "H04L9/32", "H04W4/80"]
+
+
+@dataclass
+class BackendConfig:
+    """Behaviour of one fake backend.
+
+    Attributes:
+        latency: Seconds added to every response
+        error_rate: Probability (0-1) of an error response
+        rows: Records returned per response (capped by the request limit)
+        abstract_chars: Abstract length per record, to scale payload size
+        seed: Random seed for reproducible payloads
+    """
+
+    latency: float = 0.0
+    error_rate: float = 0.0
+    rows: int = 25
+    abstract_chars: int = 200
+    seed: int = 0
+
+
+def make_patent(i: int, abstract_chars: int = 200, rng: Optional[random.Random] = None) -> dict:
+    """Build one synthetic patent in the standardized format.
+
+    Args:
+        i: Record number (makes patent numbers unique)
+        abstract_chars: Abstract length
+        rng: Random generator (default: seeded by i)
+
+    Returns:
+        Patent dictionary
+    """
+    rng = rng or random.Random(i)
+    title = " ".join(rng.choice(TITLE_WORDS) for _ in range(6)).capitalize()
+    abstract = (" ".join(rng.choice(TITLE_WORDS) for _ in range(abstract_chars // 6)))[:abstract_chars]
+    year = 2010 + i % 16
+    return {
+        "patent_number": f"US{20100000000 + i}A1",
+        "title": title,
+        "abstract": abstract,
+        "assignee": ASSIGNEES[i % len(ASSIGNEES)],
+        "inventors": [f"Inventor {i % 97}", f"Inventor {i % 89}"],
+        "filing_date": f"{year}-{1 + i % 12:02d}-{1 + i % 28:02d}",
+        "grant_date": f"{year + 2}-{1 + i % 12:02d}-{1 + i % 28:02d}" if i % 3 else None,
+        "cpc_codes": rng.sample(CPC_CODES, 2),
+    }
+
+
+def make_patents(count: int, abstract_chars: int = 200, seed: int = 0) -> list[dict]:
+    """Build a reproducible synthetic patent dataset."""
+    rng = random.Random(seed)
+    return [make_patent(i, abstract_chars, rng) for i in range(count)]
+
+
+def _uspto_payload(patents: list[dict], total: int) -> dict:
+    """Shape patents like a USPTO ODP search response."""
+    return {
+        "count": total,
+        "patentFileWrapperDataBag": [
+            {
+                "applicationMetaData": {
+                    "earliestPublicationNumber": p["patent_number"],
+                    "inventionTitle": p["title"],
+                    "applicantBag": [{"applicantNameText": p["assignee"]}],
+                    "inventorBag": [{"inventorNameText": name} for name in p["inventors"]],
+                    "filingDate": f"{p['filing_date']}T00:00:00",
+                    "cpcClassificationBag": p["cpc_codes"],
+                    "applicationStatusCode": 30,
+                }
+            }
+            for p in patents
+        ],
+    }
+
+
+def _google_payload(patents: list[dict]) -> dict:
+    """Shape patents like a Google Patents xhr response."""
+    return {
+        "results": {
+            "cluster": [{
+                "result": [
+                    {"patent": {
+                        "publication_number": p["patent_number"],
+                        "title": p["title"],
+                        "snippet": p["abstract"],
+                        "assignee": p["assignee"],
+                        "inventor": p["inventors"][0],
+                        "filing_date": p["filing_date"],
+                        "grant_date": p["grant_date"],
+                    }}
+                    for p in patents
+                ]
+            }]
+        }
+    }
+
+
+class FakePatentServer:
+    """Threaded local HTTP server imitating the USPTO ODP and Google Patents APIs.
+
+    Usage:
+        with FakePatentServer(BackendConfig(latency=0.01)) as server:
+            server.uspto_url, server.google_url
+    """
+
+    def __init__(
+        self,
+        uspto: Optional[BackendConfig] = None,
+        google: Optional[BackendConfig] = None
+    ):
+        """Configure the fake endpoints.
+
+        Args:
+            uspto: Behaviour of the USPTO ODP endpoint
+            google: Behaviour of the Google Patents endpoint
+        """
+        self.uspto = uspto or BackendConfig()
+        self.google = google or BackendConfig()
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.uspto.seed)
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def uspto_url(self) -> str:
+        return f"{self.base_url}/api/v1/patent/applications/search"
+
+    @property
+    def google_url(self) -> str:
+        return f"{self.base_url}/xhr/query"
+
+    def _respond(self, path: str, query: dict) -> tuple[int, bytes]:
+        """Build the status and body for one request."""
+        with self._lock:
+            self.requests += 1
+            roll = self._rng.random()
+
+        if path.startswith("/api/v1/patent/applications/search"):
+            config = self.uspto
+            limit = int(query.get("rows", ["25"])[0])
+            offset = int(query.get("start", ["0"])[0])
+        elif path.startswith("/xhr/query"):
+            config = self.google
+            limit = int(query.get("num", ["25"])[0])
+            offset = 0
+        else:
+            return 404, b"{}"
+
+        if config.latency:
+            time.sleep(config.latency)
+        if roll < config.error_rate:
+            return 503, b'{"error": "fake backend error"}'
+
+        count = max(0, min(limit, config.rows - offset))
+        patents = [make_patent(offset + i, config.abstract_chars) for i in range(count)]
+        if config is self.uspto:
+            payload = _uspto_payload(patents, config.rows)
+        else:
+            payload = _google_payload(patents)
+        return 200, json.dumps(payload).encode()
+
+    def start(self) -> "FakePatentServer":
+        """Start serving on an ephemeral localhost port."""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urllib.parse.urlparse(self.path)
+                status, body = fake._respond(parsed.path, urllib.parse.parse_qs(parsed.query))
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakePatentServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+_FAKE_CLI = '''#!{python}
+"""Fake {name} CLI for benchmarks."""
+import json, os, random, sys, time
+sys.path.insert(0, {root!r})
+from benchmarks.fakes import make_patent
+
+config = json.loads(os.environ.get("FAKE_{upper}_CONFIG", "{{}}"))
+time.sleep(config.get("latency", 0))
+if random.random() < config.get("error_rate", 0):
+    sys.stderr.write("fake {name} error\\n")
+    sys.exit(1)
+if "{name}" == "bq":
+    rows = []
+    for i in range(config.get("rows", 25)):
+        p = make_patent(i, config.get("abstract_chars", 200))
+        rows.append({{
+            "publication_number": p["patent_number"], "title": p["title"],
+            "abstract": p["abstract"], "assignee": p["assignee"],
+            "inventors": ", ".join(p["inventors"]), "filing_date": p["filing_date"],
+            "grant_date": p["grant_date"], "cpc_codes": ", ".join(p["cpc_codes"]),
+        }})
+    print(json.dumps(rows))
+else:
+    print("+--------+\\n| status |\\n+--------+\\n| ok     |\\n+--------+")
+'''
+
+
+def install_fake_clis(directory: str) -> str:
+    """Write fake `bq` and `snow` executables into a directory.
+
+    Their behaviour is read from FAKE_BQ_CONFIG / FAKE_SNOW_CONFIG
+    (JSON-encoded BackendConfig fields) at each invocation.
+
+    Args:
+        directory: Directory to write the executables to
+
+    Returns:
+        The directory (prepend it to PATH)
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for name in ("bq", "snow"):
+        path = os.path.join(directory, name)
+        with open(path, "w") as f:
+            f.write(_FAKE_CLI.format(python=sys.executable, name=name, upper=name.upper(), root=root))
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return directory
+
+
+@contextmanager
+def fake_backends(
+    server: FakePatentServer,
+    bq: Optional[BackendConfig] = None,
+    snow: Optional[BackendConfig] = None
+) -> Iterator[None]:
+    """Point the tools package at local fakes for the duration of the block.
+
+    Patches the USPTO/Google endpoint URLs to the fake server, sets a dummy
+    USPTO API key, installs fake `bq`/`snow` on PATH and keeps trend rollup,
+    similarity index and known-patents writes in memory.
+
+    Args:
+        server: Running FakePatentServer
+        bq: Behaviour of the fake bq CLI
+        snow: Behaviour of the fake snow CLI
+    """
+    from tools import known_patents, patent_search, similarity, trend_rollup
+
+    with tempfile.TemporaryDirectory(prefix="fake-clis-") as bin_dir:
+        install_fake_clis(bin_dir)
+        env = {
+            "PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+            "USPTO_API_KEY": "fake-benchmark-key",
+            "FAKE_BQ_CONFIG": json.dumps(asdict(bq or BackendConfig())),
+            "FAKE_SNOW_CONFIG": json.dumps(asdict(snow or BackendConfig())),
+        }
+        with patch.dict(os.environ, env), \
+                patch.object(patent_search, "USPTO_ODP_API", server.uspto_url), \
+                patch.object(patent_search, "GOOGLE_PATENTS_API", server.google_url), \
+                patch.object(trend_rollup, "_local_rollup", trend_rollup.TrendRollup(":memory:")), \
+                patch.object(similarity, "_similarity_index", similarity.SimilarityIndex(None)), \
+                patch.object(known_patents, "_known_patents", known_patents.KnownPatents(None)):
+            yield
@@ -0,0 +1,198 @@
+"""Load-test harness replaying analyst query mixes against the search stack.
+
+Query mixes come from recorded analysis sessions (the API calls logged in
+analysis/*/02_api_results.md) or are synthesized from COMPETITORS and
+TECHNOLOGIES. The harness issues them open-loop at a target QPS through the
+public tools API (search_by_assignee, search_by_title, search_by_cpc), backed
+by the local fakes in benchmarks.fakes, and reports throughput, latency
+percentiles, error rate and fallback rate.
+
+    python -m benchmarks.load_test --qps 20 --duration 30 --concurrency 16
+    python -m benchmarks.load_test --sessions analysis --uspto-error-rate 0.2
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from benchmarks.fakes import BackendConfig, FakePatentServer, fake_backends
+from benchmarks.run_benchmarks import _percentile
+
+
+_CALL_RE = re.compile(
+    r"\*\*Endpoint:\*\*\s*`?(?P<endpoint>[^\n`]*)`?.*?\*\*Parameters:\*\*\s*```json\s*(?P<params>\{.*?\})\s*```",
+    re.DOTALL,
+)
+
+
+def queries_from_sessions(base_dir: str = "analysis") -> list[tuple]:
+    """Extract a query mix from recorded analysis sessions.
+
+    Args:
+        base_dir: Base directory holding analysis session folders
+
+    Returns:
+        List of (query_type, query, limit) tuples; query_type is
+        "assignee", "title" or "cpc"
+    """
+    queries = []
+    for path in sorted(glob.glob(os.path.join(base_dir, "*", "02_api_results.md"))):
+        with open(path) as f:
+            text = f.read()
+        for match in _CALL_RE.finditer(text):
+            endpoint = match.group("endpoint").lower()
+            try:
+                params = json.loads(match.group("params"))
+            except json.JSONDecodeError:
+                continue
+            limit = int(params.get("limit") or params.get("rows") or 50)
+            if "cpc_code" in params:
+                queries.append(("cpc", params["cpc_code"], limit))
+            elif "assignee" in endpoint and (params.get("q") or params.get("query")):
+                queries.append(("assignee", params.get("q") or params.get("query"), limit))
+            elif params.get("q") or params.get("query"):
+                queries.append(("title", params.get("q") or params.get("query"), limit))
+    return queries
+
+
+def synthetic_queries(limit: int = 50) -> list[tuple]:
+    """Build a query mix from COMPETITORS, TECHNOLOGIES and lock CPC codes."""
+    from tools import COMPETITORS, TECHNOLOGIES
+
+    queries = [("assignee", company, limit) for company in COMPETITORS]
+    queries += [("title", f'"{tech}"', limit) for tech in TECHNOLOGIES]
+    queries += [("cpc", code, limit) for code in ("E05B47", "E05B49", "G07C9")]
+    return queries
+
+
+def _execute(query: tuple) -> list[dict]:
+    """Run one query through the public tools API."""
+    from tools import search_by_assignee, search_by_cpc, search_by_title
+
+    query_type, text, limit = query
+    if query_type == "assignee":
+        return search_by_assignee(text, limit)
+    if query_type == "cpc":
+        return search_by_cpc(text, limit)
+    return search_by_title(text, limit)
+
+
+def run_load(
+    queries: list[tuple],
+    qps: float,
+    duration: float,
+    concurrency: int = 16,
+    seed: int = 0
+) -> dict:
+    """Issue queries open-loop at a target rate and measure the outcome.
+
+    Requests are scheduled on a fixed clock (not waiting for earlier ones to
+    finish), so queueing delay under overload shows up in the latencies.
+
+    Args:
+        queries: Query mix to sample from
+        qps: Target requests per second
+        duration: Seconds to generate load for
+        concurrency: Maximum requests in flight
+        seed: Random seed for query sampling
+
+    Returns:
+        Summary dict with throughput, latency percentiles, error and fallback rates
+    """
+    from tools import get_registry
+
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    latencies: list[float] = []
+    errors = 0
+
+    before = get_registry().summary()
+
+    def issue(query: tuple, scheduled: float) -> None:
+        nonlocal errors
+        failed = False
+        try:
+            failed = not _execute(query)
+        except Exception:
+            failed = True
+        latency = time.perf_counter() - scheduled
+        with lock:
+            latencies.append(latency)
+            errors += failed
+
+    total = int(qps * duration)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i in range(total):
+            scheduled = start + i / qps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(issue, rng.choice(queries), scheduled)
+    elapsed = time.perf_counter() - start
+
+    after = get_registry().summary()
+    source_calls = {
+        source: stats["calls"] - before.get(source, {}).get("calls", 0)
+        for source, stats in after.items()
+    }
+    fallbacks = sum(
+        stats["fallbacks"] - before.get(source, {}).get("fallbacks", 0)
+        for source, stats in after.items()
+    )
+
+    completed = len(latencies)
+    return {
+        "target_qps": qps,
+        "requests": completed,
+        "throughput_qps": round(completed / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2) if latencies else 0.0,
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 2) if latencies else 0.0,
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2) if latencies else 0.0,
+        "error_rate": round(errors / completed, 4) if completed else 0.0,
+        "fallback_rate": round(fallbacks / completed, 4) if completed else 0.0,
+        "source_calls": source_calls,
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Load-test the search stack against local fakes")
+    parser.add_argument("--qps", type=float, default=10.0)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--sessions", help="Analysis base dir to take the query mix from")
+    parser.add_argument("--latency", type=float, default=0.02, help="Fake backend latency (s)")
+    parser.add_argument("--uspto-error-rate", type=float, default=0.0)
+    parser.add_argument("--google-error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="Write the JSON summary to this file")
+    args = parser.parse_args(argv)
+
+    queries = queries_from_sessions(args.sessions) if args.sessions else []
+    if not queries:
+        queries = synthetic_queries()
+
+    uspto = BackendConfig(latency=args.latency, error_rate=args.uspto_error_rate, rows=100)
+    google = BackendConfig(latency=args.latency, error_rate=args.google_error_rate, rows=100)
+    cli = BackendConfig(latency=args.latency, rows=50)
+
+    with FakePatentServer(uspto=uspto, google=google) as server:
+        with fake_backends(server, bq=cli, snow=cli):
+            summary = run_load(queries, args.qps, args.duration, args.concurrency)
+
+    summary["query_mix"] = len(queries)
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
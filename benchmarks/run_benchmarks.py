@@ -0,0 +1,306 @@
+"""Benchmark suite for the patent intelligence tools.
+
+Runs against the local fakes in benchmarks.fakes (no network, keys or cloud
+CLIs needed) and measures:
+
+- search latency: search_by_assignee via USPTO, the Google fallback path,
+  and search_by_cpc via bq
+- loader throughput: stream_load executing batches through the fake snow CLI
+- report generation: write_report_stream over a synthetic dataset
+- memory: tracemalloc peak for every benchmark
+
+Results are written as JSON (one file per run) so two runs can be compared
+for regressions:
+
+    python -m benchmarks.run_benchmarks --size medium
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Optional
+
+from benchmarks.fakes import BackendConfig, FakePatentServer, fake_backends, make_patents
+
+
+# Default directory for benchmark result files
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Dataset sizes per preset
+SIZES = {
+    "small": {"search_calls": 20, "search_rows": 25, "load_patents": 100, "report_patents": 10_000},
+    "medium": {"search_calls": 100, "search_rows": 100, "load_patents": 500, "report_patents": 100_000},
+    "large": {"search_calls": 300, "search_rows": 100, "load_patents": 2_000, "report_patents": 1_000_000},
+}
+
+# Metrics where larger is better (everything else: smaller is better)
+HIGHER_IS_BETTER = {"patents_per_sec", "calls_per_sec"}
+
+
+def _percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _measure(fn: Callable[[], dict]) -> dict:
+    """Run a benchmark body, adding wall time and tracemalloc peak."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = fn()
+    finally:
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    result["wall_seconds"] = round(elapsed, 4)
+    result["peak_memory_mb"] = round(peak / 1_000_000, 3)
+    return result
+
+
+def _latency_stats(latencies: list[float]) -> dict:
+    """Summarize per-call latencies in milliseconds."""
+    return {
+        "calls": len(latencies),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "calls_per_sec": round(len(latencies) / sum(latencies), 2) if sum(latencies) else 0.0,
+    }
+
+
+def bench_search(size: dict, latency: float) -> dict:
+    """Benchmark search_by_assignee against the fake USPTO endpoint."""
+    from tools import search_by_assignee
+
+    def run() -> dict:
+        latencies = []
+        for i in range(size["search_calls"]):
+            start = time.perf_counter()
+            search_by_assignee(f"Company {i % 5}", size["search_rows"])
+            latencies.append(time.perf_counter() - start)
+        return _latency_stats(latencies)
+
+    return _measure(run)
+
+
+def bench_search_fallback(size: dict, latency: float) -> dict:
+    """Benchmark the Google Patents fallback path (USPTO always failing)."""
+    from tools import search_by_title
+
+    def run() -> dict:
+        latencies = []
+        for i in range(max(1, size["search_calls"] // 5)):
+            start = time.perf_counter()
+            search_by_title(f"smart lock {i}", size["search_rows"])
+            latencies.append(time.perf_counter() - start)
+        return _latency_stats(latencies)
+
+    return _measure(run)
+
+
+def bench_cpc_search(size: dict, latency: float) -> dict:
+    """Benchmark search_by_cpc through the fake bq CLI."""
+    from tools import search_by_cpc
+
+    def run() -> dict:
+        latencies = []
+        for _ in range(max(1, size["search_calls"] // 10)):
+            start = time.perf_counter()
+            search_by_cpc("E05B47", size["search_rows"])
+            latencies.append(time.perf_counter() - start)
+        return _latency_stats(latencies)
+
+    return _measure(run)
+
+
+def bench_loader(size: dict, latency: float) -> dict:
+    """Benchmark stream_load end to end with execute=True."""
+    from tools import search_by_assignee, stream_load
+
+    def run() -> dict:
+        start = time.perf_counter()
+        count = stream_load(search_by_assignee, "ASSA ABLOY", "competitor",
+                            size["load_patents"], execute=True)
+        elapsed = time.perf_counter() - start
+        return {"patents": count, "patents_per_sec": round(count / elapsed, 2) if elapsed else 0.0}
+
+    return _measure(run)
+
+
+def bench_report(size: dict, latency: float) -> dict:
+    """Benchmark streaming report generation over a synthetic dataset."""
+    from tools import write_report_stream
+
+    # Cycle a small pool so patent generation doesn't dominate the timing
+    pool = make_patents(1000)
+
+    def patents(count: int):
+        for i in range(count):
+            patent = pool[i % len(pool)]
+            yield {**patent, "patent_number": f"US{i}"}
+
+    def run() -> dict:
+        count = size["report_patents"]
+        start = time.perf_counter()
+        with open(os.devnull, "w") as out:
+            write_report_stream("Benchmark", patents(count), out)
+        elapsed = time.perf_counter() - start
+        return {"patents": count, "patents_per_sec": round(count / elapsed, 2) if elapsed else 0.0}
+
+    return _measure(run)
+
+
+def bench_report_in_memory(size: dict, latency: float) -> dict:
+    """Benchmark generate_report_markdown over a materialized dataset."""
+    from tools import generate_report_markdown
+
+    patents = make_patents(min(size["report_patents"], 100_000))
+
+    def run() -> dict:
+        start = time.perf_counter()
+        generate_report_markdown("Benchmark", patents)
+        elapsed = time.perf_counter() - start
+        return {"patents": len(patents), "patents_per_sec": round(len(patents) / elapsed, 2) if elapsed else 0.0}
+
+    return _measure(run)
+
+
+def run_suite(
+    size_name: str = "small",
+    latency: float = 0.005,
+    error_rate: float = 0.0,
+    abstract_chars: int = 200
+) -> dict:
+    """Run every benchmark against fresh fakes.
+
+    Args:
+        size_name: Dataset preset ("small", "medium", "large")
+        latency: Latency of every fake backend in seconds
+        error_rate: Error rate of the USPTO fake (0-1)
+        abstract_chars: Abstract length, to scale payload sizes
+
+    Returns:
+        Result document (see write_results)
+    """
+    size = SIZES[size_name]
+    config = BackendConfig(latency=latency, error_rate=error_rate,
+                           rows=max(size["search_rows"], size["load_patents"]),
+                           abstract_chars=abstract_chars)
+    failing = BackendConfig(latency=latency, error_rate=1.0)
+    cli = BackendConfig(latency=latency, rows=size["search_rows"], abstract_chars=abstract_chars)
+
+    results = {}
+    with FakePatentServer(uspto=config, google=config) as server:
+        with fake_backends(server, bq=cli, snow=cli):
+            results["search_by_assignee"] = bench_search(size, latency)
+            results["search_by_cpc"] = bench_cpc_search(size, latency)
+            results["loader"] = bench_loader(size, latency)
+
+    with FakePatentServer(uspto=failing, google=config) as server:
+        with fake_backends(server, bq=cli, snow=cli):
+            results["search_fallback"] = bench_search_fallback(size, latency)
+
+    results["report_stream"] = bench_report(size, latency)
+    results["report_in_memory"] = bench_report_in_memory(size, latency)
+
+    return {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "version": _git_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"size": size_name, "latency": latency, "error_rate": error_rate,
+                   "abstract_chars": abstract_chars, **size},
+        "results": results,
+    }
+
+
+def _git_version() -> Optional[str]:
+    """Get the current git commit, if available."""
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def write_results(document: dict, results_dir: str = RESULTS_DIR) -> str:
+    """Write a result document to a timestamped JSON file.
+
+    Returns:
+        Path of the written file
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(results_dir, f"{stamp}_{document['config']['size']}.json")
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+    return path
+
+
+def compare_results(baseline: dict, current: dict, tolerance: float = 0.2) -> list[str]:
+    """List metrics that regressed by more than the tolerance.
+
+    Args:
+        baseline: Earlier result document
+        current: New result document
+        tolerance: Allowed relative change (0.2 = 20%)
+
+    Returns:
+        Human-readable regression descriptions (empty if none)
+    """
+    regressions = []
+    for bench, metrics in current["results"].items():
+        base_metrics = baseline.get("results", {}).get(bench, {})
+        for name, value in metrics.items():
+            base = base_metrics.get(name)
+            if not isinstance(value, (int, float)) or not isinstance(base, (int, float)) or not base:
+                continue
+            if name in ("calls", "patents"):
+                continue
+            change = (value - base) / base
+            worse = -change if name in HIGHER_IS_BETTER else change
+            if worse > tolerance:
+                regressions.append(f"{bench}.{name}: {base} -> {value} ({change:+.0%})")
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Run patent tools benchmarks against local fakes")
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--latency", type=float, default=0.005, help="Fake backend latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="USPTO fake error rate")
+    parser.add_argument("--abstract-chars", type=int, default=200, help="Payload size per record")
+    parser.add_argument("--output", default=RESULTS_DIR, help="Directory for result JSON")
+    parser.add_argument("--compare", help="Baseline result JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    document = run_suite(args.size, args.latency, args.error_rate, args.abstract_chars)
+    path = write_results(document, args.output)
+    print(json.dumps(document["results"], indent=2))
+    print(f"[Benchmark results written to {path}]")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_results(json.load(f), document, args.tolerance)
+        for line in regressions:
+            print(f"[Regression] {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
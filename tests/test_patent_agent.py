@@ -129,16 +129,68 @@ def test_get_trends_query():
     """Test trends query generation."""
     from tools import get_trends_query
 
-    # Without filter
+    # Reads from the rollup by default
     query = get_trends_query(5)
-    assert "GROUP BY assignee" in query
-    assert "YEAR(filing_date)" in query
+    assert "PATENT_TREND_ROLLUP" in query
+    assert "bucket = 'all'" in query
+    assert "year > YEAR(CURRENT_DATE()) - 5" in query  # current year + 4 before it
 
-    # With filter
+    # Known technology keyword uses its rollup bucket
     query = get_trends_query(5, "smart lock")
+    assert "bucket = 'tech:smart lock'" in query
+
+    # Free-text filter falls back to scanning PATENTS
+    query = get_trends_query(5, "deadbolt")
+    assert "ILIKE '%deadbolt%'" in query
+
+    # Full scan when the rollup is disabled
+    query = get_trends_query(5, "smart lock", use_rollup=False)
+    assert "GROUP BY assignee" in query
+    assert "YEAR(filing_date)" in query
     assert "ILIKE '%smart lock%'" in query
 
 
+def test_trend_rollup_incremental():
+    """Test local trend rollup counts and re-upsert handling."""
+    from tools import TrendRollup, build_rollup_upsert_query
+
+    rollup = TrendRollup(":memory:")
+    patent = {
+        "patent_number": "US123456",
+        "title": "Smart lock with keypad",
+        "abstract": "",
+        "assignee": "Test Corp",
+        "filing_date": "2024-03-01",
+        "cpc_codes": ["E05B  47/0001", "E05B47/00"],
+    }
+    rollup.apply(patent)
+    rollup.apply(patent)  # re-upsert must not double count
+    rollup.apply({**patent, "patent_number": "US654321"})
+
+    assert rollup.trends(5, current_year=2025) == [
+        {"assignee": "Test Corp", "year": 2024, "patent_count": 2}
+    ]
+    assert rollup.trends(5, "smart lock", current_year=2025)[0]["patent_count"] == 2
+    assert rollup.trends(5, cpc_filter="E05B47", current_year=2025)[0]["patent_count"] == 2
+    assert rollup.trends(5, current_year=2028)[0]["year"] == 2024  # 2024-2028: five calendar years
+    assert rollup.trends(5, current_year=2029) == []
+
+    # Assignee correction moves the count
+    rollup.apply({**patent, "assignee": "Other Corp"})
+    counts = {r["assignee"]: r["patent_count"] for r in rollup.trends(5, current_year=2025)}
+    assert counts == {"Test Corp": 1, "Other Corp": 1}
+
+    sql = build_rollup_upsert_query(patent)
+    assert "PATENT_TREND_ROLLUP" in sql
+    assert "('Test Corp', 2024, 'cpc:E05B47')" in sql
+
+    # Patents cached before the rollup existed are backfilled by the create script
+    from tools import get_create_rollup_tables_sql
+    create_sql = get_create_rollup_tables_sql()
+    assert "INSERT OVERWRITE INTO SNOWFLAKE_LEARNING_DB.PATENT_INTELLIGENCE.PATENT_TREND_ROLLUP" in create_sql
+    assert "NOT EXISTS" in create_sql and "('smart lock')" in create_sql
+
+
 @pytest.mark.integration
 def test_search_by_assignee_live():
     """Integration test: actual Google Patents API call."""
@@ -150,3 +202,1079 @@ def test_search_by_assignee_live():
     assert len(results) > 0
     assert results[0]["patent_number"] is not None
     assert results[0]["title"] is not None
+
+
+def test_load_journal_resume(tmp_path):
+    """Test that a journaled load resumes without refetching or recommitting."""
+    from tools import data_loader
+    from tools.load_journal import LoadJournal
+
+    patents = [
+        {"patent_number": f"US{i}", "title": "Lock", "assignee": "Test Corp",
+         "filing_date": "2024-01-01", "cpc_codes": []}
+        for i in range(25)
+    ]
+    path = str(tmp_path / "journal.jsonl")
+    search = MagicMock(side_effect=lambda q, limit, offset, strict: patents[offset:offset + limit])
+    executed = []
+
+    def fail_second_batch(sql):
+        executed.append(sql)
+        return None if len(executed) == 2 else "ok"
+
+    with patch.object(data_loader, "search_by_assignee", search), \
+            patch.object(data_loader, "_execute_snowflake_sql", side_effect=fail_second_batch), \
+            patch.object(data_loader, "get_local_rollup"), \
+            patch.object(data_loader, "get_similarity_index"), \
+            patch.object(data_loader, "get_known_patents"):
+        data_loader.load_competitor_patents("Test Corp", 25, True, LoadJournal(path))
+
+    journal = LoadJournal(path)
+    assert journal.pages_complete("competitor:Test Corp")
+    assert not journal.is_done("competitor:Test Corp")
+    assert search.call_count == 1
+
+    executed.clear()
+    with patch.object(data_loader, "search_by_assignee", search), \
+            patch.object(data_loader, "_execute_snowflake_sql", return_value="ok") as run, \
+            patch.object(data_loader, "get_local_rollup"), \
+            patch.object(data_loader, "get_similarity_index"), \
+            patch.object(data_loader, "get_known_patents"):
+        statements = data_loader.load_competitor_patents("Test Corp", 25, True, journal)
+
+    assert len(statements) == 25
+    assert search.call_count == 1  # pages replayed from the journal
+    assert run.call_count == 1  # only the failed batch is retried
+    assert journal.is_done("competitor:Test Corp")
+
+
+def test_stream_load_dedupes_and_batches():
+    """Test the streaming loader drops duplicates and writes in batches."""
+    from tools import data_loader
+
+    page = [
+        {"patent_number": f"US{i % 15}", "title": "Lock", "assignee": "Test Corp",
+         "filing_date": "2024-01-01", "cpc_codes": []}
+        for i in range(30)
+    ]
+    page.append({"patent_number": "", "title": "No number"})
+    search = MagicMock(return_value=page)
+
+    with patch.object(data_loader, "_execute_snowflake_sql", return_value="ok") as run, \
+            patch.object(data_loader, "get_local_rollup"), \
+            patch.object(data_loader, "get_similarity_index"), \
+            patch.object(data_loader, "get_known_patents"):
+        count = data_loader.stream_load(search, "Test Corp", "competitor", 100, execute=True)
+
+    assert count == 15
+    assert run.call_count == 2  # batches of 10 + 5
+    assert run.call_args_list[0].args[0].count("MERGE INTO SNOWFLAKE_LEARNING_DB.PATENT_INTELLIGENCE.PATENTS") == 10
+
+
+def test_analysis_workflow_buffered(tmp_path):
+    """Test buffered audit writes are deferred until flush/finalize."""
+    import json
+    import os
+    import time
+    from tools import AnalysisWorkflow
+
+    workflow = AnalysisWorkflow("Buffered test", base_dir=str(tmp_path),
+                                buffered=True, flush_interval=60)
+    workflow.log_snowflake_query("SELECT 1", [{"a": 1}])
+    workflow.log_api_call("USPTO", {"q": "lock"}, [])
+
+    api_log = os.path.join(workflow.session_dir, "02_api_results.md")
+    with open(api_log) as f:
+        assert "API Call 1" not in f.read()
+
+    workflow.finalize()
+
+    with open(api_log) as f:
+        assert "API Call 1" in f.read()
+    with open(os.path.join(workflow.session_dir, "metadata.json")) as f:
+        metadata = json.load(f)
+    assert metadata["snowflake_query_count"] == 1
+    assert metadata["status"] == "complete"
+    assert not os.path.exists(os.path.join(workflow.session_dir, "metadata.json.tmp"))
+
+    # Unbuffered log calls skip fsync; only finalize makes metadata durable
+    unbuffered = AnalysisWorkflow("Unbuffered test", base_dir=str(tmp_path), catalog=False)
+    with patch("tools.analysis_workflow.os.fsync") as fsync:
+        for i in range(5):
+            unbuffered.log_analysis("Step", {"i": i})
+        assert fsync.call_count == 0
+        unbuffered.finalize()
+    assert fsync.call_count == 1
+
+    # A failing flush is reported and the writer keeps running
+    flaky = AnalysisWorkflow("Flaky test", base_dir=str(tmp_path), catalog=False,
+                             buffered=True, flush_interval=0.01)
+    with patch.object(flaky, "_write_metadata_now", side_effect=RuntimeError("changed size")):
+        flaky.log_analysis("Step", {"i": 1})
+        time.sleep(0.1)
+    assert flaky._writer.is_alive()
+    flaky.finalize()
+    with open(os.path.join(flaky.session_dir, "metadata.json")) as f:
+        assert json.load(f)["status"] == "complete"
+
+
+def test_results_store_round_trip(tmp_path):
+    """Test full call results are stored and read back lazily."""
+    from tools import AnalysisWorkflow
+
+    results = [{"patent_number": f"US{i}", "assignee": "Test Corp"} for i in range(12)]
+    workflow = AnalysisWorkflow("Results test", base_dir=str(tmp_path))
+    workflow.log_api_call("USPTO", {"q": "lock"}, results)
+
+    assert workflow.load_api_results(1) == results
+    columns = workflow.results.load_columns("api_call", 1, ["patent_number"])
+    assert columns == {"patent_number": [f"US{i}" for i in range(12)]}
+    assert workflow.load_snowflake_results(1) == []
+
+
+def test_record_and_replay_session(tmp_path):
+    """Test a recorded session replays source responses offline."""
+    import json
+    import subprocess
+    from tools import AnalysisWorkflow, search_by_cpc
+
+    rows = [{"publication_number": "US1-B2", "title": "Electronic lock",
+             "assignee": "Test Corp", "cpc_codes": "E05B47/00"}]
+    completed = subprocess.CompletedProcess([], 0, json.dumps(rows), "")
+
+    recording = AnalysisWorkflow("Record test", base_dir=str(tmp_path / "a"), record=True)
+    with patch("tools.session_replay.subprocess.run", return_value=completed):
+        recorded = search_by_cpc("E05B47", limit=1)
+    recording.finalize()
+
+    replay = AnalysisWorkflow("Record test", base_dir=str(tmp_path / "b"),
+                              replay_from=recording.session_dir)
+    with patch("tools.session_replay.subprocess.run") as run:
+        replayed = search_by_cpc("E05B47", limit=1)
+        missing = search_by_cpc("G07C9", limit=1)  # never recorded
+    replay.finalize()
+
+    assert run.call_count == 0
+    assert replayed == recorded
+    assert replayed[0]["patent_number"] == "US1-B2"
+    assert missing == []
+
+
+def test_session_recorders_are_scoped_per_workflow(tmp_path):
+    """Test concurrent workflows in different threads don't share a recorder."""
+    import threading
+    from tools.session_replay import SessionRecorder, get_active_recorder
+
+    ready = threading.Barrier(2)
+    seen = {}
+
+    def workflow(name):
+        with SessionRecorder(str(tmp_path / name)) as recorder:
+            ready.wait()  # both recorders active at once
+            seen[name] = get_active_recorder() is recorder
+        seen[name + " after"] = get_active_recorder()
+
+    threads = [threading.Thread(target=workflow, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert seen == {"a": True, "b": True, "a after": None, "b after": None}
+    assert get_active_recorder() is None
+
+
+def test_session_metrics_are_scoped_per_workflow(tmp_path):
+    """Test concurrent workflows only collect their own spans and leave no listeners."""
+    import threading
+    from tools import AnalysisWorkflow, get_registry, trace
+
+    ready = threading.Barrier(2)
+    summaries = {}
+
+    def run(name):
+        workflow = AnalysisWorkflow(f"Metrics {name}", base_dir=str(tmp_path), catalog=False)
+        ready.wait()  # both sessions active at once
+        with trace(name):
+            pass
+        ready.wait()
+        workflow.finalize()
+        summaries[name] = workflow.metadata["source_metrics"]
+
+    threads = [threading.Thread(target=run, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert {name: list(summary) for name, summary in summaries.items()} == {"a": ["a"], "b": ["b"]}
+    assert get_registry()._listeners == []
+
+
+def test_write_report_stream_from_generator(tmp_path):
+    """Test single-pass streaming report over a generator."""
+    from tools import write_report_stream
+
+    def patents():
+        for i in range(1000):
+            yield {
+                "patent_number": f"US{i}",
+                "title": f"Patent {i}",
+                "assignee": "Big Corp" if i % 2 else f"Small {i % 7}",
+                "filing_date": f"20{10 + i % 15}-01-01",
+            }
+
+    path = tmp_path / "report.md"
+    with open(path, "w") as f:
+        total = write_report_stream("Stream", patents(), f, max_listed=3,
+                                    max_tracked_assignees=4)
+
+    report = path.read_text()
+    assert total == 1000
+    assert "Total patents found: 1000" in report
+    assert "Date range: 2010-01-01 to 2024-01-01" in report
+    assert "Top assignees: Big Corp (500)" in report
+    assert report.count("### US") == 3
+
+
+def test_session_catalog_finds_equivalent(tmp_path):
+    """Test finalized sessions are indexed and found for equivalent requests."""
+    from tools import AnalysisWorkflow
+
+    base_dir = str(tmp_path)
+    assert AnalysisWorkflow.find_existing("Smart lock patents", base_dir=base_dir) is None
+
+    workflow = AnalysisWorkflow("Smart lock patents!", base_dir=base_dir,
+                                params={"company": "Allegion"})
+    workflow.log_api_call("USPTO", {"q": "lock"}, [{"patent_number": "US1"}])
+    assert AnalysisWorkflow.find_existing(
+        "smart  lock patents", {"company": "Allegion"}, base_dir) is None  # in progress
+    workflow.finalize()
+
+    found = AnalysisWorkflow.find_existing("smart  lock patents", {"company": "Allegion"}, base_dir)
+    assert found["session_dir"] == workflow.session_dir
+    assert found["api_call_count"] == 1
+    assert AnalysisWorkflow.find_existing("smart lock patents", {"company": "Dormakaba"},
+                                          base_dir) is None
+
+    # Workflows and lookups share one catalog connection per base directory
+    from tools import get_session_catalog
+    assert workflow.catalog is get_session_catalog(base_dir) is get_session_catalog(str(tmp_path / "."))
+
+
+def test_generate_all_reports_process_pool(tmp_path):
+    """Test batch reports are generated in parallel from a shared dataset."""
+    from tools import generate_all_reports
+
+    patents = [
+        {"patent_number": "US1", "title": "Smart lock", "assignee": "ASSA ABLOY AB",
+         "filing_date": "2024-01-01"},
+        {"patent_number": "US2", "title": "Smart lock hub", "assignee": "ASSA ABLOY AB",
+         "filing_date": "2024-02-01"},
+        {"patent_number": "US3", "title": "Keyless entry", "assignee": "Allegion, Inc.",
+         "filing_date": "2023-05-01"},
+    ]
+    paths = generate_all_reports(
+        patents, str(tmp_path), companies=["ASSA ABLOY", "Allegion"],
+        technologies=["smart lock"], workers=2,
+    )
+
+    assert set(paths) == {"competitor:ASSA ABLOY", "competitor:Allegion", "technology:smart lock"}
+    with open(paths["competitor:Allegion"]) as f:
+        report = f.read()
+    assert "Total patents found: 1" in report
+    assert "Benchmark: 1 patents vs 2 for ASSA ABLOY (0.50x)" in report
+    with open(paths["technology:smart lock"]) as f:
+        assert "Total patents found: 2" in f.read()
+
+
+def test_source_metrics_recorded(tmp_path):
+    """Test source spans are aggregated, exported and written to session metadata."""
+    import json
+    import os
+    from tools import AnalysisWorkflow, MetricsRegistry, search_by_title
+    from tools.metrics import Span
+
+    workflow = AnalysisWorkflow("Metrics test", base_dir=str(tmp_path))
+    with patch("tools.patent_search._get_api_key", return_value=None), \
+            patch("tools.session_replay.urllib.request.urlopen", side_effect=OSError("offline")):
+        search_by_title("smart lock", 1)
+    workflow.finalize()
+
+    with open(os.path.join(workflow.session_dir, "metadata.json")) as f:
+        metrics = json.load(f)["source_metrics"]
+    assert metrics["google_patents"]["errors"] == 1
+    assert metrics["google_patents"]["fallbacks"] == 1
+    assert metrics["sample_data"]["rows"] == 1
+
+    registry = MetricsRegistry()
+    registry.record(Span(source="uspto", latency=0.2, rows=5, bytes=100))
+    assert registry.summary()["uspto"]["latency_p50"] == 0.25
+    text = registry.export_prometheus()
+    assert 'patent_source_latency_seconds_bucket{source="uspto",le="0.25"} 1' in text
+    assert 'patent_source_rows_total{source="uspto"} 5' in text
+
+
+def test_benchmark_fakes_serve_search():
+    """Test the benchmark fakes answer searches through the public API."""
+    from benchmarks.fakes import BackendConfig, FakePatentServer, fake_backends
+    from benchmarks.run_benchmarks import compare_results
+    from tools import search_by_assignee
+
+    with FakePatentServer(uspto=BackendConfig(rows=30)) as server:
+        with fake_backends(server):
+            results = search_by_assignee("Allegion", 10)
+    assert len(results) == 10
+    assert results[0]["patent_number"].startswith("US")
+
+    baseline = {"results": {"loader": {"patents_per_sec": 100.0, "wall_seconds": 1.0}}}
+    current = {"results": {"loader": {"patents_per_sec": 50.0, "wall_seconds": 1.1}}}
+    assert compare_results(baseline, current) == ["loader.patents_per_sec: 100.0 -> 50.0 (-50%)"]
+
+
+def test_load_test_harness(tmp_path):
+    """Test query mixes are parsed from sessions and replayed at a target rate."""
+    from benchmarks.fakes import BackendConfig, FakePatentServer, fake_backends
+    from benchmarks.load_test import queries_from_sessions, run_load
+
+    session = tmp_path / "2026-01-28_test"
+    session.mkdir()
+    (session / "02_api_results.md").write_text(
+        "## API Call 1\n\n**Endpoint:** `USPTO (assignee: Allegion)`\n\n"
+        "**Parameters:**\n```json\n{\n  \"q\": \"Allegion\",\n  \"rows\": 5\n}\n```\n"
+    )
+    queries = queries_from_sessions(str(tmp_path))
+    assert queries == [("assignee", "Allegion", 5)]
+
+    with FakePatentServer(uspto=BackendConfig(error_rate=1.0), google=BackendConfig()) as server:
+        with fake_backends(server):
+            summary = run_load(queries, qps=50, duration=0.2, concurrency=4)
+    assert summary["requests"] == 10
+    assert summary["error_rate"] == 0.0
+    assert summary["fallback_rate"] == 1.0
+
+
+def test_session_profiling(tmp_path, monkeypatch):
+    """Test opt-in profiles are written into the session folder."""
+    import os
+    from tools import AnalysisWorkflow
+
+    monkeypatch.delenv("PATENT_AGENT_PROFILE", raising=False)
+    plain = AnalysisWorkflow("No profile", base_dir=str(tmp_path))
+    plain.finalize()
+    assert "profiles" not in plain.metadata
+
+    monkeypatch.setenv("PATENT_AGENT_PROFILE", "tracemalloc,sampling")
+    workflow = AnalysisWorkflow("Profiled", base_dir=str(tmp_path))
+    workflow.log_analysis("Work", {"n": sum(range(100000))})
+    workflow.finalize()
+
+    assert workflow.metadata["profiles"] == [
+        "wall_samples.folded", "wall_samples.txt", "tracemalloc_top.txt"
+    ]
+    for name in workflow.metadata["profiles"]:
+        assert os.path.exists(os.path.join(workflow.session_dir, name))
+
+    # Context-managed sessions always stop their profilers
+    import tracemalloc
+    with pytest.raises(RuntimeError):
+        with AnalysisWorkflow("Failing", base_dir=str(tmp_path)) as failing:
+            raise RuntimeError("boom")
+    assert failing.metadata["status"] == "error" and failing.profiler is None
+    assert not tracemalloc.is_tracing()
+
+    # create_session_dir never leaves profilers running
+    from tools import create_session_dir
+    monkeypatch.chdir(tmp_path)
+    assert os.path.isdir(create_session_dir("Quick session"))
+    assert not tracemalloc.is_tracing()
+
+
+def test_agent_daemon(tmp_path):
+    """Test the daemon serves tool calls over its socket and caches results."""
+    from tools.agent_client import call
+    from tools.agent_daemon import AgentDaemon
+
+    sock = str(tmp_path / "agent.sock")
+    daemon = AgentDaemon(sock).start()
+    try:
+        with patch("tools.patent_search._search_uspto_odp", return_value=[{"patent_number": "US1"}]) as search:
+            first = call("search_by_assignee", ["Allegion", 5], path=sock)
+            second = call("search_by_assignee", ["Allegion", 5], path=sock)
+
+        assert first["ok"] and first["result"] == [{"patent_number": "US1"}]
+        assert first["cached"] is False and second["cached"] is True
+        assert search.call_count == 1
+        assert call("stats", path=sock)["result"]["cache_hits"] == 1
+        assert call("no_such_op", path=sock)["ok"] is False
+    finally:
+        daemon.stop()
+
+
+def test_lazy_package_import():
+    """Test `import tools` stays cheap and loads submodules only on demand."""
+    import json
+    import os
+    import subprocess
+    import sys
+
+    # Generous budget for a cold interpreter; the eager package took ~10x longer
+    import_budget_seconds = 0.25
+    script = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import tools\n"
+        "elapsed = time.perf_counter() - start\n"
+        "bare = sorted(m for m in sys.modules if m.startswith('tools.'))\n"
+        "from tools import get_trends_query\n"
+        "single = sorted(m for m in sys.modules if m.startswith('tools.'))\n"
+        "print(json.dumps({'elapsed': elapsed, 'bare': bare, 'single': single,\n"
+        "                  'all': all(hasattr(tools, name) for name in tools.__all__)}))\n"
+    )
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True,
+                            text=True, cwd=repo_root, check=True)
+    report = json.loads(result.stdout)
+
+    assert report["bare"] == []
+    assert "tools.snowflake_queries" in report["single"]
+    assert "tools.analysis_workflow" not in report["single"]
+    assert "tools.data_loader" not in report["single"]
+    assert report["all"]
+    assert report["elapsed"] < import_budget_seconds
+
+
+def test_competitive_benchmark():
+    """Test per-competitor metrics and ratios to the benchmark company."""
+    pytest.importorskip("numpy")
+    from tools import competitive_benchmark
+
+    def patent(assignee, year, cpc):
+        return {"assignee": assignee, "filing_date": f"{year}-05-01", "cpc_codes": cpc}
+
+    patents = (
+        [patent("ASSA ABLOY AB", 2020, ["E05B47/00"])] * 2
+        + [patent("ASSA ABLOY AB", 2022, ["E05B47/00", "G07C9/00"])] * 8
+        + [patent("Allegion, Inc.", 2020, "G07C 9/00")] * 1
+        + [patent("Allegion, Inc.", 2022, "G07C 9/00, E05B47/0001")] * 4
+        + [patent("Unrelated Corp", 2021, ["E05B47/00"])] * 5
+    )
+
+    result = competitive_benchmark(iter(patents), companies=["ASSA ABLOY", "Allegion"])
+
+    assert result["years"] == [2020, 2021, 2022]
+    assert result["filings_by_year"]["ASSA ABLOY"] == [2, 0, 8]
+    assert result["total_filings"] == {"ASSA ABLOY": 10, "Allegion": 5}
+    assert result["cagr"]["ASSA ABLOY"] == 1.0  # 2 -> 8 over two years
+    assert result["cagr"]["Allegion"] == 1.0
+    assert result["cpc_share"]["ASSA ABLOY"] == {"E05B47": 1.0, "G07C9": 0.8}
+    assert result["cpc_share"]["Allegion"] == {"G07C9": 1.0, "E05B47": 0.8}
+
+    allegion = result["vs_benchmark"]["Allegion"]
+    assert allegion["filings_ratio"] == 0.5
+    assert allegion["filings_by_year_ratio"] == [0.5, None, 0.5]
+    assert allegion["cagr_delta"] == 0.0
+    assert allegion["cpc_share_ratio"]["G07C9"] == 1.25
+
+
+def test_similarity_index(tmp_path):
+    """Test near-duplicate clustering, related-patent queries and persistence."""
+    from tools import SimilarityIndex, generate_report_markdown
+
+    abstract = ("A smart lock receives a credential from a mobile device over a "
+                "short range wireless link and actuates a motorized deadbolt when "
+                "the credential is verified by the lock controller")
+    patents = [
+        {"patent_number": "US1", "title": "Smart lock with mobile credential", "abstract": abstract},
+        {"patent_number": "US1-C1", "title": "Smart lock with mobile credential",
+         "abstract": abstract + " in a continuation"},
+        {"patent_number": "US2", "title": "Biometric fingerprint reader for door access",
+         "abstract": "A fingerprint sensor on a door handle authenticates users before unlocking"},
+        {"patent_number": "US3", "title": "Hydraulic pump seal",
+         "abstract": "A seal assembly for a hydraulic pump shaft reduces leakage"},
+    ]
+    path = str(tmp_path / "similarity.db")
+
+    index = SimilarityIndex(path)
+    assert index.add_many(patents) == [None, "US1", None, None]
+    assert index.clusters() == [["US1", "US1-C1"]]
+    assert [n for n, _ in index.near_duplicates("US1")] == ["US1-C1"]
+    assert index.related(text="fingerprint door sensor", k=1)[0][0] == "US2"
+    index.close()
+
+    reopened = SimilarityIndex(path)
+    assert len(reopened) == 4
+    assert [n for n, _ in reopened.related("US1", k=2)][0] == "US1-C1"
+    assert reopened.near_duplicates("US3") == []
+    reopened.close()
+
+    report = generate_report_markdown("Locks", patents, collapse_duplicates=True)
+    assert "Total patents found: 3" in report
+    assert "Near-duplicates collapsed: 1" in report
+
+    # A repeated number without text is collapsed too
+    bare = {"patent_number": "US9", "title": "", "abstract": ""}
+    report = generate_report_markdown("Locks", patents + [bare, dict(bare)], collapse_duplicates=True)
+    assert "Total patents found: 4" in report
+    assert "Near-duplicates collapsed: 2" in report
+
+
+def test_similarity_index_shared_by_writers(tmp_path):
+    """Test that two writers on one file keep each other's patents and skip text-less ones."""
+    from tools import SimilarityIndex
+
+    abstract = ("A smart lock receives a credential from a mobile device over a "
+                "short range wireless link and actuates a motorized deadbolt")
+    path = str(tmp_path / "similarity.db")
+    first, second = SimilarityIndex(path), SimilarityIndex(path)
+
+    assert first.add_many([{"patent_number": "US1", "title": "Smart lock", "abstract": abstract}]) == [None]
+    assert second.add_many([
+        {"patent_number": "US1-C1", "title": "Smart lock", "abstract": abstract},
+        {"patent_number": "US9", "title": "", "abstract": ""},
+        {"patent_number": "US10"},
+    ]) == ["US1", None, None]
+    assert first.clusters() == [["US1", "US1-C1"]]
+    assert len(first) == len(second) == 2
+    assert "US9" not in second
+    first.close()
+    second.close()
+    assert len(SimilarityIndex(path)) == 2
+
+
+@pytest.fixture
+def bq_citation_rows():
+    """BigQuery publications rows with citation arrays (bq --format=json shape)."""
+    return [
+        {"publication_number": "US-A1", "title": "Smart lock", "assignee": "ASSA ABLOY AB",
+         "filing_date": "2020-01-01", "citations": ["US-B1", "US-B2", "US-OLD"]},
+        {"publication_number": "US-A2", "title": "Mobile key", "assignee": "ASSA ABLOY AB",
+         "filing_date": "2021-01-01", "citations": ["US-B1", "US-A1"]},
+        {"publication_number": "US-B1", "title": "Door reader", "assignee": "Allegion plc",
+         "filing_date": "2018-01-01", "citations": ["US-OLD"]},
+        {"publication_number": "US-B2", "title": "Keypad", "assignee": "Allegion plc",
+         "filing_date": "2019-01-01", "citations": []},
+    ]
+
+
+def test_citation_graph(tmp_path, bq_citation_rows):
+    """Test citation ingest through search_by_cpc and CSR graph queries."""
+    import json
+    import subprocess
+    from tools import CitationGraph, ingest_cpc_citations
+
+    completed = subprocess.CompletedProcess([], 0, json.dumps(bq_citation_rows), "")
+    with patch("tools.patent_search.run_command", return_value=completed) as run:
+        graph = ingest_cpc_citations(["E05B47", "G07C9"], limit=10)
+
+    assert "UNNEST(citation)" in run.call_args.args[1][-1]
+    assert len(graph) == 5 and graph.num_edges == 6  # second CPC batch adds no duplicate edges
+    assert graph.out_degree("US-A1") == 3
+    assert graph.in_degree("US-B1") == 2
+    assert sorted(graph.cited_by("US-OLD")) == ["US-A1", "US-B1"]
+    assert graph.k_hop("US-A2", k=1, direction="out") == {"US-B1": 1, "US-A1": 1}
+    assert graph.k_hop("US-A2", k=2, direction="out")["US-OLD"] == 2
+    assert graph.most_cited(k=1) == [("US-B1", "Allegion plc", 2)]
+    assert graph.most_cited(assignee_filter="assa abloy") == [("US-A1", "ASSA ABLOY AB", 1)]
+
+    graph.save(str(tmp_path / "graph"))
+    loaded = CitationGraph.load(str(tmp_path / "graph"))
+    assert loaded.num_edges == 6
+    assert loaded.cites("US-A1") == graph.cites("US-A1")
+    loaded.add_patent({"patent_number": "US-C1", "citations": ["US-A2"]})
+    assert loaded.in_degree("US-A2") == 1
+
+
+def test_watchlist_delta_polling():
+    """Test watch coalescing, baselines and publication-date delta polls."""
+    from tools import WatchlistMonitor
+
+    def patent(number, assignee, title, filing_date, publication_date):
+        return {"patent_number": number, "assignee": assignee, "title": title, "abstract": "",
+                "filing_date": filing_date, "publication_date": publication_date,
+                "cpc_codes": ["E05B 47/00"]}
+
+    existing = [
+        patent("US-1", "Allegion plc", "Smart lock", "2024-03-01", "2024-04-02"),
+        patent("US-2", "ASSA ABLOY AB", "Smart lock hub", "2024-02-01", "2024-03-05"),
+    ]
+    monitor = WatchlistMonitor(":memory:")
+    monitor.add_watch("allegion", competitor="Allegion", technology="smart lock")
+    monitor.add_watch("assa", competitor="ASSA ABLOY", technology="smart lock")
+    monitor.add_watch("cpc", competitor="Allegion", cpc="E05B47")
+
+    with patch("tools.patent_search.search_by_title", return_value=existing) as title, \
+         patch("tools.patent_search.search_by_cpc", return_value=existing[:1]) as cpc:
+        assert monitor.poll() == {}  # baseline
+    assert title.call_count == 1  # both smart lock watches share one query
+    assert title.call_args.kwargs["newest_first"] is True
+    assert cpc.call_args.kwargs["assignee_filter"] == "Allegion"
+    assert {w.name: w.cursor for w in monitor.watches()} == {
+        "allegion": "2024-04-02", "assa": "2024-04-02", "cpc": "2024-04-02"}
+
+    # Filed before the cursor but published after it: still new
+    fresh = [patent("US-3", "Allegion plc", "Smart lock", "2024-05-01", "2024-06-04"),
+             patent("US-4", "Allegion plc", "Smart lock", "2023-01-01", "2024-05-07")]
+    later = patent("US-5", "Allegion plc", "Smart lock", "2024-06-01", "2024-07-02")
+    with patch("tools.patent_search.search_by_title", return_value=fresh + existing), \
+         patch("tools.watchlist.WATCH_MAX_RESULTS", 2), \
+         patch("tools.patent_search.search_by_cpc",
+               return_value=fresh[::-1] + [later]) as cpc:
+        new = monitor.poll()
+    assert cpc.call_count == 1  # one capped scan, no OFFSET paging
+    assert cpc.call_args.args[1] == 3
+    assert cpc.call_args.kwargs["min_publication_date"] == "20240402"
+    assert cpc.call_args.kwargs["oldest_first"] is True
+    assert {name: [p["patent_number"] for p in found] for name, found in new.items()} == {
+        "allegion": ["US-3", "US-4"], "cpc": ["US-4", "US-3"]}
+    assert [p["patent_number"] for p in monitor.new_patents("allegion")] == ["US-3", "US-4"]
+    # Truncated CPC window: cursor stops at the last checked publication, not US-5's
+    assert {w.name: w.cursor for w in monitor.watches()}["cpc"] == "2024-06-04"
+
+    # A truncated newest-first keyword window keeps its cursor
+    with patch("tools.patent_search.search_by_title", return_value=[later, fresh[0]]), \
+         patch("tools.watchlist.WATCH_MAX_RESULTS", 2), \
+         patch("tools.watchlist.WATCH_PAGE_SIZE", 2), \
+         patch("tools.patent_search.search_by_cpc", return_value=[]):
+        new = monitor.poll()
+    assert [p["patent_number"] for p in new["allegion"]] == ["US-5"]
+    assert {w.name: w.cursor for w in monitor.watches()}["allegion"] == "2024-06-04"
+
+    # A failed search skips its group this poll instead of reading as "nothing new"
+    from tools.patent_search import SearchError
+    with patch("tools.patent_search.search_by_title", side_effect=SearchError("down")) as title, \
+         patch("tools.patent_search.search_by_cpc", return_value=[]):
+        assert monitor.poll() == {}
+    assert title.call_args.kwargs["strict"] is True
+    assert {w.name: w.cursor for w in monitor.watches()} == {
+        "allegion": "2024-06-04", "assa": "2024-06-04", "cpc": "2024-06-04"}
+    monitor.close()
+
+
+def test_single_flight_coalesces_concurrent_searches():
+    """Test identical in-flight searches share one fetch across threads and asyncio."""
+    import asyncio
+    import subprocess
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from tools.patent_search import search_by_assignee, search_by_cpc
+
+    def slow_fetch(*args, **kwargs):
+        time.sleep(0.2)
+        return [{"patent_number": "US-1", "assignee": "Allegion plc"}]
+
+    with patch("tools.patent_search._search_uspto_odp", side_effect=slow_fetch) as fetch:
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            futures = [pool.submit(search_by_assignee, "Allegion") for _ in range(4)]
+            futures.append(pool.submit(search_by_assignee, "Allegion", 50))  # same call, defaults bound
+            results = [f.result() for f in futures]
+        assert fetch.call_count == 1
+        results[0][0]["assignee"] = "changed"
+        assert all(r[0]["assignee"] == "Allegion plc" for r in results[1:])
+
+        search_by_assignee("Allegion")  # not in flight anymore: fetches again
+        assert fetch.call_count == 2
+
+    def slow_bq(*args, **kwargs):
+        time.sleep(0.2)
+        return subprocess.CompletedProcess([], 0, "[]", "")
+
+    async def gather():
+        return await asyncio.gather(*(search_by_cpc.aio("E05B47") for _ in range(3)),
+                                    search_by_cpc.aio("G07C9"))
+
+    with patch("tools.patent_search.run_command", side_effect=slow_bq) as run:
+        assert asyncio.run(gather()) == [[], [], [], []]
+    assert run.call_count == 2
+
+
+def test_single_flight_exports_survive_submodule_import():
+    """Test the coalescing decorator export isn't shadowed by its submodule."""
+    import inspect
+    import tools.patent_search  # noqa: F401 - binds tools.single_flight
+    from tools import SingleFlight, coalesce
+
+    assert inspect.isfunction(coalesce)
+    assert isinstance(SingleFlight(), SingleFlight)
+    assert coalesce(lambda x: x + 1)(1) == 2
+
+
+def test_source_router_policies_and_production_mode():
+    """Test policy-based source ordering and no sample data in production mode."""
+    import os
+    from tools import SourceRouter, search_by_assignee
+
+    router = SourceRouter()
+    assert router.policy == "static"
+    assert router.order("assignee") == ["uspto", "google_patents"]
+
+    router.set_policy("cheapest_within_sla", sla_seconds=3.0)
+    assert router.order("assignee") == ["uspto", "google_patents"]  # BigQuery never takes assignee queries
+    for _ in range(3):
+        router.observe("assignee", "uspto", 0.5, ok=False)  # failing source misses the SLA
+        router.observe("title", "google_patents", 0.1, ok=True)
+    assert router.order("assignee") == ["google_patents", "uspto"]
+    assert router.order("title") == ["google_patents", "uspto"]  # equal cost: faster first
+    assert router.explain("title")[0]["calls"] == 3  # stats are per query type
+
+    router.set_policy("fastest")
+    assert router.order("assignee") == ["google_patents", "uspto"]
+    with pytest.raises(ValueError):
+        router.set_policy("random")
+
+    with patch("tools.patent_search._search_uspto_odp", return_value=[]), \
+            patch("tools.patent_search._search_google_patents", return_value=[]):
+        assert search_by_assignee("Allegion", 1)  # demo mode falls back to sample data
+        with patch.dict(os.environ, {"PATENT_AGENT_MODE": "production"}):
+            assert search_by_assignee("Allegion", 1) == []
+
+    # An empty answer is a successful call; only a failed source counts against it
+    from tools.source_router import get_router
+    get_router().reset()
+    with patch("tools.patent_search._search_uspto_odp", return_value=[]), \
+            patch("tools.patent_search._search_google_patents", return_value=None), \
+            patch.dict(os.environ, {"PATENT_AGENT_MODE": "production"}):
+        for _ in range(3):
+            assert search_by_assignee("Nobody Inc", 1) == []
+    stats = {s["source"]: s for s in get_router().explain("assignee")}
+    assert stats["uspto"]["calls"] == 3 and stats["uspto"]["failure_rate"] == 0.0
+    assert stats["google_patents"]["failure_rate"] == 1.0
+    get_router().reset()
+
+
+@pytest.fixture
+def bulk_grant_xml():
+    """Two-document USPTO grant bulk file (ipg format), plus a non-patent document."""
+    def grant(number, assignee, cpc_group, title):
+        return f"""<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE us-patent-grant SYSTEM "us-patent-grant-v47-2022-02-17.dtd" [ ]>
+<us-patent-grant lang="EN" file="US{number}-20240102.XML">
+<us-bibliographic-data-grant>
+<publication-reference><document-id><country>US</country><doc-number>{number}</doc-number>
+<kind>B2</kind><date>20240102</date></document-id></publication-reference>
+<application-reference appl-type="utility"><document-id><country>US</country>
+<doc-number>17123456</doc-number><date>20210315</date></document-id></application-reference>
+<classifications-cpc><main-cpc><classification-cpc><section>{cpc_group[0]}</section>
+<class>{cpc_group[1:3]}</class><subclass>{cpc_group[3]}</subclass><main-group>{cpc_group[4:]}</main-group>
+<subgroup>00</subgroup></classification-cpc></main-cpc></classifications-cpc>
+<invention-title id="d2e53">{title}</invention-title>
+<us-parties><inventors><inventor sequence="001"><addressbook><last-name>Doe</last-name>
+<first-name>Jane</first-name></addressbook></inventor></inventors></us-parties>
+<assignees><assignee><addressbook><orgname>{assignee}</orgname><role>03</role></addressbook></assignee></assignees>
+</us-bibliographic-data-grant>
+<abstract id="abstract"><p id="p-0001">A lock with a <i>wireless</i> &lsquo;module&rsquo;.</p></abstract>
+<description id="description"><p>Never parsed: <unclosed> &bogus;</p></description>
+</us-patent-grant>
+"""
+    return (
+        grant("09876543", "ASSA ABLOY AB", "E05B47", "Smart lock")
+        + '<?xml version="1.0" encoding="UTF-8"?>\n<sequence-cwu><p>skip</p></sequence-cwu>\n'
+        + grant("11234567", "Allegion plc", "G07C9", "Access reader")
+    )
+
+
+def test_bulk_xml_ingest(tmp_path, bulk_grant_xml):
+    """Test streaming bulk XML parsing, filtering, zip input and loader batches."""
+    import zipfile
+    from tools.bulk_ingest import bulk_files, ingest_bulk_files, iter_bulk_patents
+
+    xml_path = tmp_path / "ipg240102.xml"
+    xml_path.write_text(bulk_grant_xml)
+    zip_path = tmp_path / "ipg240109.zip"
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("ipg240109.xml", bulk_grant_xml)
+
+    stats = {}
+    patents = list(iter_bulk_patents(str(xml_path), stats=stats))
+    assert stats == {"documents": 3, "matched": 2, "errors": 0}
+    assert patents[0] == {
+        "patent_number": "US9876543B2",
+        "title": "Smart lock",
+        "abstract": "A lock with a wireless ‘module’.",
+        "assignee": "ASSA ABLOY AB",
+        "inventors": ["Jane Doe"],
+        "filing_date": "2021-03-15",
+        "grant_date": "2024-01-02",
+        "cpc_codes": ["E05B47/00"],
+        "status_code": None,
+    }
+    with patch("tools.bulk_ingest._READ_BUFFER", 7):  # declarations split across reads
+        assert list(iter_bulk_patents(str(xml_path))) == patents
+    assert [p["patent_number"] for p in iter_bulk_patents(str(zip_path), cpc_prefixes=["G07C 9"])] \
+        == ["US11234567B2"]
+    assert list(iter_bulk_patents(str(zip_path), assignees=["assa abloy"]))[0]["title"] == "Smart lock"
+
+    with pytest.raises(ValueError):
+        bulk_files(["https://bulkdata.uspto.gov/ipg240102.zip"])
+
+    with patch("tools.data_loader._execute_snowflake_sql", return_value="ok") as execute:
+        loaded = ingest_bulk_files([str(tmp_path)], cpc_prefixes=["E05B47"])
+    assert loaded == {str(xml_path): 1, str(zip_path): 1}
+    execute.assert_not_called()
+
+    assert ingest_bulk_files([str(xml_path), str(zip_path)], processes=2) == {
+        str(xml_path): 2, str(zip_path): 2}
+
+
+def test_patent_snapshot_columnar_views(tmp_path):
+    """Test snapshot round trip, column filters and the analytics/report fast paths."""
+    from tools.batch_reports import generate_all_reports
+    from tools.patent_snapshot import PatentSnapshot, get_snapshot, write_snapshot
+
+    patents = [
+        {"patent_number": "US1", "title": "Smart lock", "abstract": "Wireless lock module",
+         "assignee": "ASSA ABLOY AB", "inventors": ["Jane Doe"], "filing_date": "2021-03-15",
+         "grant_date": "2023-01-10", "cpc_codes": ["E05B47/00", "G07C9/00"], "status_code": 150},
+        {"PATENT_NUMBER": "US2", "TITLE": "Access reader", "ABSTRACT": "Biometric reader",
+         "ASSIGNEE": "Allegion plc", "INVENTORS": '["Max Roe", "Jane Doe"]',
+         "FILING_DATE": "2022-06-01", "CPC_CODES": "G07C9/00"},
+        {"patent_number": "US3", "title": "Key cabinet", "abstract": "", "assignee": None,
+         "inventors": [], "filing_date": None, "cpc_codes": []},
+        {"patent_number": "US1", "title": "Duplicate", "assignee": "Other"},
+    ]
+    path = str(tmp_path / "patents.bin")
+    assert write_snapshot(patents, path) == 3
+
+    snapshot = get_snapshot(path)
+    assert get_snapshot(path) is snapshot
+    assert len(snapshot) == 3
+    assert snapshot[0] == {
+        "patent_number": "US1", "title": "Smart lock", "abstract": "Wireless lock module",
+        "assignee": "ASSA ABLOY AB", "inventors": ["Jane Doe"], "filing_date": "2021-03-15",
+        "grant_date": "2023-01-10", "cpc_codes": ["E05B47/00", "G07C9/00"], "status_code": 150,
+    }
+    assert snapshot[1]["inventors"] == ["Max Roe", "Jane Doe"]
+    assert snapshot[-1]["assignee"] == "" and snapshot[-1]["filing_date"] is None
+    assert snapshot[-1]["status_code"] is None
+    assert snapshot.where(assignee="allegion") == [1]
+    assert snapshot.where(cpc_prefix="G07C 9") == [0, 1]
+    assert snapshot.where(cpc_prefix="G07C9", min_filing_date="2022-01-01") == [1]
+    assert [p["patent_number"] for p in snapshot.select(cpc_prefix="E05B")] == ["US1"]
+    assert list(snapshot.column("title")) == ["Smart lock", "Access reader", "Key cabinet"]
+
+    (tmp_path / "bad.bin").write_bytes(b"not a snapshot at all")
+    with pytest.raises(ValueError):
+        PatentSnapshot(str(tmp_path / "bad.bin"))
+
+    paths = generate_all_reports(snapshot, output_dir=str(tmp_path / "reports"),
+                                 companies=["Allegion"], technologies=["reader"], workers=1)
+    assert "Access reader" in open(paths["competitor:Allegion"]).read()
+    assert "US2" in open(paths["technology:reader"]).read()
+
+    pytest.importorskip("numpy")
+    from tools.benchmark_analytics import competitive_benchmark
+    companies = ["ASSA ABLOY", "Allegion", "A"]  # "A" matches several assignees
+    assert competitive_benchmark(snapshot, companies) == competitive_benchmark(list(snapshot), companies)
+
+
+def test_state_store_incremental_updates(tmp_path):
+    """Test JSON import, keyed appends, point lookups and compaction."""
+    import json
+    from tools.state_store import StateStore
+
+    legacy = {
+        "allegion_recent": [],
+        "recent_smart_locks": [
+            {"patent_number": "US1", "title": "Smart lock"},
+            {"patent_number": "", "title": "Unnumbered lock"},
+        ],
+        "tech_keywords": {"biometric": 0, "NFC": 2},
+        "workflow_path": "analysis/2026-01-28_allegion",
+    }
+    json_path = tmp_path / "workflow_state.json"
+    json_path.write_text(json.dumps(legacy))
+
+    store = StateStore(str(tmp_path / "state.db"))
+    assert store.import_json(str(json_path))["recent_smart_locks"] == 2
+    assert store.to_dict() == legacy
+
+    store.append("recent_smart_locks", [{"patent_number": "US2", "title": "Keypad"},
+                                        {"patent_number": "US1", "title": "Smart lock v2"}])
+    assert [p["title"] for p in store.load("recent_smart_locks")] == \
+        ["Smart lock v2", "Unnumbered lock", "Keypad"]
+    assert store.get("recent_smart_locks", "US2")["title"] == "Keypad"
+    store.put("tech_keywords", "NFC", 3)
+    assert store.get("tech_keywords", "NFC") == 3
+    assert store.remove("tech_keywords", "biometric")
+    assert store.load("tech_keywords") == {"NFC": 3}
+    assert store.get("workflow_path") == "analysis/2026-01-28_allegion"
+    with pytest.raises(ValueError):
+        store.append("tech_keywords", [{"patent_number": "US3"}])
+
+    store.delete("allegion_recent")
+    store.set("recent_smart_locks", [{"patent_number": "US9"}])
+    expected = store.to_dict()
+    assert store.compact() == 7  # 3 superseded, 1 tombstone, 3 from the replaced list
+    assert store.stats() == {"states": 3, "log_rows": 3, "live_keys": 3}
+    assert store.to_dict() == expected
+    store.close()
+    reopened = StateStore(str(tmp_path / "state.db"))
+    assert reopened.load("recent_smart_locks") == [{"patent_number": "US9"}]
+
+    # Repeated unnumbered entries are kept; entries sharing a number are one entry
+    assert reopened.set("repeats", ["x", "x", {"patent_number": "US1"}, {"patent_number": "US1", "v": 2}]) == 3
+    assert reopened.load("repeats") == ["x", "x", {"patent_number": "US1", "v": 2}]
+    reopened.close()
+
+
+def test_known_patents_bloom_precheck(tmp_path):
+    """Test the Bloom filter index, INSERT routing for new patents and local get_patent."""
+    from tools import data_loader, known_patents, patent_search
+    from tools.known_patents import KnownPatents
+
+    path = str(tmp_path / "known.db")
+    known = KnownPatents(path, capacity=8)
+    patents = [{"patent_number": f"US{i}", "title": "Lock", "assignee": "Test Corp",
+                "filing_date": "2024-01-01", "cpc_codes": []} for i in range(20)]
+    assert known.add_many(patents[:10]) == 10  # grows past capacity
+    assert known.capacity >= 10 and known.count == 10
+    assert known.contains("US3") and not known.contains("US15")
+    known.close()
+
+    known = KnownPatents(path)  # filter reopened from disk
+    assert known.count == 10 and all(known.might_contain(f"US{i}") for i in range(10))
+    assert known.get("US3")["title"] == "Lock"
+    assert known.get("US3", max_age_days=-1) is None
+    known.add_numbers(["US3", "US99"])  # a sync must not drop the cached copy
+    assert known.get("US3")["title"] == "Lock" and known.get("US99") is None
+    known.close()
+    with open(f"{path}.bloom", "r+b") as f:
+        f.truncate(10)  # damaged filter is rebuilt from the index
+    assert KnownPatents(path).contains("US99")
+
+    memory = KnownPatents(None)
+    memory.add_many(patents[:5])
+    with patch.object(known_patents, "_known_patents", memory), \
+            patch.object(data_loader, "_execute_snowflake_sql", return_value="ok") as run, \
+            patch.object(data_loader, "get_local_rollup"), \
+            patch.object(data_loader, "get_similarity_index"):
+        data_loader.stream_load_patents(patents[:10], "Test Corp", "competitor", execute=True)
+        assert run.call_args.args[0].count("MERGE INTO SNOWFLAKE_LEARNING_DB.PATENT_INTELLIGENCE.PATENTS") == 10
+        memory.mark_synced()
+        data_loader.stream_load_patents(patents[5:15], "Test Corp", "competitor", execute=True)
+        sql = run.call_args.args[0]
+        assert sql.count("MERGE INTO SNOWFLAKE_LEARNING_DB.PATENT_INTELLIGENCE.PATENTS") == 5
+        assert sql.count("INSERT INTO SNOWFLAKE_LEARNING_DB.PATENT_INTELLIGENCE.PATENTS") == 5
+        assert memory.contains("US14")
+
+        with patch.object(patent_search, "_search_uspto_odp") as uspto:
+            assert patent_search.get_patent("US14")["patent_number"] == "US14"
+        uspto.assert_not_called()
+
+
+def test_known_patents_concurrent_growth():
+    """Test readers never see a known patent as missing while the filter grows."""
+    import threading
+    from datetime import datetime, timedelta
+    from tools.known_patents import KnownPatents
+
+    known = KnownPatents(None, capacity=500)
+    known.add_numbers(f"US{i}" for i in range(400))
+    stop = threading.Event()
+    failures = []
+
+    def read():
+        while not stop.is_set():
+            try:
+                failures.extend(n for n in ("US0", "US199", "US399") if not known.contains(n))
+            except Exception as e:
+                failures.append(e)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for start in range(400, 5000, 100):
+        known.add_numbers(f"US{i}" for i in range(start, start + 100))
+    stop.set()
+    reader.join()
+    assert failures == []
+    assert known.count == 5000 and known.capacity >= 5000
+
+    known.mark_synced()
+    assert known.synced
+    stale = (datetime.utcnow() - timedelta(days=2)).isoformat()
+    known.conn.execute("UPDATE known_meta SET value = ? WHERE key = 'synced_at'", (stale,))
+    assert not known.synced  # loads go back to MERGE until the next sync
+
+
+def test_paged_load_failure_is_not_end_of_results(tmp_path):
+    """Test a throttled page is neither journaled nor taken as the last page."""
+    from tools import data_loader, patent_search
+    from tools.load_journal import LoadJournal
+    from tools.patent_search import SearchError, search_by_title
+
+    with patch.object(patent_search, "_search_uspto_odp", return_value=None), \
+            patch.object(patent_search, "_search_google_patents", return_value=None):
+        with pytest.raises(SearchError):
+            search_by_title("smart lock", 10, strict=True)
+        assert search_by_title("assa abloy", 10)  # demo fallback unchanged
+    with patch.object(patent_search, "_search_uspto_odp", return_value=[]), \
+            patch.object(patent_search, "_search_google_patents", return_value=[]):
+        assert search_by_title("smart lock", 10, 20, strict=True) == []  # exhausted
+
+    # Google Patents is asked for page indices, not offset // shrunken page size
+    with patch.object(patent_search, "_search_uspto_odp", return_value=None), \
+            patch.object(patent_search, "_search_google_patents", return_value=[{"patent_number": "US1"}]) as google:
+        search_by_title("lock", 100, 200)
+        assert google.call_args.args[1:3] == (100, 2)
+        google.reset_mock()
+        search_by_title("lock", 30, 100)  # not on a page boundary
+        google.assert_not_called()
+
+    patents = [{"patent_number": f"US{i}", "title": "Lock", "assignee": "Test Corp",
+                "filing_date": "2024-01-01", "cpc_codes": []} for i in range(250)]
+    calls = []
+
+    def throttled(query, limit, offset, strict):
+        calls.append((limit, offset))
+        if offset == 100 and len(calls) == 2:
+            raise SearchError("throttled")
+        return patents[offset:offset + limit]
+
+    path = str(tmp_path / "journal.jsonl")
+    with patch.object(data_loader, "_execute_snowflake_sql", return_value="ok"), \
+            patch.object(data_loader, "get_local_rollup"), \
+            patch.object(data_loader, "get_similarity_index"), \
+            patch.object(data_loader, "get_known_patents"):
+        with pytest.raises(SearchError):
+            data_loader.stream_load(throttled, "Test Corp", "competitor", 250, True, LoadJournal(path))
+        journal = LoadJournal(path)
+        assert not journal.pages_complete("competitor:Test Corp")
+        assert journal.get_page("competitor:Test Corp", 1) is None
+        assert data_loader.stream_load(throttled, "Test Corp", "competitor", 250, True, journal) == 250
+    assert calls[1:] == [(100, 100), (100, 100), (100, 200)]  # full pages, failed page refetched
+
+    # Dry runs keep the demo fallback instead of failing
+    with patch.object(patent_search, "_search_uspto_odp", return_value=None), \
+            patch.object(patent_search, "_search_google_patents", return_value=None):
+        assert len(data_loader.load_competitor_patents("Allegion", 5)) == 1
+
+
+def test_stream_load_upstream_error_keeps_partial_batch_open(tmp_path):
+    """Test a batch cut short by a failed stage is refilled and written on resume."""
+    from tools import data_loader
+    from tools.load_journal import LoadJournal
+
+    patents = [{"patent_number": f"US{i}", "title": "Lock", "assignee": "Test Corp",
+                "filing_date": "2024-01-01", "cpc_codes": []} for i in range(25)]
+
+    def failing_stream():
+        yield from patents[:15]
+        raise RuntimeError("source died")
+
+    path = str(tmp_path / "journal.jsonl")
+    executed = []
+    with patch.object(data_loader, "_execute_snowflake_sql", side_effect=lambda sql: executed.append(sql) or "ok"), \
+            patch.object(data_loader, "get_local_rollup"), \
+            patch.object(data_loader, "get_similarity_index"), \
+            patch.object(data_loader, "get_known_patents"):
+        with pytest.raises(RuntimeError):
+            data_loader.stream_load_patents(failing_stream(), "q", "competitor", True, LoadJournal(path))
+        journal = LoadJournal(path)
+        assert journal.batch_committed("competitor:q", 0)
+        assert not journal.batch_committed("competitor:q", 1)  # only 5 of its 10 patents
+
+        executed.clear()
+        assert data_loader.stream_load_patents(iter(patents), "q", "competitor", True, journal) == 25
+    written = "".join(executed)
+    assert all(f"'US{i}' AS patent_number" in written for i in range(10, 25))
+    assert "'US9' AS patent_number" not in written
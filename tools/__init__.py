@@ -2,38 +2,162 @@
 
 This module exports the public API for patent search, Snowflake queries,
 and analysis workflow functions.
+
+Submodules are imported lazily on first attribute access, so
+`from tools import search_by_assignee` only loads what that function needs
+and `import tools` itself is nearly free.
 """
+import importlib
+from typing import TYPE_CHECKING, Any
 
-from tools.patent_search import (
-    search_by_assignee,
-    search_by_title,
-    search_by_cpc,
-    get_patent,
-    format_patent_for_storage,
-    SAMPLE_PATENTS,
-)
+# Public name -> submodule defining it (imported on first access)
+_LAZY_EXPORTS = {
+    # Patent search functions
+    "search_by_assignee": "patent_search",
+    "search_by_title": "patent_search",
+    "search_by_cpc": "patent_search",
+    "SearchError": "patent_search",
+    "get_patent": "patent_search",
+    "format_patent_for_storage": "patent_search",
+    "SAMPLE_PATENTS": "patent_search",
+    # Snowflake query builders
+    "build_snowflake_query": "snowflake_queries",
+    "build_upsert_query": "snowflake_queries",
+    "build_insert_query": "snowflake_queries",
+    "get_trends_query": "snowflake_queries",
+    "build_rollup_upsert_query": "snowflake_queries",
+    "build_rollup_backfill_query": "snowflake_queries",
+    "is_cache_stale": "snowflake_queries",
+    "CACHE_STALE_DAYS": "snowflake_queries",
+    # Trend rollups
+    "TrendRollup": "trend_rollup",
+    "get_local_rollup": "trend_rollup",
+    # Analysis workflow
+    "AnalysisWorkflow": "analysis_workflow",
+    "create_session_dir": "analysis_workflow",
+    "generate_report_markdown": "analysis_workflow",
+    "write_report_stream": "analysis_workflow",
+    "generate_all_reports": "batch_reports",
+    "competitive_benchmark": "benchmark_analytics",
+    "ResultsStore": "results_store",
+    # Metrics
+    "MetricsRegistry": "metrics",
+    "get_registry": "metrics",
+    "trace": "metrics",
+    "SessionCatalog": "session_catalog",
+    "get_session_catalog": "session_catalog",
+    "SessionRecorder": "session_replay",
+    "ReplayMissError": "session_replay",
+    "SessionProfiler": "session_profiler",
+    # Data loader
+    "load_competitor_patents": "data_loader",
+    "load_technology_patents": "data_loader",
+    "load_all_competitors": "data_loader",
+    "load_all_technologies": "data_loader",
+    "stream_load": "data_loader",
+    "stream_load_patents": "data_loader",
+    "get_create_table_sql": "data_loader",
+    "get_create_rollup_tables_sql": "data_loader",
+    "LoadJournal": "load_journal",
+    # Similarity
+    "SimilarityIndex": "similarity",
+    "get_similarity_index": "similarity",
+    # Citation graph
+    "CitationGraph": "citation_graph",
+    "ingest_cpc_citations": "citation_graph",
+    # Watchlist
+    "Watch": "watchlist",
+    "WatchlistMonitor": "watchlist",
+    # Request coalescing
+    "SingleFlight": "single_flight",
+    "coalesce": "single_flight",
+    # Source routing
+    "SourceRouter": "source_router",
+    "get_router": "source_router",
+    # Bulk ingest
+    "iter_bulk_patents": "bulk_ingest",
+    "ingest_bulk_files": "bulk_ingest",
+    # Patent snapshot
+    "PatentSnapshot": "patent_snapshot",
+    "write_snapshot": "patent_snapshot",
+    "get_snapshot": "patent_snapshot",
+    # State store
+    "StateStore": "state_store",
+    "get_state_store": "state_store",
+    # Known patents
+    "KnownPatents": "known_patents",
+    "get_known_patents": "known_patents",
+}
 
-from tools.snowflake_queries import (
-    build_snowflake_query,
-    build_upsert_query,
-    get_trends_query,
-    is_cache_stale,
-    CACHE_STALE_DAYS,
-)
 
-from tools.analysis_workflow import (
-    AnalysisWorkflow,
-    create_session_dir,
-    generate_report_markdown,
-)
+def __getattr__(name: str) -> Any:
+    """Import the submodule defining a public name on first access."""
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module 'tools' has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"tools.{module_name}"), name)
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
 
-from tools.data_loader import (
-    load_competitor_patents,
-    load_technology_patents,
-    load_all_competitors,
-    load_all_technologies,
-    get_create_table_sql,
-)
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
+
+
+if TYPE_CHECKING:  # Static analyzers and IDEs see the eager imports
+    from tools.patent_search import (
+        search_by_assignee,
+        search_by_title,
+        search_by_cpc,
+        SearchError,
+        get_patent,
+        format_patent_for_storage,
+        SAMPLE_PATENTS,
+    )
+    from tools.snowflake_queries import (
+        build_snowflake_query,
+        build_upsert_query,
+        build_insert_query,
+        get_trends_query,
+        build_rollup_upsert_query,
+        build_rollup_backfill_query,
+        is_cache_stale,
+        CACHE_STALE_DAYS,
+    )
+    from tools.trend_rollup import TrendRollup, get_local_rollup
+    from tools.analysis_workflow import (
+        AnalysisWorkflow,
+        create_session_dir,
+        generate_report_markdown,
+        write_report_stream,
+    )
+    from tools.batch_reports import generate_all_reports
+    from tools.benchmark_analytics import competitive_benchmark
+    from tools.metrics import MetricsRegistry, get_registry, trace
+    from tools.results_store import ResultsStore
+    from tools.session_catalog import SessionCatalog, get_session_catalog
+    from tools.session_profiler import SessionProfiler
+    from tools.session_replay import SessionRecorder, ReplayMissError
+    from tools.data_loader import (
+        load_competitor_patents,
+        load_technology_patents,
+        load_all_competitors,
+        load_all_technologies,
+        stream_load,
+        stream_load_patents,
+        get_create_table_sql,
+        get_create_rollup_tables_sql,
+    )
+    from tools.load_journal import LoadJournal
+    from tools.similarity import SimilarityIndex, get_similarity_index
+    from tools.citation_graph import CitationGraph, ingest_cpc_citations
+    from tools.watchlist import Watch, WatchlistMonitor
+    from tools.single_flight import SingleFlight, coalesce
+    from tools.source_router import SourceRouter, get_router
+    from tools.bulk_ingest import ingest_bulk_files, iter_bulk_patents
+    from tools.patent_snapshot import PatentSnapshot, get_snapshot, write_snapshot
+    from tools.state_store import StateStore, get_state_store
+    from tools.known_patents import KnownPatents, get_known_patents
 
 # Competitors for quick reference (configure for your company)
 # NOTE: ASSA ABLOY is the benchmark - all reports should compare metrics to ASSA ABLOY
@@ -45,6 +169,9 @@ COMPETITORS = [
     "Stanley Black & Decker",
 ]
 
+# Company every competitor report is compared against
+BENCHMARK_COMPANY = "ASSA ABLOY"
+
 # Relevant technology keywords
 TECHNOLOGIES = [
     "smart lock",
@@ -63,26 +190,79 @@ __all__ = [
     "search_by_assignee",
     "search_by_title",
     "search_by_cpc",
+    "SearchError",
     "get_patent",
     "format_patent_for_storage",
     "SAMPLE_PATENTS",
     # Snowflake query builders
     "build_snowflake_query",
     "build_upsert_query",
+    "build_insert_query",
     "get_trends_query",
+    "build_rollup_upsert_query",
+    "build_rollup_backfill_query",
     "is_cache_stale",
     "CACHE_STALE_DAYS",
+    # Trend rollups
+    "TrendRollup",
+    "get_local_rollup",
     # Analysis workflow
     "AnalysisWorkflow",
     "create_session_dir",
     "generate_report_markdown",
+    "write_report_stream",
+    "generate_all_reports",
+    "competitive_benchmark",
+    "ResultsStore",
+    # Metrics
+    "MetricsRegistry",
+    "get_registry",
+    "trace",
+    "SessionCatalog",
+    "get_session_catalog",
+    "SessionRecorder",
+    "ReplayMissError",
+    "SessionProfiler",
     # Data loader
     "load_competitor_patents",
     "load_technology_patents",
     "load_all_competitors",
     "load_all_technologies",
+    "stream_load",
+    "stream_load_patents",
     "get_create_table_sql",
+    "get_create_rollup_tables_sql",
+    "LoadJournal",
+    # Similarity
+    "SimilarityIndex",
+    "get_similarity_index",
+    # Citation graph
+    "CitationGraph",
+    "ingest_cpc_citations",
+    # Watchlist
+    "Watch",
+    "WatchlistMonitor",
+    # Request coalescing
+    "SingleFlight",
+    "coalesce",
+    # Source routing
+    "SourceRouter",
+    "get_router",
+    # Bulk ingest
+    "iter_bulk_patents",
+    "ingest_bulk_files",
+    # Patent snapshot
+    "PatentSnapshot",
+    "write_snapshot",
+    "get_snapshot",
+    # State store
+    "StateStore",
+    "get_state_store",
+    # Known patents
+    "KnownPatents",
+    "get_known_patents",
     # Constants
     "COMPETITORS",
+    "BENCHMARK_COMPANY",
     "TECHNOLOGIES",
 ]
@@ -0,0 +1,108 @@
+"""Thin client for the warm agent daemon (see tools.agent_daemon).
+
+Standard library only, so running it as a script starts in milliseconds:
+
+    python tools/agent_client.py search_by_assignee Allegion 5
+    python tools/agent_client.py search_by_cpc E05B47 --kwargs '{"min_grant_date": "20200101"}'
+    python tools/agent_client.py stats
+
+Positional values are parsed as JSON when possible (so 5 is an int) and
+passed through as strings otherwise. If no daemon is listening, the call
+runs in-process instead.
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+from typing import Any, Optional
+
+
+def _socket_path() -> str:
+    # Mirrors tools.agent_daemon.socket_path() without importing the package
+    return os.environ.get("PATENT_AGENT_SOCKET") or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "agent.sock"
+    )
+
+
+def call(
+    op: str,
+    args: Optional[list] = None,
+    kwargs: Optional[dict] = None,
+    path: Optional[str] = None,
+    timeout: float = 300
+) -> dict:
+    """Send one request to the daemon.
+
+    Args:
+        op: Operation name (e.g., "search_by_assignee", "stats")
+        args: Positional arguments
+        kwargs: Keyword arguments
+        path: Socket path (default: PATENT_AGENT_SOCKET or data/agent.sock)
+        timeout: Socket timeout in seconds
+
+    Returns:
+        Response dict with "ok" and "result" or "error"
+
+    Raises:
+        OSError: If the daemon is not reachable
+    """
+    request = {"op": op, "args": args or [], "kwargs": kwargs or {}}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path or _socket_path())
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    return json.loads(data)
+
+
+def _call_in_process(op: str, args: list, kwargs: dict) -> dict:
+    """Run a request without a daemon (imports the tools package)."""
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from tools.agent_daemon import AgentDaemon
+
+    return AgentDaemon().handle({"op": op, "args": args, "kwargs": kwargs})
+
+
+def _parse_value(value: str) -> Any:
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return value
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Call the warm patent agent daemon")
+    parser.add_argument("op", help="Operation, e.g. search_by_assignee, stats, shutdown")
+    parser.add_argument("args", nargs="*", help="Positional arguments (JSON or plain strings)")
+    parser.add_argument("--kwargs", default="{}", help="Keyword arguments as a JSON object")
+    parser.add_argument("--socket", help="Daemon socket path")
+    args = parser.parse_args(argv)
+
+    values = [_parse_value(v) for v in args.args]
+    kwargs = json.loads(args.kwargs)
+    try:
+        response = call(args.op, values, kwargs, args.socket)
+    except OSError:
+        if args.op in ("stats", "shutdown", "ping", "clear_cache"):
+            print("[Agent daemon is not running]", file=sys.stderr)
+            return 1
+        print("[Agent daemon not running - running in-process]", file=sys.stderr)
+        response = _call_in_process(args.op, values, kwargs)
+
+    if not response.get("ok"):
+        print(f"[Error: {response.get('error')}]", file=sys.stderr)
+        return 1
+    result = response.get("result")
+    print(result if isinstance(result, str) else json.dumps(result, indent=2, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,304 @@
+"""Warm agent daemon serving tool calls over a Unix socket.
+
+Every slash command otherwise starts a fresh Python process, imports the
+whole tools package, re-reads .env and reopens the local indexes. The daemon
+keeps all of that loaded and adds a short-lived result cache, so repeated
+interactive queries are answered in milliseconds:
+
+    python -m tools.agent_daemon                 # start (foreground)
+    python tools/agent_client.py search_by_assignee Allegion 5
+    python tools/agent_client.py shutdown
+
+Protocol: one JSON object per line in each direction.
+
+    -> {"op": "search_by_title", "args": ["\\"smart lock\\"", 10]}
+    <- {"ok": true, "result": [...], "cached": false, "ms": 412.3}
+
+The socket path defaults to data/agent.sock and can be overridden with
+PATENT_AGENT_SOCKET.
+"""
+import argparse
+import json
+import os
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+
+# Default socket location (override with PATENT_AGENT_SOCKET)
+DEFAULT_SOCKET_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "agent.sock"
+)
+
+# Seconds a cached search result stays fresh
+RESULT_CACHE_TTL = 300
+
+# Maximum cached results
+RESULT_CACHE_SIZE = 512
+
+
+def socket_path() -> str:
+    """Get the daemon socket path from the environment or the default."""
+    return os.environ.get("PATENT_AGENT_SOCKET") or DEFAULT_SOCKET_PATH
+
+
+class ResultCache:
+    """Thread-safe LRU cache with a time-to-live per entry."""
+
+    def __init__(self, max_entries: int = RESULT_CACHE_SIZE, ttl: float = RESULT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        """Look up a key.
+
+        Returns:
+            (found, value) tuple
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: str, value: Any) -> None:
+        """Store a value, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _generate_report(title: str, patents: list[dict], analysis: Optional[str] = None) -> str:
+    from tools import generate_report_markdown
+
+    return generate_report_markdown(title, patents, analysis)
+
+
+def _related_patents(patent_number: Optional[str] = None, text: Optional[str] = None, k: int = 10) -> list:
+    from tools.similarity import get_similarity_index
+
+    return get_similarity_index().related(patent_number, text, k)
+
+
+def _near_duplicates(patent_number: str) -> list:
+    from tools.similarity import get_similarity_index
+
+    return get_similarity_index().near_duplicates(patent_number)
+
+
+def _operations() -> dict[str, tuple[Callable, bool]]:
+    """Map op names to (function, cacheable)."""
+    from tools import (
+        get_patent,
+        get_trends_query,
+        search_by_assignee,
+        search_by_cpc,
+        search_by_title,
+    )
+
+    return {
+        "search_by_assignee": (search_by_assignee, True),
+        "search_by_title": (search_by_title, True),
+        "search_by_cpc": (search_by_cpc, True),
+        "get_patent": (get_patent, True),
+        "get_trends_query": (get_trends_query, True),
+        "generate_report": (_generate_report, False),
+        "related_patents": (_related_patents, False),
+        "near_duplicates": (_near_duplicates, False),
+    }
+
+
+class AgentDaemon:
+    """Unix-socket server keeping the tools package and its caches warm.
+
+    Usage:
+        daemon = AgentDaemon("/tmp/agent.sock")
+        daemon.start()          # background thread
+        ...
+        daemon.stop()
+    """
+
+    def __init__(self, path: Optional[str] = None, cache: Optional[ResultCache] = None):
+        """Initialize the daemon.
+
+        Args:
+            path: Socket path (default: socket_path())
+            cache: Result cache (default: a fresh ResultCache)
+        """
+        self.path = path or socket_path()
+        self.cache = cache or ResultCache()
+        self.started_at = time.time()
+        self.requests = 0
+        self._operations = _operations()
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def warm(self) -> None:
+        """Open local indexes and read configuration ahead of the first request."""
+        from tools.patent_search import _get_api_key
+        from tools.similarity import get_similarity_index
+        from tools.trend_rollup import get_local_rollup
+
+        _get_api_key()
+        get_local_rollup()
+        get_similarity_index()
+
+    def handle(self, request: dict) -> dict:
+        """Execute one request.
+
+        Args:
+            request: {"op": name, "args": [...], "kwargs": {...}}
+
+        Returns:
+            Response dict with "ok" and "result" or "error"
+        """
+        self.requests += 1
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True, "result": "pong"}
+        if op == "stats":
+            return {"ok": True, "result": self.stats()}
+        if op == "clear_cache":
+            self.cache.clear()
+            return {"ok": True, "result": None}
+        if op not in self._operations:
+            return {"ok": False, "error": f"Unknown op: {op}"}
+
+        fn, cacheable = self._operations[op]
+        args = request.get("args") or []
+        kwargs = request.get("kwargs") or {}
+        start = time.perf_counter()
+
+        key = json.dumps([op, args, kwargs], sort_keys=True, default=str)
+        if cacheable:
+            found, result = self.cache.get(key)
+            if found:
+                return {"ok": True, "result": result, "cached": True,
+                        "ms": round((time.perf_counter() - start) * 1000, 3)}
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+        # Empty results usually mean every source failed - don't pin them
+        if cacheable and result:
+            self.cache.put(key, result)
+        return {"ok": True, "result": result, "cached": False,
+                "ms": round((time.perf_counter() - start) * 1000, 3)}
+
+    def stats(self) -> dict:
+        """Daemon uptime, request and cache counters, and source metrics."""
+        from tools import get_registry
+
+        return {
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "requests": self.requests,
+            "cache_entries": len(self.cache),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "source_metrics": get_registry().summary(),
+        }
+
+    def _make_server(self) -> socketserver.ThreadingUnixStreamServer:
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    try:
+                        request = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        response = {"ok": False, "error": f"Bad request: {e}"}
+                    else:
+                        if request.get("op") == "shutdown":
+                            self._send({"ok": True, "result": "shutting down"})
+                            threading.Thread(target=daemon.stop, daemon=True).start()
+                            return
+                        response = daemon.handle(request)
+                    self._send(response)
+
+            def _send(self, response: dict) -> None:
+                self.wfile.write(json.dumps(response, default=str).encode() + b"\n")
+                self.wfile.flush()
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # Stale socket from a previous run
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        server = socketserver.ThreadingUnixStreamServer(self.path, Handler)
+        server.daemon_threads = True
+        os.chmod(self.path, 0o600)
+        return server
+
+    def start(self) -> "AgentDaemon":
+        """Serve requests on a background thread."""
+        self._server = self._make_server()
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve requests on the calling thread until shutdown."""
+        self._server = self._make_server()
+        print(f"[Agent daemon listening on {self.path}]")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._cleanup()
+
+    def stop(self) -> None:
+        """Stop serving and remove the socket."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._cleanup()
+
+    def _cleanup(self) -> None:
+        if self._server is not None:
+            self._server.server_close()
+            self._server = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Run the warm patent agent daemon")
+    parser.add_argument("--socket", help="Unix socket path")
+    parser.add_argument("--cache-ttl", type=float, default=RESULT_CACHE_TTL)
+    args = parser.parse_args(argv)
+
+    daemon = AgentDaemon(args.socket, ResultCache(ttl=args.cache_ttl))
+    daemon.warm()
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -6,6 +6,17 @@ Creates timestamped analysis folders with full audit trail:
 - 02_api_results.md: Raw USPTO/Google Patents API results
 - 03_analysis.md: Intermediate analysis/filtering steps
 - 04_report.md: Final formatted report
+- results/: Full compressed result of every query/API call (see tools.results_store)
+- recordings.jsonl: Raw source responses when recording (see tools.session_replay)
+
+metadata.json also gets a "source_metrics" summary (calls, errors,
+fallbacks, latency percentiles per source) on finalize; see tools.metrics.
+Opt-in profiles (profile.pstats, tracemalloc_top.txt, wall_samples.*) are
+written alongside it; see tools.session_profiler.
+
+Every session is also indexed in analysis/catalog.sqlite (see
+tools.session_catalog) so earlier answers to the same request can be found
+and reused.
 
 Example folder structure:
     analysis/
@@ -14,13 +25,36 @@ Example folder structure:
         ├── 01_snowflake_queries.md
         ├── 02_api_results.md
         ├── 03_analysis.md
-        └── 04_report.md
+        ├── 04_report.md
+        └── results/
+            └── api_call_001.ndjson.zst
 """
+import atexit
+import heapq
+import io
 import json
 import os
 import re
+import threading
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, Optional, TextIO, Union
+
+from tools.metrics import MetricsRegistry, activate_session_registry, deactivate_session_registry
+from tools.results_store import ResultsStore
+from tools.session_catalog import get_session_catalog
+from tools.session_profiler import start_session_profiler
+from tools.session_replay import RECORDINGS_FILENAME, SessionRecorder
+from tools.similarity import SimilarityIndex
+
+
+# Seconds between background flushes in buffered mode
+DEFAULT_FLUSH_INTERVAL = 2.0
+
+# Patents rendered in the report's Patents section
+REPORT_MAX_LISTED = 20
+
+# Distinct assignees counted exactly before switching to approximate top-k
+REPORT_MAX_TRACKED_ASSIGNEES = 10000
 
 
 def _slugify(text: str, max_length: int = 50) -> str:
@@ -54,6 +88,22 @@ class AnalysisWorkflow:
         workflow.log_analysis("Filtering by date", {"filtered_count": 47})
         workflow.write_report("# Smart Lock Analysis\\n...")
         workflow.finalize()
+
+    As a context manager the session is always finalized, so profilers,
+    the writer thread and the session's metrics/recorder scope never
+    outlive it (status "error" if the block raised):
+
+        with AnalysisWorkflow("Analyze smart lock patents from 2024") as workflow:
+            workflow.log_analysis("Filtering by date", {"filtered_count": 47})
+
+    With buffered=True, log entries and metadata updates are queued in
+    memory and written by a background thread every flush_interval seconds,
+    on flush()/finalize(), and at interpreter exit.
+
+    With record=True every USPTO, Google Patents, bq and snow response made
+    during the session is saved to recordings.jsonl. Passing replay_from=<old
+    session dir> serves those responses back with zero network I/O, so the
+    same workflow can be re-run offline.
     """
 
     def __init__(
@@ -61,7 +111,15 @@ class AnalysisWorkflow:
         request: str,
         jira_ticket: Optional[str] = None,
         jira_url: Optional[str] = None,
-        base_dir: str = "analysis"
+        base_dir: str = "analysis",
+        buffered: bool = False,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        store_results: bool = True,
+        record: bool = False,
+        replay_from: Optional[str] = None,
+        params: Optional[dict] = None,
+        catalog: bool = True,
+        profile: Union[bool, str, None] = None
     ):
         """Initialize a new analysis workflow session.
 
@@ -70,12 +128,33 @@ class AnalysisWorkflow:
             jira_ticket: Optional Jira ticket ID (e.g., "PATENT-456")
             jira_url: Optional full Jira URL
             base_dir: Base directory for analysis folders (default: "analysis")
+            buffered: If True, batch audit writes on a background thread
+            flush_interval: Seconds between background flushes when buffered
+            store_results: If True, keep the full result of every call under results/
+            record: If True, capture every source response into the session
+            replay_from: Session directory whose recordings should serve all
+                source calls (no network I/O)
+            params: Optional request parameters (e.g., {"company": "Allegion"})
+                recorded in metadata and used to match equivalent sessions
+            catalog: If True, index the session in the base_dir session catalog
+            profile: Enable cProfile/tracemalloc/sampling profiles written to
+                the session folder (True, a mode list like "cprofile,sampling",
+                or None to follow the PATENT_AGENT_PROFILE environment variable)
         """
         self.request = request
         self.jira_ticket = jira_ticket
         self.jira_url = jira_url
         self.base_dir = base_dir
         self.started_at = datetime.utcnow()
+        self.buffered = buffered
+        self.flush_interval = flush_interval
+
+        # Buffered-mode state
+        self._lock = threading.Lock()
+        self._pending: dict[str, list[str]] = {}
+        self._metadata_dirty = False
+        self._stop = threading.Event()
+        self._writer: Optional[threading.Thread] = None
 
         # Create folder name
         date_str = self.started_at.strftime("%Y-%m-%d")
@@ -87,12 +166,14 @@ class AnalysisWorkflow:
             folder_name = f"{date_str}_{slug}"
 
         self.session_dir = os.path.join(base_dir, folder_name)
+        self.results = ResultsStore(self.session_dir) if store_results else None
 
         # Initialize metadata
         self.metadata = {
             "request": request,
             "jira_ticket": jira_ticket,
             "jira_url": jira_url,
+            "parameters": params or {},
             "started_at": self.started_at.isoformat() + "Z",
             "completed_at": None,
             "status": "in_progress",
@@ -100,10 +181,36 @@ class AnalysisWorkflow:
             "api_call_count": 0,
             "analysis_step_count": 0,
         }
+        if replay_from:
+            self.metadata["replayed_from"] = replay_from
+
+        # Route source calls through a recorder for the life of the session
+        self.recorder: Optional[SessionRecorder] = None
+        if replay_from:
+            self.recorder = SessionRecorder(replay_from, mode="replay")
+        elif record:
+            self.recorder = SessionRecorder(self.session_dir, mode="record")
+        if self.recorder is not None:
+            self.recorder.activate()
 
         # Create directory and initialize files
         self._setup_session()
 
+        # Collect source spans made in this session's context
+        self.metrics = MetricsRegistry()
+        self._metrics_token = activate_session_registry(self.metrics)
+
+        self.catalog = get_session_catalog(base_dir) if catalog else None
+        if self.catalog is not None:
+            self.catalog.upsert(self.session_dir, self.metadata)
+
+        self.profiler = start_session_profiler(self.session_dir, profile)
+
+        if buffered:
+            self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+            self._writer.start()
+            atexit.register(self.flush)
+
     def _setup_session(self) -> None:
         """Create session directory and initialize markdown files."""
         os.makedirs(self.session_dir, exist_ok=True)
@@ -115,26 +222,79 @@ class AnalysisWorkflow:
         self._write_file("04_report.md", "")  # Report written at end
 
         # Write initial metadata
-        self._write_metadata()
+        self._write_metadata_now()
 
     def _write_file(self, filename: str, content: str, append: bool = False) -> None:
         """Write content to a file in the session directory.
 
+        In buffered mode appends are queued until the next flush; full
+        rewrites flush pending appends for that file first.
+
         Args:
             filename: Name of file
             content: Content to write
             append: If True, append to existing file
         """
+        if self.buffered:
+            with self._lock:
+                if append:
+                    self._pending.setdefault(filename, []).append(content)
+                    return
+                self._pending.pop(filename, None)
+
         filepath = os.path.join(self.session_dir, filename)
         mode = "a" if append else "w"
         with open(filepath, mode) as f:
             f.write(content)
 
     def _write_metadata(self) -> None:
-        """Write current metadata to metadata.json."""
+        """Write current metadata to metadata.json (deferred when buffered)."""
+        if self.buffered:
+            with self._lock:
+                self._metadata_dirty = True
+            return
+        self._write_metadata_now()
+
+    def _write_metadata_now(self, durable: bool = False) -> None:
+        """Atomically replace metadata.json via a temp file rename.
+
+        Args:
+            durable: If True, fsync before the rename (buffered flushes and
+                finalize; per-call writes skip the synchronous disk flush)
+        """
+        text = json.dumps(self.metadata, indent=2, default=str)
         filepath = os.path.join(self.session_dir, "metadata.json")
-        with open(filepath, "w") as f:
-            json.dump(self.metadata, f, indent=2)
+        tmp_path = f"{filepath}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(text)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+
+    def flush(self) -> None:
+        """Write any buffered log entries and metadata to disk."""
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            metadata_dirty = self._metadata_dirty
+            self._metadata_dirty = False
+
+            # Write while holding the lock so concurrent flushes stay ordered
+            for filename, chunks in pending.items():
+                filepath = os.path.join(self.session_dir, filename)
+                with open(filepath, "a") as f:
+                    f.write("".join(chunks))
+            if metadata_dirty:
+                self._write_metadata_now(durable=True)
+
+    def _writer_loop(self) -> None:
+        """Background thread flushing buffered writes periodically."""
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:  # Keep flushing; a dead writer would drop entries silently
+                print(f"[Analysis log flush error: {type(e).__name__}: {e}]")
 
     def log_snowflake_query(
         self,
@@ -158,6 +318,7 @@ class AnalysisWorkflow:
         content += "\n\n"
         content += f"```sql\n{query.strip()}\n```\n\n"
         content += f"**Results:** {len(results)} rows\n\n"
+        content += self._store_results("snowflake_query", query_num, results)
 
         if results:
             # Show first few results as preview
@@ -197,6 +358,7 @@ class AnalysisWorkflow:
         content += f"**Endpoint:** `{endpoint}`\n\n"
         content += f"**Parameters:**\n```json\n{json.dumps(params, indent=2)}\n```\n\n"
         content += f"**Results:** {len(results)} items returned\n\n"
+        content += self._store_results("api_call", call_num, results)
 
         if results:
             # Show first few results as preview
@@ -211,6 +373,35 @@ class AnalysisWorkflow:
         self._write_file("02_api_results.md", content, append=True)
         self._write_metadata()
 
+    def _store_results(self, kind: str, num: int, results: list) -> str:
+        """Save a call's full results and return the markdown line pointing to them."""
+        if self.results is None or not results:
+            return ""
+        path = self.results.write(kind, num, results)
+        return f"**Full results:** `{path}`\n\n"
+
+    def load_snowflake_results(self, query_num: int) -> list:
+        """Load the full stored results of a logged Snowflake query.
+
+        Args:
+            query_num: Query number as shown in 01_snowflake_queries.md
+
+        Returns:
+            List of result rows
+        """
+        return ResultsStore(self.session_dir).load("snowflake_query", query_num)
+
+    def load_api_results(self, call_num: int) -> list:
+        """Load the full stored results of a logged API call.
+
+        Args:
+            call_num: Call number as shown in 02_api_results.md
+
+        Returns:
+            List of results
+        """
+        return ResultsStore(self.session_dir).load("api_call", call_num)
+
     def log_analysis(
         self,
         step: str,
@@ -268,12 +459,73 @@ class AnalysisWorkflow:
         Returns:
             Path to the session directory
         """
+        # Stop the writer before changing the metadata it serializes
+        if self.buffered:
+            self._stop.set()
+            if self._writer is not None:
+                self._writer.join()
+
         self.metadata["completed_at"] = datetime.utcnow().isoformat() + "Z"
         self.metadata["status"] = status
-        self._write_metadata()
+        deactivate_session_registry(self.metrics, self._metrics_token)
+        self.metadata["source_metrics"] = self.metrics.summary()
+        if self.profiler is not None:
+            self.metadata["profiles"] = self.profiler.stop()
+            self.profiler = None
+        if self.recorder is not None and not self.recorder.replaying:
+            self.metadata["recordings"] = RECORDINGS_FILENAME
+
+        if self.recorder is not None:
+            self.recorder.deactivate()
+
+        if self.catalog is not None:
+            self.catalog.upsert(self.session_dir, self.metadata)
+
+        if self.buffered:
+            self._write_metadata()
+            self.flush()
+            atexit.unregister(self.flush)
+        else:
+            self._write_metadata_now(durable=True)
 
         return self.session_dir
 
+    def __enter__(self) -> "AnalysisWorkflow":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.metadata["completed_at"] is None:
+            self.finalize("error" if exc_type is not None else "complete")
+
+    def _detach(self) -> None:
+        """Leave the session's context scope without finalizing it."""
+        deactivate_session_registry(self.metrics, self._metrics_token)
+        if self.recorder is not None:
+            self.recorder.deactivate()
+
+    @staticmethod
+    def find_existing(
+        request: str,
+        params: Optional[dict] = None,
+        base_dir: str = "analysis",
+        max_age_days: Optional[int] = 7
+    ) -> Optional[dict]:
+        """Find a recent completed session for an equivalent request.
+
+        Call before creating a workflow to reuse its results instead of
+        recomputing them.
+
+        Args:
+            request: The analysis request/question
+            params: Request parameters that must match exactly
+            base_dir: Base directory for analysis folders
+            max_age_days: Ignore sessions older than this (None for any age)
+
+        Returns:
+            Catalog record (including "session_dir") or None
+        """
+        return get_session_catalog(base_dir).find_equivalent(request, params, max_age_days)
+
     @property
     def folder_path(self) -> str:
         """Get the session folder path."""
@@ -290,14 +542,17 @@ def create_session_dir(request: str, jira_ticket: Optional[str] = None) -> str:
     Returns:
         Path to created directory
     """
-    workflow = AnalysisWorkflow(request, jira_ticket=jira_ticket)
+    # The session stays open for later logging, so nothing is left running
+    workflow = AnalysisWorkflow(request, jira_ticket=jira_ticket, profile=False)
+    workflow._detach()
     return workflow.session_dir
 
 
 def generate_report_markdown(
     title: str,
     patents: list[dict],
-    analysis: Optional[str] = None
+    analysis: Optional[str] = None,
+    collapse_duplicates: bool = False
 ) -> str:
     """Generate markdown report from patent data.
 
@@ -305,46 +560,155 @@ def generate_report_markdown(
         title: Report title
         patents: List of patent dictionaries
         analysis: Optional analysis text to include
+        collapse_duplicates: If True, count near-duplicate patents
+            (continuations, family members) once
 
     Returns:
         Markdown formatted report string
     """
-    timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
+    out = io.StringIO()
+    write_report_stream(title, patents, out, analysis, collapse_duplicates=collapse_duplicates)
+    return out.getvalue()
 
-    # Count by assignee
-    assignee_counts = {}
-    for p in patents:
-        assignee = p.get("assignee", "Unknown")
-        assignee_counts[assignee] = assignee_counts.get(assignee, 0) + 1
 
-    top_assignees = sorted(assignee_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+def write_report_stream(
+    title: str,
+    patents: Iterable[dict],
+    out: TextIO,
+    analysis: Optional[str] = None,
+    max_listed: int = REPORT_MAX_LISTED,
+    max_tracked_assignees: int = REPORT_MAX_TRACKED_ASSIGNEES,
+    collapse_duplicates: bool = False
+) -> int:
+    """Stream a markdown report for any iterable of patents to a file handle.
+
+    Counts, date range and top assignees are computed in a single pass and
+    only the first max_listed patents are kept for the listing, so memory
+    stays constant however many patents are streamed. Assignee counts are
+    exact until more than max_tracked_assignees distinct assignees are seen;
+    beyond that the Space-Saving algorithm keeps approximate heavy hitters.
+    With collapse_duplicates, memory instead grows with the number of
+    distinct patents: every patent number and text signature is kept to
+    detect later duplicates.
 
-    # Find date range
-    dates = [p["filing_date"] for p in patents if p.get("filing_date")]
-    date_range = f"{min(dates)} to {max(dates)}" if dates else "N/A"
+    Args:
+        title: Report title
+        patents: Any iterable of patent dictionaries (list, generator, cursor)
+        out: Writable text file handle
+        analysis: Optional analysis text to include
+        max_listed: Number of patents rendered in the Patents section
+        max_tracked_assignees: Maximum distinct assignee counters kept
+        collapse_duplicates: If True, skip patents whose number repeats an
+            earlier one, or whose title and abstract nearly match an earlier
+            one (MinHash LSH, see tools.similarity)
 
-    report = f"""# Patent Report: {title}
+    Returns:
+        Total number of patents in the report
+    """
+    timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
+
+    total = 0
+    collapsed = 0
+    min_date = None
+    max_date = None
+    assignee_counts = _SpaceSavingCounter(max_tracked_assignees)
+    listed = []
+    duplicates = SimilarityIndex(None, related=False) if collapse_duplicates else None
+    seen_numbers = set()
+
+    for p in patents:
+        if duplicates is not None:
+            # Exact repeats first: patents without text never enter the index
+            number = p.get("patent_number")
+            if number and number in seen_numbers:
+                collapsed += 1
+                continue
+            if number:
+                seen_numbers.add(number)
+            if duplicates.add(p):
+                collapsed += 1
+                continue
+        total += 1
+
+        # Count by assignee
+        assignee_counts.add(p.get("assignee", "Unknown"))
+
+        # Track date range
+        filing_date = p.get("filing_date")
+        if filing_date:
+            if min_date is None or filing_date < min_date:
+                min_date = filing_date
+            if max_date is None or filing_date > max_date:
+                max_date = filing_date
+
+        if len(listed) < max_listed:
+            listed.append(_render_report_patent(p))
+
+    top_assignees = sorted(assignee_counts.counts.items(), key=lambda x: x[1], reverse=True)[:5]
+    date_range = f"{min_date} to {max_date}" if min_date is not None else "N/A"
+    collapsed_line = f"- Near-duplicates collapsed: {collapsed}\n" if duplicates is not None else ""
+
+    out.write(f"""# Patent Report: {title}
 Generated: {timestamp}
 
 ## Summary
-- Total patents found: {len(patents)}
+- Total patents found: {total}
 - Date range: {date_range}
 - Top assignees: {', '.join([f"{a[0]} ({a[1]})" for a in top_assignees])}
-
+{collapsed_line}
 ## Patents
 
-"""
-    for p in patents[:20]:  # Limit to 20 in report
-        report += f"""### {p.get('patent_number', 'N/A')}: {p.get('title', 'Untitled')}
+""")
+    for entry in listed:
+        out.write(entry)
+
+    if analysis:
+        out.write(f"""## Analysis
+{analysis}
+""")
+
+    return total
+
+
+class _SpaceSavingCounter:
+    """Space-Saving top-k counter with a bounded number of counters.
+
+    Exact until max_counters distinct keys are seen; after that a new key
+    replaces the smallest counter and inherits its count. The smallest
+    counter is found with a min-heap whose outdated entries (counts that
+    have since grown, evicted keys) are skipped lazily, so eviction costs
+    O(log n) instead of a scan over every counter.
+    """
+
+    def __init__(self, max_counters: int):
+        self.max_counters = max_counters
+        self.counts: dict = {}
+        self._heap: list[tuple[int, int, object]] = []  # (count, seq, key)
+        self._seq = 0
+
+    def add(self, key) -> None:
+        """Count one occurrence of key."""
+        count = self.counts.get(key)
+        if count is None and len(self.counts) >= self.max_counters:
+            while True:
+                smallest, _, evicted = heapq.heappop(self._heap)
+                if self.counts.get(evicted) == smallest:
+                    break
+            del self.counts[evicted]
+            count = smallest
+        self.counts[key] = (count or 0) + 1
+        self._seq += 1
+        heapq.heappush(self._heap, (self.counts[key], self._seq, key))
+        if len(self._heap) > 2 * len(self.counts) + 64:
+            self._heap = [(c, i, k) for i, (k, c) in enumerate(self.counts.items())]
+            heapq.heapify(self._heap)
+
+
+def _render_report_patent(p: dict) -> str:
+    """Render one patent entry for the report's Patents section."""
+    return f"""### {p.get('patent_number', 'N/A')}: {p.get('title', 'Untitled')}
 - **Assignee**: {p.get('assignee', 'Unknown')}
 - **Filed**: {p.get('filing_date', 'N/A')}
 - **Abstract**: {(p.get('abstract') or 'No abstract available')[:300]}...
 
 """
-
-    if analysis:
-        report += f"""## Analysis
-{analysis}
-"""
-
-    return report
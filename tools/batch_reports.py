@@ -0,0 +1,219 @@
+"""Parallel batch generation of competitor and technology reports.
+
+Produces one markdown report per COMPETITORS entry and per TECHNOLOGIES
+keyword from a single loaded patent dataset, using a process pool so a
+nightly run scales with core count.
+
+The dataset is not pickled to every worker. It is written once to a
+newline-delimited JSON file plus an int64 offsets file; each worker
+memory-maps both when it starts, and every task only carries the row
+numbers belonging to its report. Workers decode just those rows, so the
+per-task payload is a small list of integers however large the dataset is.
+A PatentSnapshot is already such a file: rows are assigned from its
+columns and the workers map the snapshot itself.
+
+Usage:
+    from tools import generate_all_reports
+    paths = generate_all_reports(patents, output_dir="reports")
+"""
+import json
+import mmap
+import os
+import tempfile
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Iterable, Iterator, Optional, Union
+
+from tools import BENCHMARK_COMPANY
+from tools.analysis_workflow import _slugify, write_report_stream
+from tools.patent_snapshot import PatentSnapshot
+
+
+class SharedDataset:
+    """Read-only, memory-mapped patent rows shared between processes.
+
+    Usage:
+        dataset = SharedDataset.create(patents, directory)
+        for patent in dataset.rows([0, 5, 9]):
+            ...
+    """
+
+    def __init__(self, path: str):
+        """Open an existing shared dataset.
+
+        Args:
+            path: Path of the NDJSON data file (offsets live at path + ".offsets")
+        """
+        self.path = path
+        self._data = b""
+        if os.path.getsize(path):
+            with open(path, "rb") as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._offsets = array("q")
+        with open(f"{path}.offsets", "rb") as f:
+            self._offsets.frombytes(f.read())
+
+    @classmethod
+    def create(cls, patents: Iterable[dict], directory: str) -> "SharedDataset":
+        """Write patents to a shared dataset file and open it.
+
+        Args:
+            patents: Patent dictionaries
+            directory: Directory for the data and offsets files
+
+        Returns:
+            Opened SharedDataset
+        """
+        path = os.path.join(directory, "patents.ndjson")
+        offsets = array("q", [0])
+        with open(path, "wb") as f:
+            for patent in patents:
+                f.write(json.dumps(patent, default=str).encode() + b"\n")
+                offsets.append(f.tell())
+        with open(f"{path}.offsets", "wb") as f:
+            offsets.tofile(f)
+        return cls(path)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def row(self, index: int) -> dict:
+        """Decode one patent row."""
+        return json.loads(self._data[self._offsets[index]:self._offsets[index + 1]])
+
+    def rows(self, indices: Iterable[int]) -> Iterator[dict]:
+        """Lazily decode the given patent rows."""
+        for index in indices:
+            yield self.row(index)
+
+
+# Dataset opened once per worker process by _init_worker
+_worker_dataset: Optional[Union[SharedDataset, PatentSnapshot]] = None
+
+
+def _init_worker(path: str, snapshot: bool = False) -> None:
+    """Process pool initializer: map the shared dataset (or patent snapshot)."""
+    global _worker_dataset
+    _worker_dataset = PatentSnapshot(path) if snapshot else SharedDataset(path)
+
+
+def _render_report(task: tuple) -> tuple[str, int]:
+    """Render one report from shared dataset rows (runs in a worker).
+
+    Args:
+        task: (title, row indices, output path, analysis text)
+
+    Returns:
+        (output path, number of patents in the report)
+    """
+    title, indices, output_path, analysis = task
+    with open(output_path, "w") as f:
+        total = write_report_stream(title, _worker_dataset.rows(indices), f, analysis)
+    return output_path, total
+
+
+def _snapshot_rows(
+    snapshot: PatentSnapshot,
+    companies: list[str],
+    technologies: list[str]
+) -> tuple[dict[str, array], dict[str, array]]:
+    """Assign snapshot rows to reports from its columns, without decoding rows."""
+    company_rows = {c: array("q", snapshot.where(assignee=c)) for c in companies}
+    tech_rows: dict[str, array] = {t: array("q") for t in technologies}
+    keywords = [(t, t.lower()) for t in technologies]
+    texts = zip(snapshot.column("title"), snapshot.column("abstract"))
+    for index, (title, abstract) in enumerate(texts):
+        text = f"{title} {abstract}".lower()
+        for keyword, needle in keywords:
+            if needle in text:
+                tech_rows[keyword].append(index)
+    return company_rows, tech_rows
+
+
+def _benchmark_text(company: str, count: int, benchmark_count: int) -> str:
+    """Describe a competitor's patent count relative to the benchmark."""
+    if company == BENCHMARK_COMPANY:
+        return f"{BENCHMARK_COMPANY} is the benchmark company ({count} patents)."
+    if benchmark_count:
+        ratio = count / benchmark_count
+        return (
+            f"Benchmark: {count} patents vs {benchmark_count} for {BENCHMARK_COMPANY} "
+            f"({ratio:.2f}x)."
+        )
+    return f"Benchmark: {count} patents; no {BENCHMARK_COMPANY} patents in dataset."
+
+
+def generate_all_reports(
+    patents: Iterable[dict],
+    output_dir: str = "reports",
+    companies: Optional[list[str]] = None,
+    technologies: Optional[list[str]] = None,
+    workers: Optional[int] = None
+) -> dict[str, str]:
+    """Generate every competitor and technology report in parallel.
+
+    Args:
+        patents: Loaded patent dataset (any iterable; read once) or a PatentSnapshot
+        output_dir: Directory to write reports to
+        companies: Companies to report on (default: tools.COMPETITORS)
+        technologies: Keywords to report on (default: tools.TECHNOLOGIES)
+        workers: Worker processes (default: CPU count; 1 runs inline)
+
+    Returns:
+        Dictionary mapping report name (e.g., "competitor:Allegion") to file path
+    """
+    if companies is None or technologies is None:
+        from tools import COMPETITORS, TECHNOLOGIES
+        companies = COMPETITORS if companies is None else companies
+        technologies = TECHNOLOGIES if technologies is None else technologies
+
+    os.makedirs(output_dir, exist_ok=True)
+    date_str = datetime.utcnow().strftime("%Y-%m-%d")
+
+    with tempfile.TemporaryDirectory(prefix="patent-reports-") as tmp_dir:
+        # Single pass: write the shared dataset and assign rows to reports
+        company_rows: dict[str, array] = {c: array("q") for c in companies}
+        tech_rows: dict[str, array] = {t: array("q") for t in technologies}
+        is_snapshot = isinstance(patents, PatentSnapshot)
+
+        def indexed(rows: Iterable[dict]) -> Iterator[dict]:
+            for index, patent in enumerate(rows):
+                assignee = (patent.get("assignee") or "").lower()
+                for company in companies:
+                    if company.lower() in assignee:
+                        company_rows[company].append(index)
+                text = f"{patent.get('title') or ''} {patent.get('abstract') or ''}".lower()
+                for keyword in technologies:
+                    if keyword.lower() in text:
+                        tech_rows[keyword].append(index)
+                yield patent
+
+        if is_snapshot:
+            dataset = patents
+            company_rows, tech_rows = _snapshot_rows(patents, companies, technologies)
+        else:
+            dataset = SharedDataset.create(indexed(patents), tmp_dir)
+
+        benchmark_count = len(company_rows.get(BENCHMARK_COMPANY, ()))
+        tasks = {}
+        for company, rows in company_rows.items():
+            path = os.path.join(output_dir, f"{date_str}_competitor_{_slugify(company)}.md")
+            analysis = _benchmark_text(company, len(rows), benchmark_count)
+            tasks[f"competitor:{company}"] = (f"{company} Competitor Report", rows.tolist(), path, analysis)
+        for keyword, rows in tech_rows.items():
+            path = os.path.join(output_dir, f"{date_str}_technology_{_slugify(keyword)}.md")
+            tasks[f"technology:{keyword}"] = (f"{keyword} Technology Report", rows.tolist(), path, None)
+
+        workers = workers or os.cpu_count() or 1
+        if workers == 1:
+            _init_worker(dataset.path, is_snapshot)
+            results = [_render_report(task) for task in tasks.values()]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(dataset.path, is_snapshot)
+            ) as pool:
+                results = list(pool.map(_render_report, tasks.values()))
+
+    print(f"[Generated {len(results)} reports from {len(dataset)} patents in {output_dir}]")
+    return {name: path for name, (path, _) in zip(tasks, results)}
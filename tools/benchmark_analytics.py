@@ -0,0 +1,265 @@
+"""Vectorized competitive benchmark analytics.
+
+Every report compares competitors to the benchmark company (ASSA ABLOY).
+competitive_benchmark() computes those comparisons from cached patents in
+one pass: patents are encoded once into integer arrays (competitor, filing
+year, CPC group) and every metric for every competitor comes out of a few
+NumPy bincounts:
+
+- filings per competitor per year
+- compound annual growth rate (CAGR) over the year range
+- share of each competitor's filings per CPC main group
+- ratios of all of the above to the benchmark company
+
+Passing a PatentSnapshot skips row decoding entirely: the encoding is
+computed from its dictionary-encoded columns.
+
+Requires NumPy (pip install numpy).
+
+Usage:
+    rows = ResultsStore(session_dir).iter_rows("snowflake_query", 1)
+    result = competitive_benchmark(rows, start_year=2015, end_year=2024)
+    result["vs_benchmark"]["Allegion"]["filings_ratio"]
+"""
+from typing import Iterable, Optional
+
+from tools.patent_snapshot import PatentSnapshot
+from tools.trend_rollup import cpc_group, filing_year
+
+
+def _cpc_codes(patent: dict) -> list[str]:
+    """Get CPC codes from a list or the comma-separated Snowflake column."""
+    codes = patent.get("cpc_codes") or []
+    if isinstance(codes, str):
+        codes = codes.split(",")
+    return codes
+
+
+def _encode(patents: Iterable[dict], companies: list[str]) -> tuple:
+    """Encode competitor patents as parallel integer arrays.
+
+    Patents not matching any competitor (or without a filing year) are
+    skipped. An assignee matching several competitors counts for each.
+
+    Returns:
+        (company_idx, years, cpc_company_idx, cpc_years, cpc_group_idx, groups)
+        where the cpc_* arrays have one entry per (patent, distinct CPC group)
+    """
+    import numpy as np
+
+    lowered = [c.lower() for c in companies]
+    assignee_matches: dict[str, list[int]] = {}
+    group_ids: dict[str, int] = {}
+    code_groups: dict[str, Optional[int]] = {}
+
+    company_idx, years = [], []
+    cpc_company_idx, cpc_years, cpc_group_idx = [], [], []
+
+    for patent in patents:
+        assignee = patent.get("assignee") or ""
+        matches = assignee_matches.get(assignee)
+        if matches is None:
+            lower = assignee.lower()
+            matches = [i for i, c in enumerate(lowered) if c in lower]
+            assignee_matches[assignee] = matches
+        if not matches:
+            continue
+        year = filing_year(patent)
+        if year is None:
+            continue
+
+        groups = set()
+        for code in _cpc_codes(patent):
+            group_id = code_groups.get(code, -1)
+            if group_id == -1:
+                group = cpc_group(code)
+                group_id = group_ids.setdefault(group, len(group_ids)) if group else None
+                code_groups[code] = group_id
+            if group_id is not None:
+                groups.add(group_id)
+        for company in matches:
+            company_idx.append(company)
+            years.append(year)
+            for group in groups:
+                cpc_company_idx.append(company)
+                cpc_years.append(year)
+                cpc_group_idx.append(group)
+
+    return (
+        np.asarray(company_idx, dtype=np.int64),
+        np.asarray(years, dtype=np.int64),
+        np.asarray(cpc_company_idx, dtype=np.int64),
+        np.asarray(cpc_years, dtype=np.int64),
+        np.asarray(cpc_group_idx, dtype=np.int64),
+        list(group_ids),
+    )
+
+
+def _encode_snapshot(snapshot: PatentSnapshot, companies: list[str]) -> tuple:
+    """Encode a columnar snapshot like _encode(), without decoding any rows.
+
+    Competitor matching and CPC grouping run once per dictionary entry;
+    rows are then mapped with array indexing. An assignee matching several
+    competitors is handled one match "layer" at a time.
+    """
+    import numpy as np
+
+    lowered = [c.lower() for c in companies]
+    assignee_matches = [
+        [i for i, c in enumerate(lowered) if c in name.lower()]
+        for name in snapshot.dictionary("assignee")
+    ]
+    group_ids: dict[str, int] = {}
+    code_groups = np.asarray(
+        [group_ids.setdefault(g, len(group_ids)) if (g := cpc_group(code)) else -1
+         for code in snapshot.dictionary("cpc_codes")],
+        dtype=np.int64,
+    )
+
+    assignees = np.frombuffer(snapshot.column("assignee"), dtype=np.int32).astype(np.int64)
+    dates = np.frombuffer(snapshot.column("filing_date"), dtype=np.int32)
+    years = dates.astype(np.int64) // 10000
+    has_year = dates > 0
+
+    # Distinct (row, CPC group) pairs
+    list_offsets = np.frombuffer(snapshot.list_offsets("cpc_codes"), dtype=np.int64)
+    cpc_rows = np.repeat(np.arange(len(snapshot), dtype=np.int64), np.diff(list_offsets))
+    cpc_groups = code_groups[np.frombuffer(snapshot.column("cpc_codes"), dtype=np.int32)]
+    keep = cpc_groups >= 0
+    pairs = np.unique(cpc_rows[keep] * max(len(group_ids), 1) + cpc_groups[keep])
+    pair_rows, pair_groups = pairs // max(len(group_ids), 1), pairs % max(len(group_ids), 1)
+
+    parts: tuple[list, ...] = ([], [], [], [], [])
+    for layer in range(max(map(len, assignee_matches), default=0)):
+        # table[code + 1] = this layer's competitor for an assignee code (-1 = none)
+        table = np.full(len(assignee_matches) + 1, -1, dtype=np.int64)
+        for code, matches in enumerate(assignee_matches):
+            if len(matches) > layer:
+                table[code + 1] = matches[layer]
+        company = table[assignees + 1]
+        matched = (company >= 0) & has_year
+        parts[0].append(company[matched])
+        parts[1].append(years[matched])
+        pair_matched = matched[pair_rows]
+        parts[2].append(company[pair_rows[pair_matched]])
+        parts[3].append(years[pair_rows[pair_matched]])
+        parts[4].append(pair_groups[pair_matched])
+
+    arrays = [np.concatenate(p) if p else np.zeros(0, dtype=np.int64) for p in parts]
+    return (*arrays, list(group_ids))
+
+
+def _ratio(values, benchmark):
+    """Elementwise values / benchmark with NaN where the benchmark is zero."""
+    import numpy as np
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(benchmark != 0, values / benchmark, np.nan)
+
+
+def _clean(value) -> Optional[float]:
+    """Convert a NumPy scalar to a rounded float (None for NaN/inf)."""
+    import math
+
+    value = float(value)
+    return round(value, 4) if math.isfinite(value) else None
+
+
+def competitive_benchmark(
+    patents: Iterable[dict],
+    companies: Optional[list[str]] = None,
+    start_year: Optional[int] = None,
+    end_year: Optional[int] = None,
+    benchmark: Optional[str] = None
+) -> dict:
+    """Compute filing metrics for every competitor against the benchmark.
+
+    Args:
+        patents: Cached patents (any iterable; read once) or a PatentSnapshot
+        companies: Competitors to compare (default: tools.COMPETITORS)
+        start_year: First filing year (default: earliest in the data)
+        end_year: Last filing year (default: latest in the data)
+        benchmark: Benchmark company (default: ASSA ABLOY)
+
+    Returns:
+        Dictionary with:
+            years: Filing years covered
+            filings_by_year: {company: [count per year]}
+            total_filings: {company: count}
+            cagr: {company: growth rate from first to last year, or None}
+            cpc_share: {company: {cpc_group: share of filings}}, largest first
+            vs_benchmark: {company: {filings_ratio, filings_by_year_ratio,
+                cagr_delta, cpc_share_ratio}}
+    """
+    import numpy as np
+
+    if companies is None:
+        from tools import COMPETITORS
+        companies = COMPETITORS
+    if benchmark is None:
+        from tools import BENCHMARK_COMPANY
+        benchmark = BENCHMARK_COMPANY
+    companies = list(companies)
+    if benchmark not in companies:
+        companies.append(benchmark)
+    bench = companies.index(benchmark)
+
+    encode = _encode_snapshot if isinstance(patents, PatentSnapshot) else _encode
+    company_idx, years, cpc_company_idx, cpc_years, cpc_group_idx, groups = encode(patents, companies)
+
+    if start_year is None:
+        start_year = int(years.min()) if len(years) else 0
+    if end_year is None:
+        end_year = int(years.max()) if len(years) else -1
+    num_companies, num_years, num_groups = len(companies), max(0, end_year - start_year + 1), len(groups)
+
+    # Filings per (company, year) in one bincount
+    in_range = (years >= start_year) & (years <= end_year)
+    flat = company_idx[in_range] * num_years + (years[in_range] - start_year)
+    by_year = np.bincount(flat, minlength=num_companies * num_years).reshape(num_companies, num_years)
+    totals = by_year.sum(axis=1)
+
+    # CAGR from the first to the last year of the range
+    if num_years > 1:
+        first, last = by_year[:, 0].astype(float), by_year[:, -1].astype(float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cagr = np.where(first > 0, (last / first) ** (1.0 / (num_years - 1)) - 1.0, np.nan)
+    else:
+        cagr = np.full(num_companies, np.nan)
+
+    # Share of each company's filings per CPC group
+    cpc_in_range = (cpc_years >= start_year) & (cpc_years <= end_year)
+    pair_counts = np.bincount(
+        cpc_company_idx[cpc_in_range] * num_groups + cpc_group_idx[cpc_in_range],
+        minlength=num_companies * num_groups,
+    ).reshape(num_companies, num_groups)
+    shares = _ratio(pair_counts, totals[:, None].astype(float))
+
+    filings_ratio = _ratio(totals.astype(float), float(totals[bench]))
+    by_year_ratio = _ratio(by_year.astype(float), by_year[bench].astype(float))
+    share_ratio = _ratio(shares, shares[bench])
+    cagr_delta = cagr - cagr[bench]
+
+    result = {
+        "benchmark": benchmark,
+        "years": list(range(start_year, end_year + 1)),
+        "filings_by_year": {},
+        "total_filings": {},
+        "cagr": {},
+        "cpc_share": {},
+        "vs_benchmark": {},
+    }
+    for i, company in enumerate(companies):
+        order = np.argsort(-pair_counts[i], kind="stable")
+        present = [j for j in order if pair_counts[i, j]]
+        result["filings_by_year"][company] = by_year[i].tolist()
+        result["total_filings"][company] = int(totals[i])
+        result["cagr"][company] = _clean(cagr[i])
+        result["cpc_share"][company] = {groups[j]: _clean(shares[i, j]) for j in present}
+        result["vs_benchmark"][company] = {
+            "filings_ratio": _clean(filings_ratio[i]),
+            "filings_by_year_ratio": [_clean(v) for v in by_year_ratio[i]],
+            "cagr_delta": _clean(cagr_delta[i]),
+            "cpc_share_ratio": {groups[j]: _clean(share_ratio[i, j]) for j in present},
+        }
+    return result
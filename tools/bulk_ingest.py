@@ -0,0 +1,445 @@
+"""Offline bulk ingest from USPTO bulk-data XML files.
+
+USPTO publishes weekly full-text XML files (grants: ipgYYMMDD.zip,
+applications: ipaYYMMDD.zip). Backfills can load those local files
+instead of paging through the ODP API. Only local paths are accepted -
+download the files separately.
+
+Each file is a concatenation of XML documents (one <?xml ...?> per
+patent), so it is split on the XML declarations and every document is fed block
+by block to an incremental expat parser:
+
+- only the bibliographic data and abstract are parsed; the parser is
+  dropped as soon as the description/claims begin, so the bulk of every
+  document is skipped rather than parsed
+- records are mapped to the same shape as the ODP search results
+- CPC and assignee filters are applied as each record completes
+- zip archives are decompressed as a stream; nothing is extracted to disk
+
+Memory is constant per file. Matched records feed the loader pipeline
+(data_loader.stream_load_patents) in batches under the load unit
+"bulk:<file name>", journaled per file so an interrupted backfill resumes.
+With processes > 1, files are ingested in parallel worker processes.
+
+Usage:
+    python -m tools.bulk_ingest data/bulk/ --cpc E05B47 --cpc G07C9 --processes 4
+    python -m tools.bulk_ingest ipg240102.zip --assignee "ASSA ABLOY" --execute
+
+    for patent in iter_bulk_patents("ipg240102.zip", cpc_prefixes=["E05B47"]):
+        ...
+"""
+import argparse
+import io
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from html.entities import name2codepoint
+from typing import Iterable, Iterator, Optional
+from xml.parsers import expat
+
+from tools.metrics import trace
+
+
+# Document root elements holding patents (others, e.g. sequence listings, are skipped)
+BULK_ROOT_TAGS = ("us-patent-grant", "us-patent-application")
+
+# Elements after the bibliographic data and abstract; parsing stops at the first
+_STOP_TAGS = frozenset(("drawings", "description", "us-claim-statement", "claims"))
+
+# Party elements whose addressbook names are collected
+_PARTY_TAGS = {
+    "assignee": "assignees",
+    "us-applicant": "applicants",
+    "applicant": "applicants",
+    "inventor": "inventors",
+}
+
+_CPC_PARTS = ("section", "class", "subclass", "main-group", "subgroup")
+
+_DOC_ID_PARENTS = ("publication-reference", "application-reference")
+
+# Read buffer for (possibly zipped) bulk files
+_READ_BUFFER = 1 << 20
+
+_LEADING_ZEROS_RE = re.compile(r"^([A-Z]*)0+(?=\d)")
+
+# Start of every document in a bulk file
+_DOC_MARK = b"<?xml"
+
+
+class _StopParsing(Exception):
+    """Raised from a handler to abandon the rest of a document."""
+
+
+class _RecordBuilder:
+    """Collects one document's bibliographic fields from expat callbacks."""
+
+    def __init__(self):
+        self.root: Optional[str] = None
+        self.stack: list[str] = []
+        self.fields: dict[str, str] = {}
+        self.cpc_codes: list[str] = []
+        self.cpc_parts: dict[str, str] = {}
+        self.party: dict[str, str] = {}
+        self.parties: dict[str, list[str]] = {"assignees": [], "applicants": [], "inventors": []}
+        self.capture: Optional[tuple[int, str]] = None
+        self.text: list[str] = []
+        self.done = False
+        self.failed = False
+
+    def parser(self):
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.StartElementHandler = self.start
+        parser.EndElementHandler = self.end
+        parser.CharacterDataHandler = self.data
+        # Named entities (&lsquo; etc.) come from the DTD, which is never loaded
+        parser.SkippedEntityHandler = self.skipped_entity
+        return parser
+
+    def _capture_key(self, tag: str) -> Optional[str]:
+        stack = self.stack
+        if tag in ("invention-title", "abstract"):
+            return tag
+        if tag in _CPC_PARTS and stack[-2:-1] == ["classification-cpc"]:
+            return "cpc:" + tag
+        if (tag in ("orgname", "first-name", "last-name") and stack[-2:-1] == ["addressbook"]
+                and len(stack) >= 3 and stack[-3] in _PARTY_TAGS):
+            return "party:" + tag
+        if (tag in ("country", "doc-number", "kind", "date") and stack[-2:-1] == ["document-id"]
+                and len(stack) >= 3 and stack[-3] in _DOC_ID_PARENTS):
+            return f"{stack[-3]}:{tag}"
+        return None
+
+    def start(self, tag: str, attrs: dict) -> None:
+        if self.done:
+            return
+        if self.root is None:
+            self.root = tag
+            if tag not in BULK_ROOT_TAGS:
+                self.done = True
+                raise _StopParsing
+        if tag in _STOP_TAGS:
+            self.done = True
+            raise _StopParsing
+        self.stack.append(tag)
+        if self.capture is not None:
+            self.text.append(" ")  # keep words in nested elements apart
+            return
+        key = self._capture_key(tag)
+        if key is not None:
+            self.capture = (len(self.stack), key)
+            self.text = []
+
+    def end(self, tag: str) -> None:
+        if self.done:
+            return
+        if self.capture is not None and self.capture[0] == len(self.stack):
+            key = self.capture[1]
+            value = " ".join("".join(self.text).split())
+            self.capture = None
+            self.text = []
+            if key.startswith("cpc:"):
+                self.cpc_parts[key[4:]] = value
+            elif key.startswith("party:"):
+                self.party[key[6:]] = value
+            else:
+                self.fields.setdefault(key, value)
+        elif tag == "classification-cpc":
+            parts = self.cpc_parts
+            if parts.get("section") and parts.get("main-group"):
+                code = (f"{parts['section']}{parts.get('class', '')}{parts.get('subclass', '')}"
+                        f"{parts['main-group']}/{parts.get('subgroup', '00')}")
+                if code not in self.cpc_codes:
+                    self.cpc_codes.append(code)
+            self.cpc_parts = {}
+        elif tag in _PARTY_TAGS:
+            party = self.party
+            name = party.get("orgname") or " ".join(
+                filter(None, (party.get("first-name"), party.get("last-name")))
+            )
+            # Applicants only stand in for a missing assignee when they are organizations
+            if name and (_PARTY_TAGS[tag] != "applicants" or party.get("orgname")):
+                self.parties[_PARTY_TAGS[tag]].append(name)
+            self.party = {}
+
+        self.stack.pop()
+        if not self.stack:
+            self.done = True
+            raise _StopParsing
+
+    def data(self, text: str) -> None:
+        if self.capture is not None:
+            self.text.append(text)
+
+    def skipped_entity(self, name: str, is_parameter_entity: bool) -> None:
+        if self.capture is not None and name in name2codepoint:
+            self.text.append(chr(name2codepoint[name]))
+
+    def result(self) -> Optional[dict]:
+        """Build the normalized record (None for failed or non-patent documents)."""
+        if self.failed or self.root not in BULK_ROOT_TAGS:
+            return None
+        fields = self.fields
+        number = fields.get("publication-reference:doc-number")
+        if not number:
+            return None
+
+        grant = self.root == "us-patent-grant"
+        assignees = self.parties["assignees"] or self.parties["applicants"]
+        return {
+            "patent_number": (
+                fields.get("publication-reference:country", "US")
+                + _LEADING_ZEROS_RE.sub(r"\1", number)
+                + fields.get("publication-reference:kind", "")
+            ),
+            "title": fields.get("invention-title", ""),
+            "abstract": fields.get("abstract", ""),
+            "assignee": assignees[0] if assignees else "",
+            "inventors": self.parties["inventors"],
+            "filing_date": _iso_date(fields.get("application-reference:date")),
+            "grant_date": _iso_date(fields.get("publication-reference:date")) if grant else None,
+            "cpc_codes": self.cpc_codes,
+            "status_code": None,  # Not part of the bulk files
+        }
+
+
+def _iso_date(value: Optional[str]) -> Optional[str]:
+    """Convert YYYYMMDD to YYYY-MM-DD."""
+    if not value or len(value) != 8 or not value.isdigit():
+        return value or None
+    return f"{value[:4]}-{value[4:6]}-{value[6:]}"
+
+
+def _iter_documents(stream: io.BufferedIOBase, stats: dict) -> Iterator[Optional[dict]]:
+    """Split a concatenated bulk XML stream into documents and parse each.
+
+    The stream is read in large blocks. Document boundaries are found with
+    bytes.find, so the skipped remainder of each document (description,
+    claims) is never touched by the parser.
+
+    Yields:
+        One normalized record (or None if unusable) per document
+    """
+    builder = None
+    parser = None
+    pending = b""
+    while True:
+        chunk = stream.read(_READ_BUFFER)
+        data = pending + chunk
+        pending = b""
+        if chunk:
+            # Hold back a declaration split across reads ("<?x" ... "ml")
+            tail = data.rfind(b"<", max(0, len(data) - len(_DOC_MARK) + 1))
+            if tail != -1:
+                data, pending = data[:tail], data[tail:]
+
+        start = 0
+        search_from = 0
+        while True:
+            found = data.find(_DOC_MARK, search_from)
+            end = len(data) if found == -1 else found
+            if builder is not None and not builder.done and end > start:
+                try:
+                    parser.Parse(data[start:end], False)
+                except _StopParsing:
+                    pass
+                except expat.ExpatError:
+                    builder.failed = builder.done = True
+                    stats["errors"] += 1
+            if found == -1:
+                break
+            if builder is not None:
+                yield builder.result()
+            stats["documents"] += 1
+            builder = _RecordBuilder()
+            parser = builder.parser()
+            start = found
+            search_from = found + 1
+
+        if not chunk:
+            break
+    if builder is not None:
+        yield builder.result()
+
+
+def _iter_streams(path: str) -> Iterator[tuple[str, io.BufferedIOBase]]:
+    """Open the XML streams inside a bulk file (.xml, or .zip of .xml files)."""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for name in archive.namelist():
+                if name.lower().endswith(".xml"):
+                    with archive.open(name) as member:
+                        yield name, io.BufferedReader(member, _READ_BUFFER)
+    else:
+        with open(path, "rb", buffering=_READ_BUFFER) as f:
+            yield os.path.basename(path), f
+
+
+def _matches(patent: dict, cpc_prefixes: list[str], assignees: list[str]) -> bool:
+    if cpc_prefixes and not any(
+        code.replace(" ", "").upper().startswith(prefix)
+        for code in patent["cpc_codes"]
+        for prefix in cpc_prefixes
+    ):
+        return False
+    if assignees:
+        assignee = patent["assignee"].lower()
+        if not any(name in assignee for name in assignees):
+            return False
+    return True
+
+
+def iter_bulk_patents(
+    path: str,
+    cpc_prefixes: Optional[list[str]] = None,
+    assignees: Optional[list[str]] = None,
+    stats: Optional[dict] = None
+) -> Iterator[dict]:
+    """Stream normalized patents from one local bulk XML file.
+
+    Args:
+        path: Local .xml or .zip bulk file
+        cpc_prefixes: Keep patents with a CPC code starting with any of these
+            (e.g., ["E05B47", "G07C9"])
+        assignees: Keep patents whose assignee contains any of these
+            (case-insensitive)
+        stats: Optional dict updated with documents, matched and errors counts
+
+    Yields:
+        Patent dictionaries in the shape of the ODP search results
+    """
+    stats = stats if stats is not None else {}
+    for counter in ("documents", "matched", "errors"):
+        stats.setdefault(counter, 0)
+    prefixes = [p.replace(" ", "").upper() for p in cpc_prefixes or []]
+    names = [a.lower() for a in assignees or []]
+
+    for _, stream in _iter_streams(path):
+        for patent in _iter_documents(stream, stats):
+            if patent is not None and _matches(patent, prefixes, names):
+                stats["matched"] += 1
+                yield patent
+
+
+def bulk_files(paths: Iterable[str]) -> list[str]:
+    """Expand local files and directories into the bulk files to ingest.
+
+    Raises:
+        ValueError: For URLs (bulk ingest runs against local files only)
+        FileNotFoundError: For missing paths
+    """
+    files = []
+    for path in paths:
+        if re.match(r"^[a-z][a-z0-9+.-]*://", path, re.IGNORECASE):
+            raise ValueError(f"Bulk ingest reads local files only, got URL: {path}")
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.lower().endswith((".xml", ".zip"))
+            )
+        elif os.path.exists(path):
+            files.append(path)
+        else:
+            raise FileNotFoundError(path)
+    return files
+
+
+def ingest_bulk_file(
+    path: str,
+    cpc_prefixes: Optional[list[str]] = None,
+    assignees: Optional[list[str]] = None,
+    execute: bool = False,
+    resume: bool = True
+) -> int:
+    """Ingest one bulk file through the loader pipeline.
+
+    Args:
+        path: Local .xml or .zip bulk file
+        cpc_prefixes: CPC code prefixes to keep (default: all)
+        assignees: Assignee substrings to keep (default: all)
+        execute: If True, execute SQL via snow CLI
+        resume: If True (and executing), resume from and record to a per-file journal
+
+    Returns:
+        Number of patents loaded
+    """
+    from tools.data_loader import _finish_journal, stream_load_patents
+    from tools.load_journal import LoadJournal, journal_path
+
+    name = os.path.basename(path)
+    journal = None
+    if execute and resume:
+        journal = LoadJournal(journal_path(f"bulk_{name}"))
+
+    stats: dict = {}
+    with trace("bulk_xml", name) as span:
+        count = stream_load_patents(
+            iter_bulk_patents(path, cpc_prefixes, assignees, stats), name, "bulk", execute, journal
+        )
+        span.rows = count
+        span.bytes = os.path.getsize(path)
+    _finish_journal(journal)
+
+    print(f"[Bulk ingest {name}: {stats.get('documents', 0)} documents, "
+          f"{stats.get('matched', 0)} matched, {stats.get('errors', 0)} unparseable, {count} loaded]")
+    return count
+
+
+def ingest_bulk_files(
+    paths: Iterable[str],
+    cpc_prefixes: Optional[list[str]] = None,
+    assignees: Optional[list[str]] = None,
+    execute: bool = False,
+    resume: bool = True,
+    processes: int = 1
+) -> dict[str, int]:
+    """Ingest local bulk XML files (or directories of them).
+
+    Args:
+        paths: Local .xml/.zip files or directories containing them
+        cpc_prefixes: CPC code prefixes to keep (default: all)
+        assignees: Assignee substrings to keep (default: all)
+        execute: If True, execute SQL via snow CLI
+        resume: If True (and executing), journal each file for resume
+        processes: Number of worker processes (files are split across them)
+
+    Returns:
+        Dictionary mapping file path to number of patents loaded
+    """
+    files = bulk_files(paths)
+    args = (cpc_prefixes, assignees, execute, resume)
+    if processes <= 1 or len(files) <= 1:
+        results = {path: ingest_bulk_file(path, *args) for path in files}
+    else:
+        with ProcessPoolExecutor(max_workers=min(processes, len(files))) as pool:
+            futures = {path: pool.submit(ingest_bulk_file, path, *args) for path in files}
+            results = {path: future.result() for path, future in futures.items()}
+
+    print(f"\n[Total]: Loaded {sum(results.values())} patents from {len(files)} bulk files")
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Ingest local USPTO bulk XML files")
+    parser.add_argument("paths", nargs="+", help="Bulk .xml/.zip files or directories")
+    parser.add_argument("--cpc", action="append", help="CPC prefix to keep (repeatable)")
+    parser.add_argument("--assignee", action="append", help="Assignee substring to keep (repeatable)")
+    parser.add_argument("--execute", action="store_true", help="Execute SQL via snow CLI")
+    parser.add_argument("--no-resume", action="store_true", help="Don't journal for resume")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes")
+    args = parser.parse_args(argv)
+
+    try:
+        ingest_bulk_files(args.paths, args.cpc, args.assignee, args.execute,
+                          not args.no_resume, args.processes)
+    except (ValueError, FileNotFoundError) as e:
+        print(f"[Bulk ingest error: {e}]")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,340 @@
+"""Citation graph over patents.publications citation arrays.
+
+search_by_cpc(..., include_citations=True) returns each patent's backward
+citations. CitationGraph stores the resulting edges compactly:
+
+- publication numbers are interned to dense integer ids (one string each)
+- edges are kept as compressed sparse row (CSR) arrays in both directions,
+  so "cites" and "cited by" lookups are slices, at 8 bytes per edge
+- assignees are kept for ingested patents (cited-only nodes have none)
+
+Millions of edges fit in tens of megabytes, and k-hop neighborhoods,
+in/out-degrees and most-cited rankings never touch the network.
+
+The graph is saved as flat binary arrays:
+
+    data/citation_graph/
+    ├── ids.txt            # publication number per node id
+    ├── assignees.json     # {node id: assignee} for ingested patents
+    ├── sources.json       # node ids whose citations were ingested
+    ├── out_offsets.bin    # CSR: node -> patents it cites
+    ├── out_targets.bin
+    ├── in_offsets.bin     # CSR: node -> patents citing it
+    └── in_targets.bin
+
+Usage:
+    graph = ingest_cpc_citations(["E05B47", "G07C9"], limit=5000)
+    graph.most_cited(assignee_filter="ASSA ABLOY", k=10)
+    graph.k_hop("US10000000B2", k=2)
+    graph.save()
+"""
+import heapq
+import json
+import os
+from array import array
+from collections import deque
+from typing import Iterable, Optional
+
+
+# Default directory for the saved citation graph
+DEFAULT_GRAPH_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "citation_graph"
+)
+
+
+def _build_csr(num_nodes: int, sources: array, targets: array) -> tuple[array, array]:
+    """Build CSR offsets/targets from parallel edge arrays (counting sort).
+
+    Uses NumPy when installed; the pure-Python path gives identical arrays.
+    """
+    try:
+        import numpy as np
+    except ImportError:  # optional dependency
+        np = None
+    if np is not None:
+        src = np.frombuffer(sources, dtype=np.int32) if len(sources) else np.zeros(0, np.int32)
+        tgt = np.frombuffer(targets, dtype=np.int32) if len(targets) else np.zeros(0, np.int32)
+        counts = np.bincount(src, minlength=num_nodes)
+        offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        ordered = tgt[np.argsort(src, kind="stable")]
+        return array("q", offsets.tobytes()), array("i", ordered.astype(np.int32).tobytes())
+
+    offsets = array("q", bytes(8 * (num_nodes + 1)))
+    for source in sources:
+        offsets[source + 1] += 1
+    for i in range(num_nodes):
+        offsets[i + 1] += offsets[i]
+
+    cursor = array("q", offsets[:-1])
+    ordered = array("i", bytes(4 * len(targets)))
+    for source, target in zip(sources, targets):
+        ordered[cursor[source]] = target
+        cursor[source] += 1
+    return offsets, ordered
+
+
+class CitationGraph:
+    """Citation graph with interned ids and CSR adjacency in both directions.
+
+    Usage:
+        graph = CitationGraph()
+        graph.add_patents(search_by_cpc("E05B47", include_citations=True))
+        graph.in_degree("US10000000B2")
+    """
+
+    def __init__(self):
+        self._ids: list[str] = []
+        self._index: dict[str, int] = {}
+        self._assignees: dict[int, str] = {}
+
+        # Edges added since the last CSR build
+        self._sources = array("i")
+        self._targets = array("i")
+        self._seen_sources: set[int] = set()
+
+        self._out_offsets = array("q", [0])
+        self._out_targets = array("i")
+        self._in_offsets = array("q", [0])
+        self._in_targets = array("i")
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, patent_number: str) -> bool:
+        return patent_number in self._index
+
+    @property
+    def num_edges(self) -> int:
+        """Number of citation edges."""
+        self._build()
+        return len(self._out_targets)
+
+    def _intern(self, patent_number: str) -> int:
+        node = self._index.get(patent_number)
+        if node is None:
+            node = len(self._ids)
+            self._index[patent_number] = node
+            self._ids.append(patent_number)
+        return node
+
+    def add_patent(self, patent: dict) -> None:
+        """Add a patent and its backward citations.
+
+        A patent's citations are only taken the first time it is added, so
+        re-ingesting overlapping CPC searches does not duplicate edges.
+
+        Args:
+            patent: Patent dict with patent_number, assignee and citations
+        """
+        patent_number = patent.get("patent_number")
+        if not patent_number:
+            return
+        node = self._intern(patent_number)
+        if patent.get("assignee"):
+            self._assignees[node] = patent["assignee"]
+        if node in self._seen_sources:
+            return
+        self._seen_sources.add(node)
+
+        for cited in dict.fromkeys(patent.get("citations") or ()):
+            if cited and cited != patent_number:
+                self._sources.append(node)
+                self._targets.append(self._intern(cited))
+                self._dirty = True
+
+    def add_patents(self, patents: Iterable[dict]) -> None:
+        """Add patents and their backward citations."""
+        for patent in patents:
+            self.add_patent(patent)
+
+    def _build(self) -> None:
+        """Fold pending edges into the CSR arrays."""
+        if not self._dirty and len(self._out_offsets) == len(self._ids) + 1:
+            return
+        sources = array("i")
+        for node in range(len(self._out_offsets) - 1):
+            sources.extend(array("i", [node]) * (self._out_offsets[node + 1] - self._out_offsets[node]))
+        targets = array("i", self._out_targets)
+        sources.extend(self._sources)
+        targets.extend(self._targets)
+
+        num_nodes = len(self._ids)
+        self._out_offsets, self._out_targets = _build_csr(num_nodes, sources, targets)
+        self._in_offsets, self._in_targets = _build_csr(num_nodes, targets, sources)
+        self._sources = array("i")
+        self._targets = array("i")
+        self._dirty = False
+
+    def _neighbors(self, node: int, direction: str) -> array:
+        if direction == "out":
+            return self._out_targets[self._out_offsets[node]:self._out_offsets[node + 1]]
+        return self._in_targets[self._in_offsets[node]:self._in_offsets[node + 1]]
+
+    def cites(self, patent_number: str) -> list[str]:
+        """Publication numbers a patent cites (backward citations)."""
+        self._build()
+        node = self._index.get(patent_number)
+        return [] if node is None else [self._ids[n] for n in self._neighbors(node, "out")]
+
+    def cited_by(self, patent_number: str) -> list[str]:
+        """Ingested patents that cite a patent (forward citations)."""
+        self._build()
+        node = self._index.get(patent_number)
+        return [] if node is None else [self._ids[n] for n in self._neighbors(node, "in")]
+
+    def out_degree(self, patent_number: str) -> int:
+        """Number of patents a patent cites."""
+        self._build()
+        node = self._index.get(patent_number)
+        return 0 if node is None else self._out_offsets[node + 1] - self._out_offsets[node]
+
+    def in_degree(self, patent_number: str) -> int:
+        """Number of ingested patents citing a patent."""
+        self._build()
+        node = self._index.get(patent_number)
+        return 0 if node is None else self._in_offsets[node + 1] - self._in_offsets[node]
+
+    def k_hop(self, patent_number: str, k: int = 2, direction: str = "both") -> dict[str, int]:
+        """Find every patent within k citation hops.
+
+        Args:
+            patent_number: Starting patent
+            k: Maximum number of hops
+            direction: "out" (cites), "in" (cited by) or "both"
+
+        Returns:
+            Dictionary mapping publication number to hop distance (excluding the start)
+        """
+        if direction not in ("out", "in", "both"):
+            raise ValueError(f"Unknown direction: {direction}")
+        self._build()
+        start = self._index.get(patent_number)
+        if start is None:
+            return {}
+
+        directions = ("out", "in") if direction == "both" else (direction,)
+        distance = {start: 0}
+        frontier = deque([start])
+        while frontier:
+            node = frontier.popleft()
+            if distance[node] == k:
+                continue
+            for d in directions:
+                for neighbor in self._neighbors(node, d):
+                    if neighbor not in distance:
+                        distance[neighbor] = distance[node] + 1
+                        frontier.append(neighbor)
+        del distance[start]
+        return {self._ids[node]: hops for node, hops in distance.items()}
+
+    def most_cited(
+        self,
+        assignee_filter: Optional[str] = None,
+        k: int = 10
+    ) -> list[tuple[str, Optional[str], int]]:
+        """Rank patents by forward citations within the graph.
+
+        Args:
+            assignee_filter: Only rank patents whose assignee contains this
+                text (case-insensitive), e.g. a competitor name
+            k: Number of results
+
+        Returns:
+            List of (publication number, assignee, in-degree), most cited first
+        """
+        self._build()
+        if assignee_filter:
+            needle = assignee_filter.lower()
+            nodes = [node for node, name in self._assignees.items() if needle in name.lower()]
+        else:
+            nodes = range(len(self._ids))
+
+        offsets = self._in_offsets
+        top = heapq.nlargest(k, nodes, key=lambda node: (offsets[node + 1] - offsets[node], -node))
+        return [
+            (self._ids[node], self._assignees.get(node), offsets[node + 1] - offsets[node])
+            for node in top
+            if offsets[node + 1] - offsets[node]
+        ]
+
+    def save(self, directory: str = DEFAULT_GRAPH_DIR) -> None:
+        """Write the graph as flat binary arrays.
+
+        Args:
+            directory: Output directory
+        """
+        self._build()
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "ids.txt"), "w") as f:
+            f.write("\n".join(self._ids))
+        with open(os.path.join(directory, "assignees.json"), "w") as f:
+            json.dump({str(node): name for node, name in self._assignees.items()}, f)
+        with open(os.path.join(directory, "sources.json"), "w") as f:
+            json.dump(sorted(self._seen_sources), f)
+        for name in ("out_offsets", "out_targets", "in_offsets", "in_targets"):
+            with open(os.path.join(directory, f"{name}.bin"), "wb") as f:
+                getattr(self, f"_{name}").tofile(f)
+
+    @classmethod
+    def load(cls, directory: str = DEFAULT_GRAPH_DIR) -> "CitationGraph":
+        """Load a graph written by save().
+
+        Args:
+            directory: Directory holding the graph files
+
+        Returns:
+            CitationGraph (empty if the directory doesn't exist)
+        """
+        graph = cls()
+        ids_path = os.path.join(directory, "ids.txt")
+        if not os.path.exists(ids_path):
+            return graph
+
+        with open(ids_path) as f:
+            text = f.read()
+        graph._ids = text.split("\n") if text else []
+        graph._index = {pn: node for node, pn in enumerate(graph._ids)}
+        with open(os.path.join(directory, "assignees.json")) as f:
+            graph._assignees = {int(node): name for node, name in json.load(f).items()}
+        with open(os.path.join(directory, "sources.json")) as f:
+            graph._seen_sources = set(json.load(f))
+
+        num_nodes = len(graph._ids)
+        for name, typecode in (("out_offsets", "q"), ("out_targets", "i"),
+                               ("in_offsets", "q"), ("in_targets", "i")):
+            path = os.path.join(directory, f"{name}.bin")
+            values = array(typecode)
+            with open(path, "rb") as f:
+                values.fromfile(f, os.path.getsize(path) // values.itemsize)
+            setattr(graph, f"_{name}", values)
+        if len(graph._out_offsets) != num_nodes + 1:
+            raise ValueError(f"Corrupt citation graph in {directory}")
+        return graph
+
+
+def ingest_cpc_citations(
+    cpc_codes: Iterable[str],
+    limit: int = 1000,
+    graph: Optional[CitationGraph] = None,
+    **search_kwargs
+) -> CitationGraph:
+    """Fetch patents with citations for CPC codes and add them to a graph.
+
+    Args:
+        cpc_codes: CPC code prefixes (e.g., ["E05B47", "G07C9"])
+        limit: Maximum patents per CPC code
+        graph: Graph to extend (default: a new graph)
+        **search_kwargs: Extra search_by_cpc arguments (e.g., min_grant_date)
+
+    Returns:
+        The citation graph
+    """
+    from tools.patent_search import search_by_cpc
+
+    graph = graph if graph is not None else CitationGraph()
+    for code in cpc_codes:
+        patents = search_by_cpc(code, limit, include_citations=True, **search_kwargs)
+        graph.add_patents(patents)
+    print(f"[Citation graph: {len(graph)} patents, {graph.num_edges} citations]")
+    return graph
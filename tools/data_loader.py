@@ -2,110 +2,487 @@
 
 This module provides functions to fetch patents from the USPTO API
 and generate SQL statements to load them into Snowflake.
+
+Loads stream through a staged pipeline (fetch -> normalize/dedupe -> batch/write)
+so fetching and writing overlap and memory stays bounded. Executed bulk loads
+are journaled (see tools.load_journal) so an interrupted run resumes where it
+stopped instead of refetching everything. Once the known-patents index is
+synced (see tools.known_patents), executed loads INSERT patents it says are
+definitely new instead of MERGEing them.
 """
+import contextvars
+import queue
 import subprocess
-from typing import Optional
-
-from tools.snowflake_queries import build_upsert_query
-from tools.patent_search import search_by_assignee, search_by_title
-
-
-def load_competitor_patents(company: str, limit: int = 50, execute: bool = False) -> list[str]:
+import threading
+from typing import Callable, Iterable, Iterator, Optional
+
+from tools.snowflake_queries import (
+    build_insert_query,
+    build_upsert_query,
+    build_rollup_upsert_query,
+    build_rollup_backfill_query,
+    TREND_ROLLUP_TABLE,
+    TREND_MEMBERS_TABLE,
+)
+from tools.patent_search import SearchError, search_by_assignee, search_by_title
+from tools.known_patents import get_known_patents
+from tools.load_journal import LoadJournal, journal_path
+from tools.metrics import trace
+from tools.session_replay import ReplayMissError, run_command
+from tools.similarity import get_similarity_index
+from tools.trend_rollup import get_local_rollup
+
+
+# Patents requested per API page
+PAGE_SIZE = 100
+
+# Upsert statements sent per snow CLI call
+UPSERT_BATCH_SIZE = 10
+
+# Maximum items buffered between pipeline stages
+PIPELINE_QUEUE_SIZE = 2 * PAGE_SIZE
+
+# End-of-stream marker passed between pipeline stages
+_END = object()
+
+
+def load_competitor_patents(
+    company: str,
+    limit: int = 50,
+    execute: bool = False,
+    journal: Optional[LoadJournal] = None
+) -> list[str]:
     """Fetch patents for a company and generate Snowflake upsert SQL.
 
     Args:
         company: Company name to search for
         limit: Maximum patents to fetch
         execute: If True, execute SQL via snow CLI (requires snow to be configured)
+        journal: Optional journal to resume from and record progress in
 
     Returns:
-        List of SQL statements generated
+        List of SQL statements generated (each upserts one patent and
+        updates the trend rollup)
     """
-    patents = search_by_assignee(company, limit)
     sql_statements = []
-
-    for patent in patents:
-        if patent.get("patent_number"):
-            sql = build_upsert_query(patent, company, "competitor")
-            sql_statements.append(sql)
-
-            if execute:
-                _execute_snowflake_sql(sql)
+    stream_load(
+        search_by_assignee, company, "competitor", limit, execute, journal,
+        on_statement=sql_statements.append,
+    )
 
     print(f"[{company}]: Generated {len(sql_statements)} upsert statements")
     return sql_statements
 
 
-def load_technology_patents(keywords: str, limit: int = 50, execute: bool = False) -> list[str]:
+def load_technology_patents(
+    keywords: str,
+    limit: int = 50,
+    execute: bool = False,
+    journal: Optional[LoadJournal] = None
+) -> list[str]:
     """Fetch patents by technology keywords and generate Snowflake upsert SQL.
 
     Args:
         keywords: Technology keywords to search
         limit: Maximum patents to fetch
         execute: If True, execute SQL via snow CLI
+        journal: Optional journal to resume from and record progress in
 
     Returns:
         List of SQL statements generated
     """
-    patents = search_by_title(keywords, limit)
     sql_statements = []
-
-    for patent in patents:
-        if patent.get("patent_number"):
-            sql = build_upsert_query(patent, keywords, "technology")
-            sql_statements.append(sql)
-
-            if execute:
-                _execute_snowflake_sql(sql)
+    stream_load(
+        search_by_title, keywords, "technology", limit, execute, journal,
+        on_statement=sql_statements.append,
+    )
 
     print(f"[{keywords}]: Generated {len(sql_statements)} upsert statements")
     return sql_statements
 
 
-def load_all_competitors(limit_per_company: int = 50, execute: bool = False) -> dict[str, int]:
+def load_all_competitors(
+    limit_per_company: int = 50,
+    execute: bool = False,
+    resume: bool = True
+) -> dict[str, int]:
     """Load patents for all tracked competitors.
 
+    When executing, progress is journaled under data/journals/ so a rerun
+    after a failure resumes at the first unfetched page or uncommitted batch.
+
     Args:
         limit_per_company: Maximum patents per competitor
         execute: If True, execute SQL via snow CLI
+        resume: If True (and executing), resume from and record to the run journal
 
     Returns:
         Dictionary mapping company name to number of patents loaded
     """
     from tools import COMPETITORS
 
+    journal = None
+    if execute and resume:
+        journal = LoadJournal(journal_path(f"competitors_{limit_per_company}"))
+
     results = {}
+    failed = False
     for company in COMPETITORS:
-        statements = load_competitor_patents(company, limit_per_company, execute)
-        results[company] = len(statements)
+        try:
+            results[company] = stream_load(
+                search_by_assignee, company, "competitor", limit_per_company, execute, journal
+            )
+        except SearchError as e:
+            print(f"[{company}]: {e} - skipped")
+            results[company] = 0
+            failed = True
+            continue
+        print(f"[{company}]: Generated {results[company]} upsert statements")
+
+    _finish_journal(journal, failed)
 
     total = sum(results.values())
     print(f"\n[Total]: Generated {total} upsert statements for {len(COMPETITORS)} competitors")
     return results
 
 
-def load_all_technologies(limit_per_tech: int = 20, execute: bool = False) -> dict[str, int]:
+def load_all_technologies(
+    limit_per_tech: int = 20,
+    execute: bool = False,
+    resume: bool = True
+) -> dict[str, int]:
     """Load patents for all tracked technology keywords.
 
     Args:
         limit_per_tech: Maximum patents per technology
         execute: If True, execute SQL via snow CLI
+        resume: If True (and executing), resume from and record to the run journal
 
     Returns:
         Dictionary mapping technology to number of patents loaded
     """
     from tools import TECHNOLOGIES
 
+    journal = None
+    if execute and resume:
+        journal = LoadJournal(journal_path(f"technologies_{limit_per_tech}"))
+
     results = {}
+    failed = False
     for tech in TECHNOLOGIES:
-        statements = load_technology_patents(tech, limit_per_tech, execute)
-        results[tech] = len(statements)
+        try:
+            results[tech] = stream_load(
+                search_by_title, tech, "technology", limit_per_tech, execute, journal
+            )
+        except SearchError as e:
+            print(f"[{tech}]: {e} - skipped")
+            results[tech] = 0
+            failed = True
+            continue
+        print(f"[{tech}]: Generated {results[tech]} upsert statements")
+
+    _finish_journal(journal, failed)
 
     total = sum(results.values())
     print(f"\n[Total]: Generated {total} upsert statements for {len(TECHNOLOGIES)} technologies")
     return results
 
 
+def stream_load(
+    search_fn: Callable[..., list[dict]],
+    query: str,
+    category: str,
+    limit: int = 50,
+    execute: bool = False,
+    journal: Optional[LoadJournal] = None,
+    on_statement: Optional[Callable[[str], None]] = None
+) -> int:
+    """Stream patents from search to Snowflake through a staged pipeline.
+
+    Pages are fetched lazily by the pipeline's fetch stage (see
+    stream_load_patents), reusing journaled pages when resuming.
+
+    Args:
+        search_fn: search_by_assignee or search_by_title
+        query: Company name or keywords
+        category: Category label ("competitor" or "technology")
+        limit: Maximum patents to fetch
+        execute: If True, execute SQL via snow CLI in batches
+        journal: Optional journal to resume from and record progress in
+        on_statement: Optional callback receiving each generated SQL statement
+
+    Returns:
+        Number of upsert statements generated
+
+    Raises:
+        SearchError: If executing or journaling and a page could not be
+            fetched from any source (dry runs fall back to sample data)
+    """
+    key = f"{category}:{query}"
+    strict = execute or journal is not None
+    return stream_load_patents(
+        _iter_pages(search_fn, query, limit, journal, key, strict),
+        query, category, execute, journal, on_statement,
+    )
+
+
+def stream_load_patents(
+    patents: Iterable[dict],
+    query: str,
+    category: str,
+    execute: bool = False,
+    journal: Optional[LoadJournal] = None,
+    on_statement: Optional[Callable[[str], None]] = None
+) -> int:
+    """Stream patents from any source to Snowflake through a staged pipeline.
+
+    Stages run on their own threads, connected by bounded queues:
+
+        fetch (iterate patents) -> normalize/dedupe/SQL -> batch/write
+
+    so the next patents are fetched while earlier batches are being written
+    and at most PIPELINE_QUEUE_SIZE items are buffered between any two stages.
+
+    Args:
+        patents: Patent dictionaries (consumed lazily on the fetch thread)
+        query: Search query recorded with each patent (also names the load unit)
+        category: Category label (e.g., "competitor", "technology", "bulk")
+        execute: If True, execute SQL via snow CLI in batches
+        journal: Optional journal to resume from and record progress in
+        on_statement: Optional callback receiving each generated SQL statement
+
+    Returns:
+        Number of upsert statements generated
+    """
+    key = f"{category}:{query}"
+    if journal and journal.is_done(key) and on_statement is None:
+        return journal.done_count(key)
+    execute = execute and not (journal and journal.is_done(key))
+
+    known = get_known_patents() if execute else None
+    insert_new = known is not None and known.synced
+
+    patents_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    statements_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    stop = threading.Event()
+    errors = []
+    result = {"count": 0, "committed": True}
+
+    def run_stage(stage: Callable[[], None], downstream: Optional[queue.Queue]) -> None:
+        try:
+            stage()
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            if downstream is not None:
+                _put(downstream, _END, stop, force=True)
+
+    def fetch() -> None:
+        for patent in patents:
+            if not _put(patents_q, patent, stop):
+                return
+
+    def transform() -> None:
+        seen = set()
+        while True:
+            patent = _get(patents_q, stop)
+            if patent is _END:
+                return
+            patent_number = patent.get("patent_number")
+            if not patent_number or patent_number in seen:
+                continue
+            seen.add(patent_number)
+            if insert_new and not known.contains(patent_number):
+                sql = build_insert_query(patent, query, category)
+            else:
+                sql = build_upsert_query(patent, query, category)
+            sql += build_rollup_upsert_query(patent)
+            if not _put(statements_q, (patent, sql), stop):
+                return
+
+    def write() -> None:
+        batch = []
+        batch_num = 0
+        while True:
+            item = _get(statements_q, stop)
+            if item is not _END:
+                result["count"] += 1
+                if on_statement:
+                    on_statement(item[1])
+                batch.append(item)
+            if batch and (item is _END or len(batch) >= UPSERT_BATCH_SIZE):
+                # A short batch cut off by a failed stage is written but not
+                # journaled: a resumed run refills this batch number with more
+                # patents, which a committed mark would skip
+                cut_short = item is _END and stop.is_set()
+                if execute and not _write_batch(batch, batch_num, None if cut_short else journal, key):
+                    result["committed"] = False
+                batch = []
+                batch_num += 1
+            if item is _END:
+                return
+
+    with trace("loader", key) as span:
+        # Each stage runs in a copy of this context so it sees the session recorder
+        threads = [
+            threading.Thread(target=contextvars.copy_context().run, args=(run_stage, *stage), daemon=True)
+            for stage in ((fetch, patents_q), (transform, statements_q), (write, None))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        span.rows = result["count"]
+        if errors:
+            raise errors[0]
+
+    if execute and journal and result["committed"]:
+        journal.mark_done(key, result["count"])
+    return result["count"]
+
+
+def _iter_pages(
+    search_fn: Callable[..., list[dict]],
+    query: str,
+    limit: int,
+    journal: Optional[LoadJournal],
+    key: str,
+    strict: bool = False
+) -> Iterator[dict]:
+    """Yield up to limit patents page by page, reusing journaled pages.
+
+    Strict pages (executed or journaled loads) never fall back to sample
+    data: a failed search raises SearchError instead of looking like the
+    last page, and is never journaled, so the unit is not marked complete
+    and a rerun fetches the page again.
+
+    Args:
+        search_fn: search_by_assignee or search_by_title
+        query: Company name or keywords
+        limit: Maximum patents to fetch
+        journal: Optional run journal
+        key: Journal key for this load unit
+        strict: If True, request pages strictly (see above)
+
+    Yields:
+        Patent dictionaries in result order
+
+    Raises:
+        SearchError: If strict and every source failed for a page
+    """
+    if journal and journal.pages_complete(key):
+        yield from journal.fetched_patents(key)[:limit]
+        return
+
+    page_size = min(limit, PAGE_SIZE)
+    fetched = 0
+    page = 0
+    while fetched < limit:
+        results = journal.get_page(key, page) if journal else None
+        if results is None:
+            # Always a full page, so offsets stay on page boundaries
+            results = search_fn(query, page_size, fetched, strict=strict)
+            if journal:
+                journal.record_page(key, page, results)
+        for patent in results[:limit - fetched]:
+            yield patent
+        fetched += len(results)
+        page += 1
+        if len(results) < page_size:
+            break
+
+    if journal:
+        journal.mark_pages_complete(key)
+
+
+def _write_batch(
+    batch: list[tuple],
+    batch_num: int,
+    journal: Optional[LoadJournal],
+    key: str
+) -> bool:
+    """Execute one upsert batch unless the journal says it is committed.
+
+    A failed batch is left uncommitted so the next run retries it.
+
+    Args:
+        batch: List of (patent, sql) pairs
+        batch_num: Batch index within the load unit
+        journal: Optional run journal
+        key: Journal key for this load unit
+
+    Returns:
+        True if the batch is committed
+    """
+    if journal and journal.batch_committed(key, batch_num):
+        return True
+
+    # Known before executing, so a retry of a partly applied batch MERGEs
+    # instead of inserting twice; the cached copies are added on commit
+    known = get_known_patents()
+    known.add_numbers(patent["patent_number"] for patent, _ in batch)
+    if _execute_snowflake_sql("\n".join(sql for _, sql in batch)) is None:
+        return False
+
+    for patent, _ in batch:
+        get_local_rollup().apply(patent)
+    get_similarity_index().add_many(patent for patent, _ in batch)
+    known.add_many(patent for patent, _ in batch)
+    if journal:
+        journal.record_batch(key, batch_num, len(batch))
+    return True
+
+
+def _put(q: queue.Queue, item: object, stop: threading.Event, force: bool = False) -> bool:
+    """Put onto a bounded queue, giving up if the pipeline is stopping.
+
+    Args:
+        q: Destination queue
+        item: Item to enqueue
+        stop: Event set when any stage fails
+        force: Keep trying even when stopping (used for end markers)
+
+    Returns:
+        True if the item was enqueued
+    """
+    while True:
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            if stop.is_set():
+                if not force:
+                    return False
+                # Downstream has stopped reading; drop buffered items to make room
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+def _get(q: queue.Queue, stop: threading.Event) -> object:
+    """Get from a queue, returning the end marker if the pipeline is stopping."""
+    while True:
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            if stop.is_set():
+                return _END
+
+
+def _finish_journal(journal: Optional[LoadJournal], failed: bool = False) -> None:
+    """Delete the journal if every unit finished, otherwise keep it for resume."""
+    if journal is None:
+        return
+    if not failed and all(journal.is_done(key) for key in journal.keys()):
+        journal.complete()
+    else:
+        print(f"[Load incomplete - rerun to resume from {journal.path}]")
+        journal.close()
+
+
 def _execute_snowflake_sql(sql: str) -> Optional[str]:
     """Execute SQL statement via snow CLI.
 
@@ -115,23 +492,26 @@ def _execute_snowflake_sql(sql: str) -> Optional[str]:
     Returns:
         Command output or None on failure
     """
-    try:
-        result = subprocess.run(
-            ["snow", "sql", "-q", sql],
-            capture_output=True,
-            text=True,
-            timeout=60
-        )
-        if result.returncode != 0:
-            print(f"[Snowflake error]: {result.stderr}")
+    with trace("snowflake", sql.strip()) as span:
+        try:
+            result = run_command("snowflake", ["snow", "sql", "-q", sql], timeout=60)
+            if result.returncode != 0:
+                span.error = result.stderr[:200]
+                print(f"[Snowflake error]: {result.stderr}")
+                return None
+            return result.stdout
+        except subprocess.TimeoutExpired:
+            span.error = "timeout"
+            print("[Snowflake timeout]")
+            return None
+        except FileNotFoundError:
+            span.error = "snow CLI not found"
+            print("[snow CLI not found - install with: pip install snowflake-cli]")
+            return None
+        except ReplayMissError as e:
+            span.error = str(e)
+            print(f"[Snowflake replay miss: {e}]")
             return None
-        return result.stdout
-    except subprocess.TimeoutExpired:
-        print("[Snowflake timeout]")
-        return None
-    except FileNotFoundError:
-        print("[snow CLI not found - install with: pip install snowflake-cli]")
-        return None
 
 
 def get_create_table_sql() -> str:
@@ -156,3 +536,33 @@ CREATE TABLE IF NOT EXISTS SNOWFLAKE_LEARNING_DB.PATENT_INTELLIGENCE.PATENTS (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP()
 );
 """
+
+
+def get_create_rollup_tables_sql() -> str:
+    """Get SQL to create the trend rollup tables and backfill them.
+
+    The backfill counts patents cached before the rollup existed, so
+    get_trends_query() can read the rollup right away. Re-running it only
+    adds patents that have no membership rows yet.
+
+    Returns:
+        CREATE TABLE SQL statements for the rollup and its membership table,
+        followed by the backfill from PATENTS
+    """
+    return f"""
+CREATE TABLE IF NOT EXISTS {TREND_ROLLUP_TABLE} (
+    assignee VARCHAR,
+    year INTEGER,
+    bucket VARCHAR,
+    patent_count INTEGER,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP(),
+    PRIMARY KEY (assignee, year, bucket)
+);
+
+CREATE TABLE IF NOT EXISTS {TREND_MEMBERS_TABLE} (
+    patent_number VARCHAR,
+    assignee VARCHAR,
+    year INTEGER,
+    bucket VARCHAR
+);
+""" + build_rollup_backfill_query()
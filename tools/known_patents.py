@@ -0,0 +1,412 @@
+"""Bloom filter of patent numbers already cached in Snowflake.
+
+Loaders can't tell cheaply whether a patent is already in
+PATENT_INTELLIGENCE.PATENTS, so every write is a MERGE against the table
+and every get_patent() goes to the APIs. KnownPatents tracks the cached
+patent numbers locally:
+
+- A Bloom filter (a few bits per patent) answers "definitely not cached"
+  with no lookup at all.
+- An exact SQLite index confirms positives and holds the cached copy of
+  each patent, so a definitely-cached get_patent() is served locally.
+
+Loaders record each batch's patent numbers before executing it and the
+patents themselves once it commits, so a retried batch is never treated as
+new. Once the index has been synced from Snowflake (sync_from_snowflake()),
+executed loads write definitely-new patents with a plain INSERT instead of
+a MERGE. Other machines may load into the same table, so a sync only
+counts for SYNC_MAX_AGE_HOURS; after that loads MERGE again until the next
+sync (e.g., a daily `python -m tools.known_patents sync`).
+
+The filter is a memory-mapped file updated in place, bit by bit, and
+grows (rebuilt from the exact index) when it passes its capacity. Bits are
+written before the index commits, and a filter whose count doesn't match
+the index is rebuilt on open, so a crash can't make a cached patent look
+new.
+
+State lives in:
+
+    data/known_patents.db          exact index
+    data/known_patents.db.bloom    Bloom filter
+
+Usage:
+    known = get_known_patents()
+    known.sync_from_snowflake()            # seed from the PATENTS table
+    known.might_contain("US9792747B2")     # Bloom filter only
+    known.contains("US9792747B2")          # exact
+    known.get("US9792747B2")               # cached patent dict or None
+
+    python -m tools.known_patents sync
+"""
+import argparse
+import hashlib
+import json
+import math
+import mmap
+import os
+import sqlite3
+import struct
+import subprocess
+import threading
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from tools.snowflake_queries import is_cache_stale
+
+
+# Default location of the exact index (the Bloom filter lives at path + ".bloom")
+DEFAULT_KNOWN_PATENTS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "known_patents.db"
+)
+
+PATENTS_TABLE = "SNOWFLAKE_LEARNING_DB.PATENT_INTELLIGENCE.PATENTS"
+
+# Initial filter capacity and target false-positive rate (~9.6 bits per patent)
+BLOOM_CAPACITY = 100_000
+BLOOM_FALSE_POSITIVE_RATE = 0.01
+
+# A sync older than this no longer vouches for "definitely new"
+SYNC_MAX_AGE_HOURS = 24
+
+BLOOM_MAGIC = b"PATBLOOM"
+
+# Magic, bit count, hash count, capacity, patent count
+_BLOOM_HEADER = struct.Struct("<8sQQQQ")
+
+
+def _bloom_size(capacity: int, false_positive_rate: float) -> tuple[int, int]:
+    """Get (bits, hashes) for a filter holding capacity items at the given rate."""
+    bits = math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+    bits = (bits + 7) // 8 * 8
+    return bits, max(1, round(bits / capacity * math.log(2)))
+
+
+def _hashes(patent_number: str) -> tuple[int, int]:
+    """Get the two base hashes of a patent number (double hashing)."""
+    digest = hashlib.blake2b(patent_number.encode(), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+def _positions(bit_count: int, hash_count: int, patent_number: str) -> Iterable[int]:
+    """Get the filter bit positions of a patent number."""
+    h1, h2 = _hashes(patent_number)
+    return ((h1 + i * h2) % bit_count for i in range(hash_count))
+
+
+def _set_bits(bits, bit_count: int, hash_count: int, patent_number: str) -> None:
+    """Set a patent number's bits in a filter buffer (header included)."""
+    offset = _BLOOM_HEADER.size
+    for position in _positions(bit_count, hash_count, patent_number):
+        bits[offset + (position >> 3)] |= 1 << (position & 7)
+
+
+class KnownPatents:
+    """Bloom filter plus exact index of patent numbers cached in Snowflake.
+
+    Usage:
+        known = KnownPatents(None)                 # in memory (tests, benchmarks)
+        known.add_many(patents)
+        known.contains("US9792747B2")
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = DEFAULT_KNOWN_PATENTS_PATH,
+        capacity: int = BLOOM_CAPACITY,
+        false_positive_rate: float = BLOOM_FALSE_POSITIVE_RATE
+    ):
+        """Open (or create) the index and its filter.
+
+        Args:
+            path: SQLite index path (None keeps everything in memory)
+            capacity: Initial filter capacity (the filter grows past it)
+            false_positive_rate: Target false-positive rate at capacity
+        """
+        if path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.false_positive_rate = false_positive_rate
+        # Guards the filter: reads wait while _add() grows and swaps it
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS known_patents (
+                patent_number TEXT PRIMARY KEY,
+                patent TEXT,
+                updated_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS known_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+        self.conn.commit()
+        self._file = None
+        self._bits = None
+        count = self.conn.execute("SELECT COUNT(*) FROM known_patents").fetchone()[0]
+        if not self._open_filter(count):
+            # Missing, damaged or out of step with the index: rebuild it
+            self._rebuild(max(capacity, 2 * count))
+
+    # -- Bloom filter ----------------------------------------------------
+
+    @property
+    def _bloom_path(self) -> Optional[str]:
+        return f"{self.path}.bloom" if self.path else None
+
+    def _open_filter(self, count: int) -> bool:
+        """Map an existing filter file if it matches the index."""
+        path = self._bloom_path
+        if path is None or not os.path.exists(path) or os.path.getsize(path) < _BLOOM_HEADER.size:
+            return False
+        f = open(path, "r+b")
+        bits = mmap.mmap(f.fileno(), 0)
+        magic, size, hashes, capacity, stored = _BLOOM_HEADER.unpack_from(bits, 0)
+        if magic != BLOOM_MAGIC or stored != count or len(bits) != _BLOOM_HEADER.size + size // 8:
+            bits.close()
+            f.close()
+            return False
+        self._file, self._bits = f, bits
+        self.bit_count, self.hash_count, self.capacity, self.count = size, hashes, capacity, stored
+        return True
+
+    def _rebuild(self, capacity: int) -> None:
+        """Create a filter for capacity patents, fill it from the index and swap it in.
+
+        The new filter is built off to the side (in memory, then written to
+        a temporary file), so the current one stays valid until the swap.
+        """
+        bit_count, hash_count = _bloom_size(capacity, self.false_positive_rate)
+        bits = bytearray(_BLOOM_HEADER.size + bit_count // 8)
+        count = 0
+        for (patent_number,) in self.conn.execute("SELECT patent_number FROM known_patents"):
+            _set_bits(bits, bit_count, hash_count, patent_number)
+            count += 1
+        _BLOOM_HEADER.pack_into(bits, 0, BLOOM_MAGIC, bit_count, hash_count, capacity, count)
+
+        file = None
+        if self._bloom_path is not None:
+            tmp_path = f"{self._bloom_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(bits)
+            os.replace(tmp_path, self._bloom_path)
+            file = open(self._bloom_path, "r+b")
+            bits = mmap.mmap(file.fileno(), 0)
+
+        with self._lock:
+            self.close_filter()
+            self._file, self._bits = file, bits
+            self.bit_count, self.hash_count, self.capacity, self.count = bit_count, hash_count, capacity, count
+
+    def _write_header(self) -> None:
+        _BLOOM_HEADER.pack_into(self._bits, 0, BLOOM_MAGIC, self.bit_count, self.hash_count,
+                                self.capacity, self.count)
+        if isinstance(self._bits, mmap.mmap):
+            self._bits.flush()
+
+    def might_contain(self, patent_number: str) -> bool:
+        """Check the Bloom filter only.
+
+        Returns:
+            False if the patent is definitely not cached; True if it may be
+        """
+        offset = _BLOOM_HEADER.size
+        with self._lock:
+            bits = self._bits
+            return all(bits[offset + (p >> 3)] >> (p & 7) & 1
+                       for p in _positions(self.bit_count, self.hash_count, patent_number))
+
+    def close_filter(self) -> None:
+        """Unmap the filter file."""
+        if isinstance(self._bits, mmap.mmap):
+            self._bits.close()
+        if self._file is not None:
+            self._file.close()
+        self._file = self._bits = None
+
+    # -- Exact index -----------------------------------------------------
+
+    def contains(self, patent_number: str) -> bool:
+        """Check whether a patent is cached (Bloom pre-check, exact confirm)."""
+        if not patent_number:
+            return False
+        with self._lock:
+            if not self.might_contain(patent_number):
+                return False
+            return self.conn.execute(
+                "SELECT 1 FROM known_patents WHERE patent_number = ?", (patent_number,)
+            ).fetchone() is not None
+
+    def get(self, patent_number: str, max_age_days: Optional[int] = None) -> Optional[dict]:
+        """Get the cached copy of a patent.
+
+        Args:
+            patent_number: Publication number
+            max_age_days: Treat copies older than this as missing
+                (default: CACHE_STALE_DAYS)
+
+        Returns:
+            Patent dictionary, or None if not cached, stale or seeded without data
+        """
+        if not patent_number:
+            return None
+        with self._lock:
+            if not self.might_contain(patent_number):
+                return None
+            row = self.conn.execute(
+                "SELECT patent, updated_at FROM known_patents WHERE patent_number = ?", (patent_number,)
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        updated_at = datetime.fromisoformat(row[1])
+        if is_cache_stale(updated_at) if max_age_days is None else is_cache_stale(updated_at, max_age_days):
+            return None
+        return json.loads(row[0])
+
+    def add_many(self, patents: Iterable[dict]) -> int:
+        """Record patents as cached (after their upserts committed).
+
+        Args:
+            patents: Patent dictionaries
+
+        Returns:
+            Number of patents not known before
+        """
+        # Local time, as is_cache_stale() expects
+        now = datetime.now().isoformat()
+        rows = [(p["patent_number"], json.dumps(p, default=str), now)
+                for p in patents if p.get("patent_number")]
+        return self._add(rows)
+
+    def add_numbers(self, patent_numbers: Iterable[str]) -> int:
+        """Record patent numbers as cached without a local copy (e.g., from a sync)."""
+        now = datetime.now().isoformat()
+        return self._add([(n, None, now) for n in patent_numbers if n])
+
+    def _add(self, rows: list[tuple]) -> int:
+        """Set filter bits, then commit the rows to the exact index."""
+        rows = list({row[0]: row for row in rows}.values())
+        with self._lock:
+            new = [row for row in rows if not self.contains(row[0])]
+            grow = self.count + len(new) > self.capacity
+            if not grow:
+                for patent_number, _, _ in new:
+                    _set_bits(self._bits, self.bit_count, self.hash_count, patent_number)
+                self.count += len(new)
+                self._write_header()
+            # Rows without a copy (from a sync) must not drop a copy we already hold
+            self.conn.executemany(
+                "INSERT INTO known_patents (patent_number, patent, updated_at) VALUES (?1, ?2, ?3)"
+                " ON CONFLICT (patent_number) DO UPDATE SET"
+                " patent = COALESCE(?2, patent), updated_at = ?3",
+                rows,
+            )
+            self.conn.commit()
+            if grow:
+                # Readers wait on the lock until the grown filter is swapped in.
+                # A header count that doesn't match the index forces a rebuild
+                # on open, so a crash before this point is safe too
+                self._rebuild(2 * (self.count + len(new)))
+        return len(new)
+
+    # -- Snowflake sync --------------------------------------------------
+
+    @property
+    def synced(self) -> bool:
+        """True if the index was seeded from the Snowflake table within SYNC_MAX_AGE_HOURS.
+
+        Older syncs may miss patents other writers have loaded since, so
+        loads go back to MERGE until the next sync.
+        """
+        synced_at = self.synced_at
+        if synced_at is None:
+            return False
+        return datetime.utcnow() - datetime.fromisoformat(synced_at) <= timedelta(hours=SYNC_MAX_AGE_HOURS)
+
+    @property
+    def synced_at(self) -> Optional[str]:
+        """When the index was last seeded from Snowflake (ISO timestamp)."""
+        row = self.conn.execute("SELECT value FROM known_meta WHERE key = 'synced_at'").fetchone()
+        return row[0] if row else None
+
+    def mark_synced(self) -> None:
+        """Record that the index now covers every patent in the PATENTS table."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO known_meta (key, value) VALUES ('synced_at', ?)",
+            (datetime.utcnow().isoformat(),),
+        )
+        self.conn.commit()
+
+    def sync_from_snowflake(self) -> int:
+        """Seed the index with every patent number in the PATENTS table.
+
+        Returns:
+            Number of patents not known before, or -1 if the query failed
+        """
+        from tools.session_replay import ReplayMissError, run_command
+
+        sql = f"SELECT patent_number FROM {PATENTS_TABLE}"
+        try:
+            result = run_command("snowflake", ["snow", "sql", "-q", sql, "--format", "json"], timeout=300)
+        except (subprocess.TimeoutExpired, FileNotFoundError, ReplayMissError) as e:
+            print(f"[Known patents: sync failed: {e}]")
+            return -1
+        if result.returncode != 0:
+            print(f"[Known patents: sync failed: {result.stderr[:200]}]")
+            return -1
+        try:
+            rows = json.loads(result.stdout or "[]")
+        except json.JSONDecodeError:
+            print("[Known patents: sync failed: unexpected snow output]")
+            return -1
+
+        added = self.add_numbers(
+            row.get("PATENT_NUMBER") or row.get("patent_number") for row in rows if isinstance(row, dict)
+        )
+        self.mark_synced()
+        print(f"[Known patents: synced {len(rows)} patents from Snowflake ({added} new)]")
+        return added
+
+    def stats(self) -> dict:
+        """Get filter size and its expected false-positive rate."""
+        load = self.count / self.bit_count
+        return {
+            "patents": self.count,
+            "bits_per_patent": round(self.bit_count / max(self.count, 1), 2),
+            "hashes": self.hash_count,
+            "false_positive_rate": round((1 - math.exp(-self.hash_count * load)) ** self.hash_count, 6),
+            "synced_at": self.synced_at,
+        }
+
+    def close(self) -> None:
+        """Close the filter and the index."""
+        self.close_filter()
+        self.conn.close()
+
+
+_known_patents: Optional[KnownPatents] = None
+
+
+def get_known_patents() -> KnownPatents:
+    """Get the shared known-patents index at DEFAULT_KNOWN_PATENTS_PATH."""
+    global _known_patents
+    if _known_patents is None:
+        _known_patents = KnownPatents()
+    return _known_patents
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Manage the known-patents Bloom filter")
+    parser.add_argument("command", choices=("sync", "stats"))
+    args = parser.parse_args(argv)
+
+    known = get_known_patents()
+    if args.command == "sync" and known.sync_from_snowflake() < 0:
+        return 1
+    print(json.dumps(known.stats()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
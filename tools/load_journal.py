@@ -0,0 +1,173 @@
+"""Durable journal for resumable bulk loads.
+
+Bulk loads (load_all_competitors / load_all_technologies with execute=True)
+can run for hours. The journal is an append-only JSON-lines file that records
+each fetched result page and each committed upsert batch, flushed and fsynced
+as it is written. Rerunning the same load replays the journal: pages already
+fetched are not requested again and batches already committed are skipped,
+so a crash only loses the work in flight.
+
+Journal events (one JSON object per line):
+    {"event": "page", "key": "competitor:Allegion", "page": 0, "patents": [...]}
+    {"event": "pages_done", "key": "competitor:Allegion"}
+    {"event": "batch", "key": "competitor:Allegion", "batch": 0, "count": 10}
+    {"event": "done", "key": "competitor:Allegion", "count": 50}
+
+Usage:
+    journal = LoadJournal("data/journals/competitors_50.jsonl")
+    if not journal.is_done(key):
+        ...
+    journal.complete()  # removes the journal once the whole run finished
+"""
+import json
+import os
+from typing import Optional
+
+
+# Default directory for loader journals
+DEFAULT_JOURNAL_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "journals"
+)
+
+
+class LoadJournal:
+    """Append-only, fsynced record of loader progress.
+
+    Usage:
+        journal = LoadJournal(path)
+        journal.record_page(key, 0, patents)
+        journal.record_batch(key, 0, 10)
+        journal.mark_done(key, 10)
+    """
+
+    def __init__(self, path: str):
+        """Open a journal, replaying any events already recorded.
+
+        Args:
+            path: Path to the JSON-lines journal file
+        """
+        self.path = path
+        self._pages: dict[str, dict[int, list[dict]]] = {}
+        self._pages_done: set[str] = set()
+        self._batches: dict[str, set[int]] = {}
+        self._done: dict[str, int] = {}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if os.path.exists(path):
+            self._replay()
+        self._file = open(path, "a")
+
+    def _replay(self) -> None:
+        """Rebuild in-memory state from the journal file."""
+        valid_bytes = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn final write from a crash - everything before it is valid
+                    break
+                self._apply(entry)
+                valid_bytes += len(line)
+
+        if valid_bytes < os.path.getsize(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_bytes)
+
+        if self._done or self._pages:
+            print(
+                f"[Resuming load from journal: {len(self._done)} complete, "
+                f"{len(self._pages) - len(self._done)} partial]"
+            )
+
+    def _apply(self, entry: dict) -> None:
+        """Apply one journal event to in-memory state."""
+        key = entry.get("key")
+        event = entry.get("event")
+        if event == "page":
+            self._pages.setdefault(key, {})[entry["page"]] = entry["patents"]
+        elif event == "pages_done":
+            self._pages_done.add(key)
+        elif event == "batch":
+            self._batches.setdefault(key, set()).add(entry["batch"])
+        elif event == "done":
+            self._done[key] = entry.get("count", 0)
+
+    def _append(self, entry: dict) -> None:
+        """Durably append one event to the journal."""
+        self._file.write(json.dumps(entry, default=str) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._apply(entry)
+
+    def keys(self) -> list[str]:
+        """Get every load unit the journal has seen."""
+        return sorted(set(self._pages) | set(self._batches) | set(self._done))
+
+    def get_page(self, key: str, page: int) -> Optional[list[dict]]:
+        """Get a previously fetched page, or None if it was not recorded."""
+        return self._pages.get(key, {}).get(page)
+
+    def record_page(self, key: str, page: int, patents: list[dict]) -> None:
+        """Record a fetched result page."""
+        self._append({"event": "page", "key": key, "page": page, "patents": patents})
+
+    def pages_complete(self, key: str) -> bool:
+        """Check whether all pages for a load unit were fetched."""
+        return key in self._pages_done
+
+    def mark_pages_complete(self, key: str) -> None:
+        """Record that no more pages need fetching for a load unit."""
+        self._append({"event": "pages_done", "key": key})
+
+    def fetched_patents(self, key: str) -> list[dict]:
+        """Get all recorded patents for a load unit, in page order."""
+        pages = self._pages.get(key, {})
+        patents = []
+        for page in sorted(pages):
+            patents.extend(pages[page])
+        return patents
+
+    def batch_committed(self, key: str, batch: int) -> bool:
+        """Check whether an upsert batch was already committed."""
+        return batch in self._batches.get(key, set())
+
+    def record_batch(self, key: str, batch: int, count: int) -> None:
+        """Record a committed upsert batch."""
+        self._append({"event": "batch", "key": key, "batch": batch, "count": count})
+
+    def is_done(self, key: str) -> bool:
+        """Check whether a load unit finished completely."""
+        return key in self._done
+
+    def done_count(self, key: str) -> int:
+        """Get the statement count recorded for a finished load unit."""
+        return self._done.get(key, 0)
+
+    def mark_done(self, key: str, count: int) -> None:
+        """Record that a load unit finished."""
+        self._append({"event": "done", "key": key, "count": count})
+
+    def close(self) -> None:
+        """Close the journal file, keeping it for a later resume."""
+        if not self._file.closed:
+            self._file.close()
+
+    def complete(self) -> None:
+        """Close and delete the journal after the whole run succeeded."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def journal_path(run_name: str, journal_dir: str = DEFAULT_JOURNAL_DIR) -> str:
+    """Get the journal path for a named loader run.
+
+    Args:
+        run_name: Stable name for the run (e.g., "competitors_50")
+        journal_dir: Directory holding journals
+
+    Returns:
+        Path to the run's journal file
+    """
+    return os.path.join(journal_dir, f"{run_name}.jsonl")
@@ -0,0 +1,285 @@
+"""Lightweight tracing and latency metrics for patent data sources.
+
+Every source call (USPTO ODP, Google Patents, BigQuery, Snowflake, sample
+data, loader runs) is recorded as a span:
+
+    source, query, latency, bytes, rows, fallback taken, cache hit, error
+
+Spans are aggregated per source into fixed-bucket latency histograms and
+counters that can be exported as JSON or Prometheus text. AnalysisWorkflow
+activates a per-session registry for its context (see
+activate_session_registry) and writes its summary into metadata.json;
+concurrent sessions in other threads or tasks don't see each other's spans.
+
+Usage:
+    with trace("uspto", query) as span:
+        body = http_get(...)
+        span.rows = len(results)
+
+    print(get_registry().export_prometheus())
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Iterator, Optional
+
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Recent spans kept for inspection
+MAX_RECENT_SPANS = 1000
+
+
+@dataclass
+class Span:
+    """One traced source call."""
+
+    source: str
+    query: str = ""
+    started_at: float = field(default_factory=time.time)
+    latency: float = 0.0
+    bytes: int = 0
+    rows: int = 0
+    fallback: bool = False
+    cache_hit: bool = False
+    error: Optional[str] = None
+
+
+class _SourceStats:
+    """Counters and latency histogram for one source."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.fallbacks = 0
+        self.cache_hits = 0
+        self.bytes = 0
+        self.rows = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def add(self, span: Span) -> None:
+        self.calls += 1
+        self.errors += span.error is not None
+        self.fallbacks += span.fallback
+        self.cache_hits += span.cache_hit
+        self.bytes += span.bytes
+        self.rows += span.rows
+        self.latency_sum += span.latency
+        self.latency_max = max(self.latency_max, span.latency)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if span.latency <= bound:
+                self.bucket_counts[i] += 1
+                break
+        else:
+            self.bucket_counts[-1] += 1
+
+    def percentile(self, q: float) -> float:
+        """Estimate a latency percentile from the histogram (bucket upper bound)."""
+        if not self.calls:
+            return 0.0
+        target = q * self.calls
+        seen = 0
+        for i, count in enumerate(self.bucket_counts):
+            seen += count
+            if seen >= target:
+                return LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else self.latency_max
+        return self.latency_max
+
+    def summary(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "fallbacks": self.fallbacks,
+            "cache_hits": self.cache_hits,
+            "bytes": self.bytes,
+            "rows": self.rows,
+            "latency_avg": round(self.latency_sum / self.calls, 6) if self.calls else 0.0,
+            "latency_max": round(self.latency_max, 6),
+            "latency_p50": self.percentile(0.50),
+            "latency_p95": self.percentile(0.95),
+            "latency_p99": self.percentile(0.99),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe aggregation of spans by source.
+
+    Usage:
+        registry = MetricsRegistry()
+        registry.record(span)
+        registry.summary()
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: dict[str, _SourceStats] = {}
+        self._recent: deque = deque(maxlen=MAX_RECENT_SPANS)
+        self._listeners: list[Callable[[Span], None]] = []
+
+    def record(self, span: Span) -> None:
+        """Add a finished span and forward it to listeners."""
+        with self._lock:
+            self._stats.setdefault(span.source, _SourceStats()).add(span)
+            self._recent.append(span)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(span)
+
+    def add_listener(self, listener: Callable[[Span], None]) -> None:
+        """Receive every span recorded from now on (e.g., another registry's record)."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Span], None]) -> None:
+        """Stop forwarding spans to a listener."""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def recent_spans(self) -> list[dict]:
+        """Get the most recent spans as dicts."""
+        with self._lock:
+            return [asdict(span) for span in self._recent]
+
+    def summary(self) -> dict:
+        """Get per-source counters and latency percentiles."""
+        with self._lock:
+            return {source: stats.summary() for source, stats in sorted(self._stats.items())}
+
+    def export_json(self) -> dict:
+        """Export summary plus raw histograms as a JSON-serializable dict."""
+        with self._lock:
+            return {
+                "buckets": list(LATENCY_BUCKETS),
+                "sources": {
+                    source: {**stats.summary(), "bucket_counts": list(stats.bucket_counts)}
+                    for source, stats in sorted(self._stats.items())
+                },
+            }
+
+    def export_prometheus(self, prefix: str = "patent_source") -> str:
+        """Export metrics in the Prometheus text exposition format."""
+        lines = [
+            f"# TYPE {prefix}_latency_seconds histogram",
+        ]
+        counters = ("calls", "errors", "fallbacks", "cache_hits", "bytes", "rows")
+        with self._lock:
+            items = sorted(self._stats.items())
+            for source, stats in items:
+                label = f'source="{source}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, stats.bucket_counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_latency_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_latency_seconds_bucket{{{label},le="+Inf"}} {stats.calls}')
+                lines.append(f"{prefix}_latency_seconds_sum{{{label}}} {stats.latency_sum:.6f}")
+                lines.append(f"{prefix}_latency_seconds_count{{{label}}} {stats.calls}")
+            for name in counters:
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                for source, stats in items:
+                    lines.append(f'{prefix}_{name}_total{{source="{source}"}} {getattr(stats, name)}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Clear all recorded metrics."""
+        with self._lock:
+            self._stats.clear()
+            self._recent.clear()
+
+
+_registry = MetricsRegistry()
+_current = threading.local()
+
+# Registry of the analysis session the current context belongs to
+_session_registry: contextvars.ContextVar[Optional[MetricsRegistry]] = contextvars.ContextVar(
+    "session_registry", default=None
+)
+
+
+def get_registry() -> MetricsRegistry:
+    """Get the process-wide metrics registry."""
+    return _registry
+
+
+def activate_session_registry(registry: MetricsRegistry) -> contextvars.Token:
+    """Also record spans traced in the current context into registry.
+
+    Returns:
+        Token to pass to deactivate_session_registry()
+    """
+    return _session_registry.set(registry)
+
+
+def deactivate_session_registry(registry: MetricsRegistry, token: contextvars.Token) -> None:
+    """Restore the session registry that was active before activate_session_registry().
+
+    Does nothing if another registry has been activated since.
+    """
+    if _session_registry.get() is not registry:
+        return
+    try:
+        _session_registry.reset(token)
+    except ValueError:  # Deactivated from another context
+        _session_registry.set(None)
+
+
+def current_span() -> Optional[Span]:
+    """Get the innermost span active on this thread, if any."""
+    stack = getattr(_current, "stack", None)
+    return stack[-1] if stack else None
+
+
+def add_bytes(count: int) -> None:
+    """Attribute transferred bytes to the active span on this thread."""
+    span = current_span()
+    if span is not None:
+        span.bytes += count
+
+
+def mark_cache_hit() -> None:
+    """Mark the active span on this thread as served from a cache."""
+    span = current_span()
+    if span is not None:
+        span.cache_hit = True
+
+
+@contextmanager
+def trace(source: str, query: str = "", fallback: bool = False) -> Iterator[Span]:
+    """Trace one source call.
+
+    The span's latency is measured automatically and any exception is
+    recorded as an error before being re-raised. Set span.rows (and
+    anything else known) inside the block.
+
+    Args:
+        source: Source name (e.g., "uspto", "google_patents", "bigquery")
+        query: Query text or identifier (truncated to 200 chars)
+        fallback: True if this call is a fallback from a failed source
+
+    Yields:
+        The Span being recorded
+    """
+    span = Span(source=source, query=query[:200], fallback=fallback)
+    stack = getattr(_current, "stack", None)
+    if stack is None:
+        stack = _current.stack = []
+    stack.append(span)
+    start = time.perf_counter()
+    try:
+        yield span
+    except Exception as e:
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        span.latency = time.perf_counter() - start
+        stack.pop()
+        _registry.record(span)
+        session = _session_registry.get()
+        if session is not None:
+            session.record(span)
@@ -2,7 +2,13 @@
 
 Primary source: USPTO ODP API (api.uspto.gov) - requires API key
 Fallback: Google Patents API (rate-limited, no key required)
-Last resort: Sample data for demos
+Last resort: Sample data for demos (disabled with PATENT_AGENT_MODE=production)
+
+The source order per query type comes from tools.source_router (static by
+default; set PATENT_AGENT_ROUTE_POLICY=fastest or cheapest_within_sla to
+route on observed latency, failure rate and cost). get_patent() serves
+patents already cached in Snowflake from the local known-patents index
+(tools.known_patents) before trying any source.
 
 API key should be set in environment variable USPTO_API_KEY or .env file.
 
@@ -39,17 +45,45 @@ For authoritative competitive analysis, prefer:
 """
 import json
 import os
+import subprocess
+import time
+import urllib.error
 import urllib.parse
-import urllib.request
-from typing import Optional
+from typing import Callable, Optional
+
+from tools.known_patents import get_known_patents
+from tools.metrics import trace
+from tools.session_replay import http_get, is_replaying, run_command
+from tools.single_flight import coalesce
+from tools.source_router import get_router, production_mode
 
 
 # USPTO Open Data Portal API
 USPTO_ODP_API = "https://api.uspto.gov/api/v1/patent/applications/search"
 
+# Local .env file with API keys
+ENV_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env")
+
+# Source names (router/metrics) as shown in messages
+SOURCE_LABELS = {
+    "uspto": "USPTO API",
+    "google_patents": "Google Patents",
+}
+
 # Google Patents API (fallback)
 GOOGLE_PATENTS_API = "https://patents.google.com/xhr/query"
 
+# Largest page the USPTO and Google Patents APIs return
+MAX_PAGE_SIZE = 100
+
+
+class SearchError(Exception):
+    """Raised by strict searches when every source failed.
+
+    Distinguishes a failed search from one that has no (more) results, so
+    paged loads don't mistake throttling for the end of the results.
+    """
+
 # Sample data for demo when APIs are unavailable
 SAMPLE_PATENTS = {
     "assa abloy": [
@@ -125,76 +159,134 @@ def _get_api_key() -> Optional[str]:
         return api_key
 
     # Try loading from .env file
-    env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env")
-    if os.path.exists(env_path):
-        with open(env_path) as f:
-            for line in f:
-                if line.startswith("USPTO_API_KEY="):
-                    return line.strip().split("=", 1)[1]
+    return _read_env_file(ENV_FILE_PATH).get("USPTO_API_KEY")
+
+
+# Parsed .env files, keyed by path: (mtime, values)
+_env_cache: dict[str, tuple[float, dict]] = {}
 
-    return None
 
+def _read_env_file(path: str) -> dict:
+    """Parse a .env file, re-reading it only when it changes.
 
-def search_by_assignee(company: str, limit: int = 50) -> list[dict]:
+    Args:
+        path: Path to the .env file
+
+    Returns:
+        Dictionary of KEY=value entries (empty if the file doesn't exist)
+    """
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return {}
+
+    cached = _env_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    values = {}
+    with open(path) as f:
+        for line in f:
+            if "=" in line and not line.lstrip().startswith("#"):
+                key, value = line.strip().split("=", 1)
+                values[key] = value
+    _env_cache[path] = (mtime, values)
+    return values
+
+
+@coalesce
+def search_by_assignee(
+    company: str,
+    limit: int = 50,
+    offset: int = 0,
+    newest_first: bool = False,
+    strict: bool = False
+) -> list[dict]:
     """Search patents by assignee/company name.
 
     Args:
         company: Company name to search for (e.g., "Allegion", "Dormakaba")
         limit: Maximum number of results to return
+        offset: Number of results to skip (for paging; a multiple of limit
+            for Google Patents)
+        newest_first: If True, order results by publication date, newest first
+        strict: If True, raise SearchError when every source failed and
+            never fall back to sample data
 
     Returns:
-        List of patent dictionaries
-    """
-    # Try USPTO ODP API first (primary source)
-    results = _search_uspto_odp(company, limit)
-    if results:
-        return results
+        List of patent dictionaries (empty if there are no more results)
 
-    # Fallback to Google Patents
-    print(f"[USPTO API unavailable, trying Google Patents for '{company}']")
-    query = f"assignee={company}"
-    results = _search_google_patents(query, limit)
+    Raises:
+        SearchError: If strict and no source could answer
+    """
+    page = _page_index(offset, limit)
+    results = _route("assignee", company, {
+        "uspto": lambda: _search_uspto_odp(company, limit, offset, newest_first),
+        "google_patents": lambda: None if page is None else _search_google_patents(
+            f"assignee={company}", limit, page, newest_first),
+    })
     if results:
         return results
+    if strict:
+        return _strict_empty(results, company)
 
     # Last resort: sample data for demos
-    results = _get_sample_data(company.lower(), limit)
-    return results
+    return _sample_fallback(company.lower(), limit, offset, newest_first)
 
 
-def search_by_title(keywords: str, limit: int = 50) -> list[dict]:
+@coalesce
+def search_by_title(
+    keywords: str,
+    limit: int = 50,
+    offset: int = 0,
+    newest_first: bool = False,
+    strict: bool = False
+) -> list[dict]:
     """Search patents by title keywords.
 
     Args:
         keywords: Keywords to search in patent titles (e.g., "smart lock")
         limit: Maximum number of results to return
+        offset: Number of results to skip (for paging; a multiple of limit
+            for Google Patents)
+        newest_first: If True, order results by publication date, newest first
+        strict: If True, raise SearchError when every source failed and
+            never fall back to sample data
 
     Returns:
-        List of patent dictionaries
-    """
-    # Try USPTO ODP API first (primary source)
-    results = _search_uspto_odp(keywords, limit)
-    if results:
-        return results
+        List of patent dictionaries (empty if there are no more results)
 
-    # Fallback to Google Patents
-    print(f"[USPTO API unavailable, trying Google Patents for '{keywords}']")
-    query = f"({keywords})"
-    results = _search_google_patents(query, limit)
+    Raises:
+        SearchError: If strict and no source could answer
+    """
+    page = _page_index(offset, limit)
+    results = _route("title", keywords, {
+        "uspto": lambda: _search_uspto_odp(keywords, limit, offset, newest_first),
+        "google_patents": lambda: None if page is None else _search_google_patents(
+            f"({keywords})", limit, page, newest_first),
+    })
     if results:
         return results
+    if strict:
+        return _strict_empty(results, keywords)
 
     # Last resort: sample data for demos
-    results = _get_sample_data(keywords.lower(), limit)
-    return results
+    return _sample_fallback(keywords.lower(), limit, offset, newest_first)
 
 
+@coalesce
 def search_by_cpc(
     cpc_code: str,
     limit: int = 50,
     country: str = "US",
     min_grant_date: Optional[str] = None,
-    assignee_filter: Optional[str] = None
+    assignee_filter: Optional[str] = None,
+    include_citations: bool = False,
+    min_publication_date: Optional[str] = None,
+    offset: int = 0,
+    newest_first: bool = False,
+    strict: bool = False,
+    oldest_first: bool = False
 ) -> list[dict]:
     """Search patents by CPC classification code using BigQuery.
 
@@ -208,10 +300,24 @@ def search_by_cpc(
         country: Country code filter (default "US")
         min_grant_date: Minimum grant date as YYYYMMDD (e.g., "20240101")
         assignee_filter: Optional assignee name filter (case-insensitive LIKE)
+        include_citations: If True, add a "citations" list of cited
+            publication numbers (backward citations) to each patent
+        min_publication_date: Minimum publication date as YYYYMMDD (for
+            delta polling; a publication's date never changes once it is
+            in the dataset, unlike the filing date of a late publication)
+        offset: Number of results to skip (for paging)
+        newest_first: If True, order by publication date instead of grant date
+        strict: If True, raise SearchError when the query fails instead of
+            returning an empty list
+        oldest_first: If True, order by publication date, oldest first (for
+            delta polling in bounded windows)
 
     Returns:
         List of patent dictionaries
 
+    Raises:
+        SearchError: If strict and the query failed
+
     Common CPC codes for lock/access control:
         E05B47 - Electronic locks (operating/controlling by electric means)
         E05B49 - Electric permutation locks
@@ -225,8 +331,6 @@ def search_by_cpc(
         # ASSA ABLOY electronic lock patents
         results = search_by_cpc("E05B47", assignee_filter="ASSA ABLOY")
     """
-    import subprocess
-
     # Build WHERE clauses
     where_clauses = [
         f'country_code = "{country}"',
@@ -236,6 +340,9 @@ def search_by_cpc(
     if min_grant_date:
         where_clauses.append(f"grant_date >= {min_grant_date}")
 
+    if min_publication_date:
+        where_clauses.append(f"publication_date >= {min_publication_date}")
+
     if assignee_filter:
         where_clauses.append(
             f'EXISTS (SELECT 1 FROM UNNEST(assignee_harmonized) a '
@@ -244,6 +351,18 @@ def search_by_cpc(
 
     where_sql = " AND ".join(where_clauses)
 
+    citations_sql = ""
+    if include_citations:
+        citations_sql = (
+            ',\n    ARRAY(SELECT c.publication_number FROM UNNEST(citation) c '
+            'WHERE c.publication_number != "") as citations'
+        )
+
+    if oldest_first:
+        order_sql = "publication_date ASC"
+    else:
+        order_sql = "publication_date DESC" if newest_first else "grant_date DESC"
+
     query = f'''
 SELECT
     publication_number,
@@ -257,57 +376,24 @@ SELECT
     CAST(FLOOR(grant_date / 10000) AS STRING) || "-" ||
         LPAD(CAST(MOD(CAST(FLOOR(grant_date / 100) AS INT64), 100) AS STRING), 2, "0") || "-" ||
         LPAD(CAST(MOD(grant_date, 100) AS STRING), 2, "0") as grant_date,
-    ARRAY_TO_STRING(ARRAY(SELECT code FROM UNNEST(cpc) WHERE code LIKE "{cpc_code}%"), ", ") as cpc_codes
+    CAST(FLOOR(publication_date / 10000) AS STRING) || "-" ||
+        LPAD(CAST(MOD(CAST(FLOOR(publication_date / 100) AS INT64), 100) AS STRING), 2, "0") || "-" ||
+        LPAD(CAST(MOD(publication_date, 100) AS STRING), 2, "0") as publication_date,
+    ARRAY_TO_STRING(ARRAY(SELECT code FROM UNNEST(cpc) WHERE code LIKE "{cpc_code}%"), ", ") as cpc_codes{citations_sql}
 FROM `patents-public-data.patents.publications`
 WHERE {where_sql}
-ORDER BY grant_date DESC
-LIMIT {limit}
+ORDER BY {order_sql}, publication_number
+LIMIT {limit}{f" OFFSET {offset}" if offset else ""}
 '''
 
-    try:
-        result = subprocess.run(
-            ["bq", "query", "--use_legacy_sql=false", "--format=json", query],
-            capture_output=True,
-            text=True,
-            timeout=60
-        )
-
-        if result.returncode != 0:
-            print(f"[BigQuery error: {result.stderr}]")
-            return []
-
-        data = json.loads(result.stdout)
-        patents = []
-
-        for row in data:
-            patents.append({
-                "patent_number": row.get("publication_number", ""),
-                "title": row.get("title", ""),
-                "abstract": row.get("abstract", ""),
-                "assignee": row.get("assignee", ""),
-                "inventors": row.get("inventors", "").split(", ") if row.get("inventors") else [],
-                "filing_date": row.get("filing_date"),
-                "grant_date": row.get("grant_date"),
-                "cpc_codes": row.get("cpc_codes", "").split(", ") if row.get("cpc_codes") else [],
-            })
-
-        print(f"[BigQuery CPC search ({cpc_code}): Found {len(patents)} patents]")
-        return patents
-
-    except subprocess.TimeoutExpired:
-        print("[BigQuery timeout]")
-        return []
-    except FileNotFoundError:
-        print("[bq CLI not found - install Google Cloud SDK]")
-        return []
-    except json.JSONDecodeError as e:
-        print(f"[BigQuery JSON parse error: {e}]")
-        return []
-    except Exception as e:
-        print(f"[BigQuery error: {e}]")
-        return []
+    patents = _search_bigquery(query, f"cpc={cpc_code} assignee={assignee_filter or ''}", include_citations)
+    if patents is None:
+        return _strict_empty(None, f"CPC {cpc_code}") if strict else []
+    print(f"[BigQuery CPC search ({cpc_code}): Found {len(patents)} patents]")
+    return patents
 
 
+@coalesce
 def get_patent(patent_number: str) -> Optional[dict]:
     """Get single patent by publication number.
 
@@ -317,35 +403,175 @@ def get_patent(patent_number: str) -> Optional[dict]:
     Returns:
         Patent dictionary or None if not found
     """
-    # Try USPTO first
-    results = _search_uspto_odp(patent_number, 1)
-    if results:
-        return results[0]
-
-    # Fallback to Google Patents
-    results = _search_google_patents(patent_number, 1)
+    # Bloom filter pre-check: definitely-uncached numbers skip the lookup
+    cached = get_known_patents().get(patent_number)
+    if cached is not None:
+        with trace("known_patents", patent_number) as span:
+            span.rows, span.cache_hit = 1, True
+        return cached
+
+    results = _route("patent", patent_number, {
+        "uspto": lambda: _search_uspto_odp(patent_number, 1),
+        "google_patents": lambda: _search_google_patents(patent_number, 1),
+    })
     return results[0] if results else None
 
 
-def _search_uspto_odp(query: str, limit: int) -> list[dict]:
+def _route(
+    query_type: str,
+    query: str,
+    fetchers: dict[str, Callable[[], Optional[list[dict]]]]
+) -> Optional[list[dict]]:
+    """Try sources in the order the source router picks for a query type.
+
+    Args:
+        query_type: Router query type ("assignee", "title" or "patent")
+        query: Query text (for messages)
+        fetchers: Source name -> function fetching from that source
+            (returning None if the source failed)
+
+    Returns:
+        Results of the first source returning any; an empty list if a
+        source answered with no results; None if every source failed
+    """
+    order = [source for source in get_router().order(query_type) if source in fetchers]
+    answered = False
+    for i, source in enumerate(order):
+        start = time.perf_counter()
+        results = fetchers[source]()
+        # An empty answer is a success; only a failed source (None) counts against it
+        get_router().observe(query_type, source, time.perf_counter() - start, ok=results is not None)
+        if results:
+            return results
+        answered = answered or results is not None
+        if i + 1 < len(order):
+            print(f"[{SOURCE_LABELS[source]} unavailable, trying {SOURCE_LABELS[order[i + 1]]} for '{query}']")
+    return [] if answered else None
+
+
+def _strict_empty(results: Optional[list[dict]], query: str) -> list[dict]:
+    """Return a strict search's empty answer, or raise if every source failed."""
+    if results is None:
+        raise SearchError(f"No data source could answer '{query}'")
+    return []
+
+
+def _page_index(offset: int, limit: int) -> Optional[int]:
+    """Convert an offset to a page index for page-based APIs.
+
+    Returns:
+        Zero-based index of the page of min(limit, MAX_PAGE_SIZE) results
+        starting at offset, or None if offset is not on a page boundary
+    """
+    page, rest = divmod(offset, max(min(limit, MAX_PAGE_SIZE), 1))
+    return None if rest else page
+
+
+def _sample_fallback(key: str, limit: int, offset: int, newest_first: bool) -> list[dict]:
+    """Serve sample data after every source failed, unless in production mode."""
+    if production_mode():
+        print(f"[Error: no data source returned results for '{key}' - "
+              f"sample data is disabled in production mode]")
+        return []
+    return _get_sample_data(key, limit, offset, newest_first)
+
+
+def _search_bigquery(query: str, label: str, include_citations: bool = False) -> Optional[list[dict]]:
+    """Run a publications query with the bq CLI.
+
+    Args:
+        query: Standard SQL query selecting the search_by_cpc columns
+        label: Query description for the metrics span
+        include_citations: If True, the query also selects citations
+
+    Returns:
+        List of patent dictionaries (empty if none match), None on failure
+    """
+    with trace("bigquery", label) as span:
+        try:
+            result = run_command(
+                "bigquery",
+                ["bq", "query", "--use_legacy_sql=false", "--format=json", query],
+                timeout=60
+            )
+
+            if result.returncode != 0:
+                span.error = result.stderr[:200]
+                print(f"[BigQuery error: {result.stderr}]")
+                return None
+
+            data = json.loads(result.stdout)
+            patents = []
+
+            for row in data:
+                patent = {
+                    "patent_number": row.get("publication_number", ""),
+                    "title": row.get("title", ""),
+                    "abstract": row.get("abstract", ""),
+                    "assignee": row.get("assignee", ""),
+                    "inventors": row.get("inventors", "").split(", ") if row.get("inventors") else [],
+                    "filing_date": row.get("filing_date"),
+                    "grant_date": row.get("grant_date"),
+                    "publication_date": row.get("publication_date"),
+                    "cpc_codes": row.get("cpc_codes", "").split(", ") if row.get("cpc_codes") else [],
+                }
+                if include_citations:
+                    patent["citations"] = row.get("citations") or []
+                patents.append(patent)
+
+            span.rows = len(patents)
+            return patents
+
+        except subprocess.TimeoutExpired:
+            span.error = "timeout"
+            print("[BigQuery timeout]")
+            return None
+        except FileNotFoundError:
+            span.error = "bq CLI not found"
+            print("[bq CLI not found - install Google Cloud SDK]")
+            return None
+        except json.JSONDecodeError as e:
+            span.error = str(e)
+            print(f"[BigQuery JSON parse error: {e}]")
+            return None
+        except Exception as e:
+            span.error = str(e)
+            print(f"[BigQuery error: {e}]")
+            return None
+
+
+def _search_uspto_odp(
+    query: str,
+    limit: int,
+    offset: int = 0,
+    newest_first: bool = False
+) -> Optional[list[dict]]:
     """Search USPTO Open Data Portal API.
 
     Args:
         query: Search query (company name, keywords, or patent number)
         limit: Maximum results to return
+        offset: Number of results to skip (for paging)
+        newest_first: If True, sort by publication date descending
 
     Returns:
-        List of patent dictionaries, empty list on failure
+        List of patent dictionaries (empty if none match), None on failure
     """
     api_key = _get_api_key()
+    if not api_key and is_replaying():
+        api_key = "replay"  # Key is not part of the recorded request
     if not api_key:
         print("[No USPTO_API_KEY found - set in environment or .env file]")
-        return []
+        return None
 
     params = {
         "q": query,
-        "rows": min(limit, 100),
+        "rows": min(limit, MAX_PAGE_SIZE),
     }
+    if offset:
+        params["start"] = offset
+    if newest_first:
+        params["sort"] = "applicationMetaData.earliestPublicationDate desc"
 
     url = f"{USPTO_ODP_API}?{urllib.parse.urlencode(params)}"
 
@@ -354,33 +580,35 @@ def _search_uspto_odp(query: str, limit: int) -> list[dict]:
         "Accept": "application/json",
     }
 
-    try:
-        req = urllib.request.Request(url, headers=headers)
-        with urllib.request.urlopen(req, timeout=30) as response:
-            data = json.loads(response.read().decode())
-
-        results = []
-        for app in data.get("patentFileWrapperDataBag", []):
-            patent = _format_uspto_patent(app)
-            if patent:
-                results.append(patent)
-                if len(results) >= limit:
-                    break
-
-        if results:
-            print(f"[USPTO ODP: Found {data.get('count', 0)} total, returning {len(results)}]")
-
-        return results
-
-    except urllib.error.HTTPError as e:
-        if e.code == 401 or e.code == 403:
-            print(f"[USPTO API authentication failed (HTTP {e.code}) - check API key]")
-        else:
-            print(f"[USPTO API error: HTTP {e.code}]")
-        return []
-    except Exception as e:
-        print(f"[USPTO API error: {e}]")
-        return []
+    with trace("uspto", query) as span:
+        try:
+            data = json.loads(http_get("uspto", url, headers, timeout=30))
+
+            results = []
+            for app in data.get("patentFileWrapperDataBag", []):
+                patent = _format_uspto_patent(app)
+                if patent:
+                    results.append(patent)
+                    if len(results) >= limit:
+                        break
+
+            span.rows = len(results)
+            if results:
+                print(f"[USPTO ODP: Found {data.get('count', 0)} total, returning {len(results)}]")
+
+            return results
+
+        except urllib.error.HTTPError as e:
+            span.error = f"HTTP {e.code}"
+            if e.code == 401 or e.code == 403:
+                print(f"[USPTO API authentication failed (HTTP {e.code}) - check API key]")
+            else:
+                print(f"[USPTO API error: HTTP {e.code}]")
+            return None
+        except Exception as e:
+            span.error = str(e)
+            print(f"[USPTO API error: {e}]")
+            return None
 
 
 def _format_uspto_patent(app: dict) -> Optional[dict]:
@@ -413,6 +641,7 @@ def _format_uspto_patent(app: dict) -> Optional[dict]:
     filing_date = meta.get("filingDate", "")
     if filing_date and "T" in filing_date:
         filing_date = filing_date.split("T")[0]
+    publication_date = (meta.get("earliestPublicationDate") or "").split("T")[0] or None
 
     # Extract CPC codes if available
     cpc_codes = []
@@ -430,41 +659,65 @@ def _format_uspto_patent(app: dict) -> Optional[dict]:
         "inventors": inventors,
         "filing_date": filing_date,
         "grant_date": None,  # Would need separate lookup
+        "publication_date": publication_date,
         "cpc_codes": cpc_codes,
         "status_code": meta.get("applicationStatusCode"),
     }
 
 
-def _get_sample_data(key: str, limit: int) -> list[dict]:
+def _get_sample_data(key: str, limit: int, offset: int = 0, newest_first: bool = False) -> list[dict]:
     """Get sample data for demos when APIs are unavailable.
 
     Args:
         key: Search key (company name or keywords)
         limit: Maximum results
+        offset: Number of results to skip
+        newest_first: If True, order by publication date descending
 
     Returns:
         List of sample patent dictionaries
     """
-    for sample_key, patents in SAMPLE_PATENTS.items():
-        if sample_key in key or key in sample_key:
-            print(f"[Using sample data for '{key}' - APIs unavailable]")
-            return patents[:limit]
-    return []
+    with trace("sample_data", key, fallback=True) as span:
+        for sample_key, patents in SAMPLE_PATENTS.items():
+            if sample_key in key or key in sample_key:
+                print(f"[Using sample data for '{key}' - APIs unavailable]")
+                if newest_first:
+                    patents = sorted(
+                        patents,
+                        key=lambda p: p.get("publication_date") or p.get("grant_date") or p.get("filing_date") or "",
+                        reverse=True,
+                    )
+                span.rows = len(patents[offset:offset + limit])
+                return patents[offset:offset + limit]
+        return []
 
 
-def _search_google_patents(query: str, limit: int) -> list[dict]:
+def _search_google_patents(
+    query: str,
+    limit: int,
+    page: int = 0,
+    newest_first: bool = False
+) -> Optional[list[dict]]:
     """Search Google Patents API (fallback).
 
     Args:
         query: Search query string
-        limit: Maximum results to return
+        limit: Maximum results to return (also the page size, up to MAX_PAGE_SIZE)
+        page: Zero-based page index
+        newest_first: If True, sort by newest first
 
     Returns:
-        List of patent dictionaries
+        List of patent dictionaries (empty if none match), None on failure
     """
+    num = min(limit, MAX_PAGE_SIZE)
+    if newest_first:
+        query = f"{query}&sort=new"
+    if page:
+        query = f"{query}&page={page}"
+
     params = {
         "url": query,
-        "num": min(limit, 100),
+        "num": num,
         "exp": "",
         "output": "json"
     }
@@ -478,31 +731,35 @@ def _search_google_patents(query: str, limit: int) -> list[dict]:
         "Referer": "https://patents.google.com/",
     }
 
-    try:
-        req = urllib.request.Request(url, headers=headers)
-        with urllib.request.urlopen(req, timeout=30) as response:
-            data = json.loads(response.read().decode())
-
-        results = []
-        clusters = data.get("results", {}).get("cluster", [])
-        for cluster in clusters:
-            for item in cluster.get("result", []):
-                patent = item.get("patent", {})
-                results.append(_format_google_patent(patent))
+    with trace("google_patents", query, fallback=True) as span:
+        try:
+            data = json.loads(http_get("google_patents", url, headers, timeout=30))
+
+            results = []
+            clusters = data.get("results", {}).get("cluster", [])
+            for cluster in clusters:
+                for item in cluster.get("result", []):
+                    patent = item.get("patent", {})
+                    results.append(_format_google_patent(patent))
+                    if len(results) >= limit:
+                        break
                 if len(results) >= limit:
-                    return results
+                    break
 
-        return results
+            span.rows = len(results)
+            return results
 
-    except urllib.error.HTTPError as e:
-        if e.code == 503 or e.code == 429:
-            print(f"[Google Patents rate limited (HTTP {e.code})]")
-        else:
-            print(f"[Google Patents error: HTTP {e.code}]")
-        return []
-    except Exception as e:
-        print(f"[Google Patents error: {e}]")
-        return []
+        except urllib.error.HTTPError as e:
+            span.error = f"HTTP {e.code}"
+            if e.code == 503 or e.code == 429:
+                print(f"[Google Patents rate limited (HTTP {e.code})]")
+            else:
+                print(f"[Google Patents error: HTTP {e.code}]")
+            return None
+        except Exception as e:
+            span.error = str(e)
+            print(f"[Google Patents error: {e}]")
+            return None
 
 
 def _format_google_patent(patent: dict) -> dict:
@@ -526,6 +783,7 @@ def _format_google_patent(patent: dict) -> dict:
         "inventors": [patent.get("inventor", "")] if patent.get("inventor") else [],
         "filing_date": patent.get("filing_date"),
         "grant_date": patent.get("grant_date"),
+        "publication_date": patent.get("publication_date"),
         "cpc_codes": [],
     }
 
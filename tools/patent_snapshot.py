@@ -0,0 +1,453 @@
+"""Memory-mapped columnar snapshot of the cached patent set.
+
+Analyses otherwise start by re-querying Snowflake or the APIs for their
+working set. write_snapshot() exports the patents once to a single
+columnar file; PatentSnapshot opens it in milliseconds by memory-mapping
+it read-only, so any number of processes share one copy through the page
+cache and nothing is decoded until it is read.
+
+Column encodings:
+
+    patent_number, title, abstract   string heap: int64 offsets + UTF-8 bytes
+    assignee                         dictionary: int32 codes (-1 = none) + string heap
+    inventors, cpc_codes             dictionary lists: int64 row offsets + int32 codes
+                                     + string heap
+    filing_date, grant_date          int32 YYYYMMDD (0 = none)
+    status_code                      int32 (NULL_INT = none)
+
+File layout: 8-byte magic, uint64 header length, JSON header (row count,
+byte order and the location of every column part), then the column parts,
+8-byte aligned. The file is replaced atomically, so readers that already
+mapped the previous snapshot keep a consistent view.
+
+Usage:
+    write_snapshot(ResultsStore(session_dir).iter_rows("snowflake_query", 1))
+
+    snapshot = PatentSnapshot()                  # data/patent_snapshot.bin
+    snapshot.select(assignee="Allegion")         # list of patent dicts
+    competitive_benchmark(snapshot)              # columnar fast path
+    generate_all_reports(snapshot)               # workers map the same file
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from datetime import date, datetime
+from typing import Iterable, Iterator, Optional, Union
+
+
+# Default location of the snapshot
+DEFAULT_SNAPSHOT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "patent_snapshot.bin"
+)
+
+SNAPSHOT_MAGIC = b"PATSNAP1"
+
+# Null marker for int columns
+NULL_INT = -2**31
+
+# Column name -> encoding
+SNAPSHOT_COLUMNS = {
+    "patent_number": "string",
+    "title": "string",
+    "abstract": "string",
+    "assignee": "dict",
+    "inventors": "dict_list",
+    "filing_date": "date",
+    "grant_date": "date",
+    "cpc_codes": "dict_list",
+    "status_code": "int",
+}
+
+_HEADER = struct.Struct("<8sQ")
+
+
+def _field(patent: dict, name: str):
+    """Get a field by name, accepting Snowflake's upper-case column names."""
+    value = patent.get(name)
+    return patent.get(name.upper()) if value is None else value
+
+
+def _date_int(value) -> int:
+    """Convert a date-like value to YYYYMMDD (0 if missing or unparseable)."""
+    if value is None or value == "":
+        return 0
+    if isinstance(value, (date, datetime)):
+        return value.year * 10000 + value.month * 100 + value.day
+    digits = str(value)[:10].replace("-", "")
+    return int(digits) if len(digits) == 8 and digits.isdigit() else 0
+
+
+def _list_values(value) -> list[str]:
+    """Normalize a list field (list, JSON array text or comma-separated text)."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        text = value.strip()
+        if text.startswith("["):
+            try:
+                value = json.loads(text)
+            except json.JSONDecodeError:
+                value = text.strip("[]").split(",")
+        else:
+            value = text.split(",")
+    return [str(v).strip() for v in value if v is not None and str(v).strip()]
+
+
+class _Heap:
+    """Append-only string heap being built."""
+
+    def __init__(self):
+        self.offsets = array("q", [0])
+        self.data = bytearray()
+
+    def append(self, text: str) -> None:
+        self.data += text.encode()
+        self.offsets.append(len(self.data))
+
+
+class _Dictionary:
+    """String dictionary being built (value -> code)."""
+
+    def __init__(self):
+        self.codes: dict[str, int] = {}
+        self.heap = _Heap()
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.codes)
+            self.heap.append(value)
+        return code
+
+
+def write_snapshot(patents: Iterable[dict], path: str = DEFAULT_SNAPSHOT_PATH) -> int:
+    """Export patents to a columnar snapshot file.
+
+    Patents are deduplicated by patent_number (first occurrence wins).
+
+    Args:
+        patents: Patent dictionaries (search results, Snowflake rows,
+            ResultsStore rows, bulk ingest records; read once)
+        path: Snapshot file to write (replaced atomically)
+
+    Returns:
+        Number of patents written
+    """
+    strings = {name: _Heap() for name, kind in SNAPSHOT_COLUMNS.items() if kind == "string"}
+    dicts = {name: _Dictionary() for name, kind in SNAPSHOT_COLUMNS.items() if kind.startswith("dict")}
+    codes = {name: array("i") for name, kind in SNAPSHOT_COLUMNS.items() if kind.startswith("dict")}
+    list_offsets = {name: array("q", [0]) for name, kind in SNAPSHOT_COLUMNS.items() if kind == "dict_list"}
+    ints = {name: array("i") for name, kind in SNAPSHOT_COLUMNS.items() if kind in ("date", "int")}
+
+    seen = set()
+    for patent in patents:
+        patent_number = _field(patent, "patent_number")
+        if not patent_number or patent_number in seen:
+            continue
+        seen.add(patent_number)
+        for name, kind in SNAPSHOT_COLUMNS.items():
+            value = _field(patent, name)
+            if kind == "string":
+                strings[name].append("" if value is None else str(value))
+            elif kind == "dict":
+                codes[name].append(dicts[name].code(str(value)) if value else -1)
+            elif kind == "dict_list":
+                for item in _list_values(value):
+                    codes[name].append(dicts[name].code(item))
+                list_offsets[name].append(len(codes[name]))
+            elif kind == "date":
+                ints[name].append(_date_int(value))
+            else:
+                try:
+                    ints[name].append(int(value) if value not in (None, "") else NULL_INT)
+                except (TypeError, ValueError):
+                    ints[name].append(NULL_INT)
+
+    # Lay out every column part after the header, 8-byte aligned
+    parts: list[bytes] = []
+    columns: dict[str, dict] = {}
+    position = 0
+
+    def add(buffer) -> list[int]:
+        nonlocal position
+        data = bytes(buffer)
+        start = position
+        parts.append(data + b"\0" * (-len(data) % 8))
+        position += len(parts[-1])
+        return [start, len(data)]
+
+    for name, kind in SNAPSHOT_COLUMNS.items():
+        column: dict = {"kind": kind}
+        if kind == "string":
+            column["offsets"] = add(strings[name].offsets)
+            column["heap"] = add(strings[name].data)
+        elif kind.startswith("dict"):
+            column["codes"] = add(codes[name])
+            if kind == "dict_list":
+                column["list_offsets"] = add(list_offsets[name])
+            column["dict_offsets"] = add(dicts[name].heap.offsets)
+            column["heap"] = add(dicts[name].heap.data)
+        else:
+            column["values"] = add(ints[name])
+        columns[name] = column
+
+    header = json.dumps({
+        "version": 1,
+        "rows": len(seen),
+        "byteorder": sys.byteorder,
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "columns": columns,
+    }).encode()
+    header += b" " * (-(len(header) + _HEADER.size) % 8)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(SNAPSHOT_MAGIC, len(header)))
+        f.write(header)
+        for part in parts:
+            f.write(part)
+    os.replace(tmp_path, path)
+
+    print(f"[Snapshot: wrote {len(seen)} patents to {path}]")
+    return len(seen)
+
+
+class _StringColumn:
+    """Lazy sequence view of a string heap."""
+
+    def __init__(self, offsets: memoryview, heap: memoryview):
+        self._offsets = offsets
+        self._heap = heap
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return str(self._heap[self._offsets[index]:self._offsets[index + 1]], "utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        offsets, heap = self._offsets, self._heap
+        for i in range(len(offsets) - 1):
+            yield str(heap[offsets[i]:offsets[i + 1]], "utf-8")
+
+
+class PatentSnapshot:
+    """Read-only, memory-mapped view of a patent snapshot.
+
+    Usage:
+        with PatentSnapshot(path) as snapshot:
+            len(snapshot), snapshot[0], snapshot.select(cpc_prefix="E05B47")
+    """
+
+    def __init__(self, path: str = DEFAULT_SNAPSHOT_PATH):
+        """Map a snapshot file.
+
+        Args:
+            path: Snapshot file written by write_snapshot()
+
+        Raises:
+            FileNotFoundError: If the snapshot doesn't exist
+            ValueError: If the file is not a compatible snapshot
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.mtime = os.path.getmtime(path)
+
+        magic, header_length = _HEADER.unpack_from(self._mmap, 0)
+        if magic != SNAPSHOT_MAGIC:
+            self._mmap.close()
+            raise ValueError(f"Not a patent snapshot: {path}")
+        header = json.loads(self._mmap[_HEADER.size:_HEADER.size + header_length])
+        if header["byteorder"] != sys.byteorder:
+            self._mmap.close()
+            raise ValueError(f"Snapshot byte order {header['byteorder']} doesn't match this machine")
+
+        self.header = header
+        self._rows = header["rows"]
+        self._view = memoryview(self._mmap)
+        data_start = _HEADER.size + header_length
+        self._columns: dict[str, dict] = {}
+        self._heap_start: dict[str, int] = {}
+        for name, column in header["columns"].items():
+            parts = {"kind": column["kind"]}
+            for part, location in column.items():
+                if part == "kind":
+                    continue
+                start, length = location
+                if part == "heap":
+                    self._heap_start[name] = data_start + start
+                buffer = self._view[data_start + start:data_start + start + length]
+                parts[part] = buffer if part == "heap" else buffer.cast(
+                    "q" if part.endswith("offsets") else "i"
+                )
+            self._columns[name] = parts
+        self._dictionaries: dict[str, list[str]] = {}
+        self._row_layout: Optional[list[tuple]] = None
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def __enter__(self) -> "PatentSnapshot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Unmap the file (views handed out before must no longer be used)."""
+        for parts in self._columns.values():
+            for value in parts.values():
+                if isinstance(value, memoryview):
+                    value.release()
+        self._columns = {}
+        self._row_layout = None
+        try:
+            self._view.release()
+            self._mmap.close()
+        except BufferError:
+            pass  # Columns still referenced elsewhere; unmapped once they are freed
+
+    def column(self, name: str) -> Union[memoryview, _StringColumn]:
+        """Get a column without decoding it.
+
+        Returns:
+            For string columns a lazy sequence of str; for dictionary
+            columns the int32 codes (see dictionary()); for date/int
+            columns the int32 values. Dictionary lists return the flat
+            codes; use list_offsets() to split them per row.
+        """
+        parts = self._columns[name]
+        kind = parts["kind"]
+        if kind == "string":
+            return _StringColumn(parts["offsets"], parts["heap"])
+        if kind.startswith("dict"):
+            return parts["codes"]
+        return parts["values"]
+
+    def list_offsets(self, name: str) -> memoryview:
+        """Get the int64 row offsets into a dictionary-list column's codes."""
+        return self._columns[name]["list_offsets"]
+
+    def dictionary(self, name: str) -> list[str]:
+        """Get the distinct values of a dictionary column, indexed by code."""
+        values = self._dictionaries.get(name)
+        if values is None:
+            parts = self._columns[name]
+            values = list(_StringColumn(parts["dict_offsets"], parts["heap"]))
+            self._dictionaries[name] = values
+        return values
+
+    def _layout(self) -> list[tuple]:
+        """Per-column (name, kind, a, b, c) tuples for row decoding, built once."""
+        if self._row_layout is None:
+            layout = []
+            for name, parts in self._columns.items():
+                kind = parts["kind"]
+                if kind == "string":
+                    layout.append((name, kind, parts["offsets"], self._heap_start[name], None))
+                elif kind == "dict":
+                    layout.append((name, kind, parts["codes"], self.dictionary(name), None))
+                elif kind == "dict_list":
+                    layout.append((name, kind, parts["list_offsets"], parts["codes"], self.dictionary(name)))
+                else:
+                    layout.append((name, kind, parts["values"], None, None))
+            self._row_layout = layout
+        return self._row_layout
+
+    def __getitem__(self, index: int) -> dict:
+        """Decode one patent."""
+        if index < 0:
+            index += self._rows
+        if not 0 <= index < self._rows:
+            raise IndexError(index)
+        data = self._mmap
+        row = {}
+        for name, kind, a, b, c in self._layout():
+            if kind == "string":
+                row[name] = data[b + a[index]:b + a[index + 1]].decode()
+            elif kind == "dict":
+                code = a[index]
+                row[name] = b[code] if code >= 0 else ""
+            elif kind == "dict_list":
+                row[name] = [c[code] for code in b[a[index]:a[index + 1]]]
+            elif kind == "date":
+                value = a[index]
+                row[name] = f"{value // 10000:04d}-{value // 100 % 100:02d}-{value % 100:02d}" if value else None
+            else:
+                value = a[index]
+                row[name] = None if value == NULL_INT else value
+        return row
+
+    def __iter__(self) -> Iterator[dict]:
+        for index in range(self._rows):
+            yield self[index]
+
+    def rows(self, indices: Iterable[int]) -> Iterator[dict]:
+        """Lazily decode the given patents."""
+        for index in indices:
+            yield self[index]
+
+    def where(
+        self,
+        assignee: Optional[str] = None,
+        cpc_prefix: Optional[str] = None,
+        min_filing_date: Optional[str] = None
+    ) -> list[int]:
+        """Find row indices matching filters, without decoding any rows.
+
+        Filters are evaluated on the dictionaries first, so each is one
+        pass over int32 codes.
+
+        Args:
+            assignee: Assignee substring (case-insensitive)
+            cpc_prefix: CPC code prefix (spaces ignored, e.g. "E05B47")
+            min_filing_date: Earliest filing date (YYYY-MM-DD or YYYYMMDD)
+
+        Returns:
+            Matching row indices in snapshot order
+        """
+        rows: Iterable[int] = range(self._rows)
+        if assignee:
+            needle = assignee.lower()
+            wanted = {code for code, name in enumerate(self.dictionary("assignee")) if needle in name.lower()}
+            codes = self.column("assignee")
+            rows = [i for i in rows if codes[i] in wanted]
+        if cpc_prefix:
+            prefix = cpc_prefix.replace(" ", "").upper()
+            wanted = {code for code, value in enumerate(self.dictionary("cpc_codes"))
+                      if value.replace(" ", "").upper().startswith(prefix)}
+            codes, offsets = self.column("cpc_codes"), self.list_offsets("cpc_codes")
+            rows = [i for i in rows if any(c in wanted for c in codes[offsets[i]:offsets[i + 1]])]
+        if min_filing_date:
+            threshold = _date_int(min_filing_date)
+            dates = self.column("filing_date")
+            rows = [i for i in rows if dates[i] >= threshold]
+        return list(rows)
+
+    def select(self, **filters) -> list[dict]:
+        """Decode the patents matching where(**filters)."""
+        return list(self.rows(self.where(**filters)))
+
+
+_snapshot: Optional[PatentSnapshot] = None
+
+
+def get_snapshot(path: str = DEFAULT_SNAPSHOT_PATH) -> Optional[PatentSnapshot]:
+    """Get the shared snapshot, reopening it if the file was rewritten.
+
+    Returns:
+        PatentSnapshot, or None if no snapshot has been written
+    """
+    global _snapshot
+    if not os.path.exists(path):
+        return None
+    if _snapshot is None or _snapshot.path != path or _snapshot.mtime != os.path.getmtime(path):
+        # The previous mapping is left to the garbage collector: callers may
+        # still hold rows or views from it
+        _snapshot = PatentSnapshot(path)
+    return _snapshot
@@ -0,0 +1,201 @@
+"""Compressed per-call result sidecars for analysis sessions.
+
+The markdown logs only keep a 5-row preview of each query/API call. The
+results store keeps the full result of every call next to the markdown so
+analysis can be re-run without hitting the APIs again:
+
+    analysis/2026-01-28_smart-lock-patents/
+    └── results/
+        ├── api_call_001.ndjson.zst
+        └── snowflake_query_001.ndjson.zst
+
+Each file is newline-delimited JSON (one row per line), compressed with
+zstandard when installed and gzip otherwise. Readers stream rows lazily, so
+a single call can be scanned without decompressing it all into memory.
+
+Usage:
+    store = ResultsStore(session_dir)
+    store.write("api_call", 1, results)
+    rows = store.load("api_call", 1)
+    columns = store.load_columns("api_call", 1, ["assignee", "filing_date"])
+"""
+import gzip
+import io
+import json
+import os
+from typing import Iterator, Optional
+
+# Subdirectory of the session folder holding result files
+RESULTS_DIRNAME = "results"
+
+
+class ResultsStore:
+    """Reads and writes full call results for one analysis session.
+
+    Usage:
+        store = ResultsStore("analysis/2026-01-28_smart-lock-patents")
+        store.write("api_call", 1, results)
+        for row in store.iter_rows("api_call", 1):
+            ...
+    """
+
+    def __init__(self, session_dir: str):
+        """Initialize the store for a session directory.
+
+        Args:
+            session_dir: Analysis session folder
+        """
+        self.session_dir = session_dir
+        self.results_dir = os.path.join(session_dir, RESULTS_DIRNAME)
+
+    def _path(self, kind: str, num: int, extension: str) -> str:
+        """Build the file path for a call."""
+        return os.path.join(self.results_dir, f"{kind}_{num:03d}.ndjson{extension}")
+
+    def find(self, kind: str, num: int) -> Optional[str]:
+        """Find the stored file for a call.
+
+        Args:
+            kind: Call kind ("api_call" or "snowflake_query")
+            num: Call number within the session
+
+        Returns:
+            File path or None if the call has no stored results
+        """
+        for extension in (".zst", ".gz"):
+            path = self._path(kind, num, extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def write(self, kind: str, num: int, rows: list) -> str:
+        """Write the full result of a call.
+
+        Args:
+            kind: Call kind ("api_call" or "snowflake_query")
+            num: Call number within the session
+            rows: Result rows (any JSON-serializable values)
+
+        Returns:
+            Path of the written file, relative to the session directory
+        """
+        os.makedirs(self.results_dir, exist_ok=True)
+        extension = ".zst" if _zstandard() is not None else ".gz"
+        path = self._path(kind, num, extension)
+
+        with _open_compressed(path, "wb") as f:
+            for row in rows:
+                f.write(json.dumps(row, default=str).encode() + b"\n")
+
+        return os.path.relpath(path, self.session_dir)
+
+    def iter_rows(self, kind: str, num: int) -> Iterator:
+        """Lazily iterate the stored rows of a call.
+
+        Args:
+            kind: Call kind ("api_call" or "snowflake_query")
+            num: Call number within the session
+
+        Yields:
+            One decoded row at a time
+        """
+        path = self.find(kind, num)
+        if path is None:
+            return
+        with _open_compressed(path, "rb") as f:
+            for line in io.BufferedReader(f):
+                if line.strip():
+                    yield json.loads(line)
+
+    def load(self, kind: str, num: int) -> list:
+        """Load the full stored result of a call as a list.
+
+        Args:
+            kind: Call kind ("api_call" or "snowflake_query")
+            num: Call number within the session
+
+        Returns:
+            List of rows (empty if nothing was stored)
+        """
+        return list(self.iter_rows(kind, num))
+
+    def load_columns(
+        self,
+        kind: str,
+        num: int,
+        columns: Optional[list[str]] = None
+    ) -> dict[str, list]:
+        """Load a call's rows as columns.
+
+        Only the requested fields are kept while streaming, so projecting a
+        few columns out of a large result stays cheap.
+
+        Args:
+            kind: Call kind ("api_call" or "snowflake_query")
+            num: Call number within the session
+            columns: Fields to keep (default: every field seen)
+
+        Returns:
+            Dictionary mapping field name to a list of values (None where a
+            row lacks the field)
+        """
+        table: dict[str, list] = {name: [] for name in columns or []}
+        row_count = 0
+        for row in self.iter_rows(kind, num):
+            if not isinstance(row, dict):
+                row = {"value": row}
+            if columns is None:
+                for name in row:
+                    if name not in table:
+                        table[name] = [None] * row_count
+            for name, values in table.items():
+                values.append(row.get(name))
+            row_count += 1
+        return table
+
+    def load_dataframe(self, kind: str, num: int, columns: Optional[list[str]] = None):
+        """Load a call's rows as a pandas DataFrame.
+
+        Args:
+            kind: Call kind ("api_call" or "snowflake_query")
+            num: Call number within the session
+            columns: Fields to keep (default: every field seen)
+
+        Returns:
+            pandas.DataFrame
+        """
+        import pandas as pd
+
+        return pd.DataFrame(self.load_columns(kind, num, columns))
+
+
+def _zstandard():
+    """Import zstandard on first use (optional dependency).
+
+    Returns:
+        The zstandard module, or None if it is not installed
+    """
+    global _zstandard_module
+    if _zstandard_module is _NOT_LOADED:
+        try:
+            import zstandard
+        except ImportError:
+            zstandard = None
+        _zstandard_module = zstandard
+    return _zstandard_module
+
+
+_NOT_LOADED = object()
+_zstandard_module = _NOT_LOADED
+
+
+def _open_compressed(path: str, mode: str):
+    """Open a .zst or .gz file for binary streaming."""
+    if path.endswith(".zst"):
+        zstandard = _zstandard()
+        if zstandard is None:
+            raise ImportError("zstandard is required to read .zst results: pip install zstandard")
+        if "w" in mode:
+            return zstandard.ZstdCompressor(level=3).stream_writer(open(path, "wb"), closefd=True)
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    return gzip.open(path, mode)
@@ -0,0 +1,239 @@
+"""SQLite catalog of analysis sessions.
+
+AnalysisWorkflow registers each session here when it is created and updates
+it on finalize, so finding whether a question was already answered is an
+indexed lookup instead of a scan of the analysis/ folders:
+
+    analysis/
+    ├── catalog.sqlite        # this catalog
+    └── 2026-01-28_smart-lock-patents/
+
+Requests are matched on a normalized form (case, punctuation and whitespace
+insensitive) plus the exact session parameters.
+
+Usage:
+    catalog = get_session_catalog("analysis")   # shared per base directory
+    previous = catalog.find_equivalent("Smart lock patents 2024", max_age_days=7)
+    if previous:
+        print(previous["session_dir"])
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+
+# Catalog file name inside the analysis base directory
+CATALOG_FILENAME = "catalog.sqlite"
+
+
+def normalize_request(request: str) -> str:
+    """Normalize request text for equivalence matching.
+
+    Args:
+        request: Analysis request text
+
+    Returns:
+        Lowercase request with punctuation removed and whitespace collapsed
+    """
+    text = re.sub(r"[^\w\s]", " ", request.lower())
+    return " ".join(text.split())
+
+
+def _params_key(params: Optional[dict]) -> str:
+    """Serialize parameters canonically for equality matching."""
+    return json.dumps(params or {}, sort_keys=True, default=str)
+
+
+class SessionCatalog:
+    """Indexed catalog of analysis sessions under one base directory.
+
+    Usage:
+        catalog = SessionCatalog("analysis")
+        catalog.upsert(session_dir, metadata)
+        catalog.find_equivalent(request)
+    """
+
+    def __init__(self, base_dir: str = "analysis"):
+        """Open (or create) the catalog for a base directory.
+
+        Args:
+            base_dir: Base directory holding analysis session folders
+        """
+        self.base_dir = base_dir
+        os.makedirs(base_dir, exist_ok=True)
+        self.path = os.path.join(base_dir, CATALOG_FILENAME)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()  # Writes from concurrent workflows share the connection
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_dir TEXT PRIMARY KEY,
+                request TEXT NOT NULL,
+                request_key TEXT NOT NULL,
+                params TEXT NOT NULL,
+                jira_ticket TEXT,
+                status TEXT,
+                started_at TEXT,
+                completed_at TEXT,
+                snowflake_query_count INTEGER DEFAULT 0,
+                api_call_count INTEGER DEFAULT 0,
+                analysis_step_count INTEGER DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_sessions_request
+                ON sessions (request_key, params, started_at);
+            CREATE INDEX IF NOT EXISTS idx_sessions_started
+                ON sessions (started_at);
+        """)
+        self._conn.commit()
+
+    def upsert(self, session_dir: str, metadata: dict) -> None:
+        """Insert or update a session from its metadata.
+
+        Args:
+            session_dir: Session folder path
+            metadata: Session metadata (as written to metadata.json)
+        """
+        request = metadata.get("request") or ""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO sessions (
+                    session_dir, request, request_key, params, jira_ticket, status,
+                    started_at, completed_at, snowflake_query_count, api_call_count,
+                    analysis_step_count
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (session_dir) DO UPDATE SET
+                    request = excluded.request,
+                    request_key = excluded.request_key,
+                    params = excluded.params,
+                    jira_ticket = excluded.jira_ticket,
+                    status = excluded.status,
+                    started_at = excluded.started_at,
+                    completed_at = excluded.completed_at,
+                    snowflake_query_count = excluded.snowflake_query_count,
+                    api_call_count = excluded.api_call_count,
+                    analysis_step_count = excluded.analysis_step_count
+                """,
+                (
+                    session_dir,
+                    request,
+                    normalize_request(request),
+                    _params_key(metadata.get("parameters")),
+                    metadata.get("jira_ticket"),
+                    metadata.get("status"),
+                    metadata.get("started_at"),
+                    metadata.get("completed_at"),
+                    metadata.get("snowflake_query_count", 0),
+                    metadata.get("api_call_count", 0),
+                    metadata.get("analysis_step_count", 0),
+                ),
+            )
+
+    def get(self, session_dir: str) -> Optional[dict]:
+        """Get the catalog record for a session folder, or None."""
+        row = self._conn.execute(
+            "SELECT * FROM sessions WHERE session_dir = ?", (session_dir,)
+        ).fetchone()
+        return _row_to_dict(row)
+
+    def find_equivalent(
+        self,
+        request: str,
+        params: Optional[dict] = None,
+        max_age_days: Optional[int] = 7,
+        status: Optional[str] = "complete"
+    ) -> Optional[dict]:
+        """Find the most recent session answering the same request.
+
+        Args:
+            request: Analysis request text
+            params: Session parameters that must match exactly
+            max_age_days: Ignore sessions started longer ago (None for any age)
+            status: Required session status (None for any status)
+
+        Returns:
+            Catalog record dict or None if there is no equivalent session
+        """
+        sql = "SELECT * FROM sessions WHERE request_key = ? AND params = ?"
+        args: list = [normalize_request(request), _params_key(params)]
+        if max_age_days is not None:
+            cutoff = datetime.utcnow() - timedelta(days=max_age_days)
+            sql += " AND started_at >= ?"
+            args.append(cutoff.isoformat())
+        if status is not None:
+            sql += " AND status = ?"
+            args.append(status)
+        sql += " ORDER BY started_at DESC LIMIT 1"
+
+        return _row_to_dict(self._conn.execute(sql, args).fetchone())
+
+    def search(self, text: str, limit: int = 20) -> list[dict]:
+        """Find sessions whose request contains the given text.
+
+        Args:
+            text: Text to look for (normalized like requests)
+            limit: Maximum sessions to return
+
+        Returns:
+            Catalog records, newest first
+        """
+        rows = self._conn.execute(
+            "SELECT * FROM sessions WHERE request_key LIKE ? "
+            "ORDER BY started_at DESC LIMIT ?",
+            (f"%{normalize_request(text)}%", limit),
+        ).fetchall()
+        return [_row_to_dict(row) for row in rows]
+
+    def rebuild(self) -> int:
+        """Index every existing session folder's metadata.json.
+
+        Only needed once for folders created before the catalog existed.
+
+        Returns:
+            Number of sessions indexed
+        """
+        count = 0
+        for name in sorted(os.listdir(self.base_dir)):
+            metadata_path = os.path.join(self.base_dir, name, "metadata.json")
+            if not os.path.isfile(metadata_path):
+                continue
+            try:
+                with open(metadata_path) as f:
+                    metadata = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"[Skipping {metadata_path}: {e}]")
+                continue
+            self.upsert(os.path.join(self.base_dir, name), metadata)
+            count += 1
+        return count
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self._conn.close()
+
+
+_catalogs: dict[str, SessionCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_session_catalog(base_dir: str = "analysis") -> SessionCatalog:
+    """Get the shared catalog for a base directory (one connection per process)."""
+    key = os.path.abspath(base_dir)
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = _catalogs[key] = SessionCatalog(base_dir)
+        return catalog
+
+
+def _row_to_dict(row: Optional[sqlite3.Row]) -> Optional[dict]:
+    """Convert a catalog row to a plain dict with decoded parameters."""
+    if row is None:
+        return None
+    record = dict(row)
+    record["params"] = json.loads(record["params"])
+    return record
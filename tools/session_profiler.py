@@ -0,0 +1,232 @@
+"""Opt-in profiling for analysis sessions.
+
+When enabled, a session collects up to three kinds of evidence and writes
+them next to metadata.json on finalize:
+
+- cprofile: deterministic profile of the session thread
+    profile.pstats, profile_top.txt
+- tracemalloc: allocation snapshot (and growth since session start)
+    tracemalloc_top.txt
+- sampling: wall-clock stack samples of every thread, including time
+  blocked on network/CLI calls that cProfile attributes poorly
+    wall_samples.txt, wall_samples.folded (flamegraph-compatible)
+
+Enable with AnalysisWorkflow(..., profile=True) or profile="cprofile,sampling",
+or set PATENT_AGENT_PROFILE=1 (or a mode list) in the environment. Nothing is
+imported or started when profiling is off.
+"""
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Optional, Union
+
+
+# Environment switch: "1"/"all" or a comma-separated list of modes
+PROFILE_ENV_VAR = "PATENT_AGENT_PROFILE"
+
+PROFILE_MODES = ("cprofile", "tracemalloc", "sampling")
+
+# Rows in the top-N text summaries
+PROFILE_TOP_N = 30
+
+# Seconds between wall-clock stack samples
+SAMPLE_INTERVAL = 0.01
+
+
+def resolve_profile_modes(profile: Union[bool, str, None] = None) -> list[str]:
+    """Work out which profilers to run.
+
+    Args:
+        profile: True for all modes, a comma-separated mode list, False to
+            disable, or None to read PATENT_AGENT_PROFILE
+
+    Returns:
+        List of enabled modes (empty when profiling is off)
+    """
+    if profile is None:
+        profile = os.environ.get(PROFILE_ENV_VAR, "")
+    if profile is True:
+        return list(PROFILE_MODES)
+    if not profile:
+        return []
+
+    value = str(profile).strip().lower()
+    if value in ("1", "true", "yes", "all"):
+        return list(PROFILE_MODES)
+    if value in ("0", "false", "no"):
+        return []
+    modes = [m.strip() for m in value.split(",") if m.strip()]
+    unknown = [m for m in modes if m not in PROFILE_MODES]
+    if unknown:
+        print(f"[Ignoring unknown profile modes: {', '.join(unknown)}]")
+    return [m for m in modes if m in PROFILE_MODES]
+
+
+class SessionProfiler:
+    """Runs the selected profilers for one session.
+
+    Usage:
+        profiler = SessionProfiler(session_dir, ["cprofile", "sampling"])
+        profiler.start()
+        ...
+        files = profiler.stop()
+    """
+
+    def __init__(self, session_dir: str, modes: list[str], top_n: int = PROFILE_TOP_N):
+        """Initialize the profiler.
+
+        Args:
+            session_dir: Session folder to write profiles into
+            modes: Enabled modes (see PROFILE_MODES)
+            top_n: Rows in the text summaries
+        """
+        self.session_dir = session_dir
+        self.modes = modes
+        self.top_n = top_n
+        self._profile = None
+        self._tracemalloc_start = None
+        self._started_tracemalloc = False
+        self._samples: Counter = Counter()
+        self._sample_count = 0
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """Start every enabled profiler."""
+        if "tracemalloc" in self.modes:
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(25)
+                self._started_tracemalloc = True
+            self._tracemalloc_start = tracemalloc.take_snapshot()
+
+        if "sampling" in self.modes:
+            self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+            self._sampler.start()
+
+        if "cprofile" in self.modes:
+            import cProfile
+
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError:
+                # Another profiler (e.g., a debugger or coverage tool) is active
+                print("[cProfile unavailable - another profiler is active]")
+                self._profile = None
+
+    def stop(self) -> list[str]:
+        """Stop profiling and write results into the session folder.
+
+        Returns:
+            File names written (relative to the session folder)
+        """
+        files = []
+        if self._profile is not None:
+            self._profile.disable()
+            files += self._write_cprofile()
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            files += self._write_samples()
+        if self._tracemalloc_start is not None:
+            files += self._write_tracemalloc()
+        return files
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.session_dir, filename)
+
+    def _write_cprofile(self) -> list[str]:
+        """Write the cProfile stats and a top-N cumulative summary."""
+        import io
+        import pstats
+
+        self._profile.dump_stats(self._path("profile.pstats"))
+        out = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=out)
+        stats.sort_stats("cumulative").print_stats(self.top_n)
+        with open(self._path("profile_top.txt"), "w") as f:
+            f.write(out.getvalue())
+        return ["profile.pstats", "profile_top.txt"]
+
+    def _write_tracemalloc(self) -> list[str]:
+        """Write the top allocation sites and growth since start."""
+        import tracemalloc
+
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        lines = [
+            f"Traced memory: current {current / 1_000_000:.2f} MB, peak {peak / 1_000_000:.2f} MB",
+            "",
+            f"Top {self.top_n} allocation sites:",
+        ]
+        lines += [str(stat) for stat in snapshot.statistics("lineno")[:self.top_n]]
+        lines += ["", f"Top {self.top_n} growth since session start:"]
+        lines += [str(stat) for stat in snapshot.compare_to(self._tracemalloc_start, "lineno")[:self.top_n]]
+        with open(self._path("tracemalloc_top.txt"), "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return ["tracemalloc_top.txt"]
+
+    def _sample_loop(self) -> None:
+        """Periodically record the stack of every other thread."""
+        own_id = threading.get_ident()
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self._samples[";".join(reversed(stack))] += 1
+            self._sample_count += 1
+
+    def _write_samples(self) -> list[str]:
+        """Write folded stacks and a top-N leaf-function summary."""
+        with open(self._path("wall_samples.folded"), "w") as f:
+            for stack, count in self._samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+        leaves: Counter = Counter()
+        for stack, count in self._samples.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        lines = [
+            f"{self._sample_count} sampling rounds every {SAMPLE_INTERVAL * 1000:.0f} ms",
+            "",
+            f"Top {self.top_n} frames by wall-clock samples:",
+        ]
+        lines += [
+            f"{count:8d}  {100 * count / total:5.1f}%  {frame}"
+            for frame, count in leaves.most_common(self.top_n)
+        ]
+        with open(self._path("wall_samples.txt"), "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return ["wall_samples.folded", "wall_samples.txt"]
+
+
+def start_session_profiler(
+    session_dir: str,
+    profile: Union[bool, str, None] = None
+) -> Optional[SessionProfiler]:
+    """Start profiling a session if enabled by argument or environment.
+
+    Args:
+        session_dir: Session folder to write profiles into
+        profile: See resolve_profile_modes()
+
+    Returns:
+        Running SessionProfiler, or None when profiling is off
+    """
+    modes = resolve_profile_modes(profile)
+    if not modes:
+        return None
+    profiler = SessionProfiler(session_dir, modes)
+    profiler.start()
+    return profiler
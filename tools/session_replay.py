@@ -0,0 +1,239 @@
+"""Record/replay of source responses for analysis sessions.
+
+Every external call made by the tools goes through http_get() (USPTO ODP,
+Google Patents) or run_command() (bq, snow). When a SessionRecorder is
+active those calls are either captured into the session folder or served
+back from it:
+
+    analysis/2026-01-28_smart-lock-patents/
+    └── recordings.jsonl      # one JSON object per source response
+
+In replay mode no network or CLI process is touched; a request that was
+never recorded raises ReplayMissError. Identical requests are replayed in
+the order they were recorded (the last response repeats once exhausted),
+so re-running the same workflow produces the same data.
+
+The active recorder is held in a context variable, so concurrent workflows
+in different threads or asyncio tasks each route calls through their own
+recorder. Threads inherit it only when started in a copy of the creator's
+context (contextvars.copy_context().run), as the data loader's stages are.
+
+Usage:
+    workflow = AnalysisWorkflow("Smart lock patents", record=True)
+    ...
+    workflow.finalize()
+
+    # Later, offline
+    workflow = AnalysisWorkflow("Smart lock patents", replay_from=old_session_dir)
+"""
+import contextvars
+import json
+import os
+import subprocess
+import threading
+import urllib.error
+import urllib.request
+from typing import Optional
+
+from tools.metrics import add_bytes, mark_cache_hit
+
+
+# Recording file name inside a session folder
+RECORDINGS_FILENAME = "recordings.jsonl"
+
+
+class ReplayMissError(LookupError):
+    """Raised in replay mode for a request that has no recording."""
+
+
+class SessionRecorder:
+    """Captures or replays source responses for one session.
+
+    Usage:
+        with SessionRecorder(session_dir, mode="record"):
+            ...
+
+        recorder = SessionRecorder(session_dir, mode="record")
+        recorder.activate()
+        ...
+        recorder.deactivate()
+    """
+
+    def __init__(self, session_dir: str, mode: str = "record"):
+        """Initialize a recorder.
+
+        Args:
+            session_dir: Session folder holding recordings.jsonl
+            mode: "record" to capture responses, "replay" to serve them
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown recorder mode: {mode}")
+        self.session_dir = session_dir
+        self.mode = mode
+        self.path = os.path.join(session_dir, RECORDINGS_FILENAME)
+        self._lock = threading.Lock()
+        self._responses: dict[tuple, list] = {}
+        self._cursor: dict[tuple, int] = {}
+        self._token: Optional[contextvars.Token] = None
+
+        if mode == "replay":
+            if not os.path.exists(self.path):
+                raise FileNotFoundError(f"No recordings found at {self.path}")
+            with open(self.path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        key = (entry["source"], entry["request"])
+                        self._responses.setdefault(key, []).append(entry["response"])
+
+    @property
+    def replaying(self) -> bool:
+        """True when serving responses from recordings."""
+        return self.mode == "replay"
+
+    def record(self, source: str, request: str, response: dict) -> None:
+        """Append one source response to the recordings file.
+
+        Args:
+            source: Source name (e.g., "uspto", "google_patents", "bigquery", "snowflake")
+            request: Request identity (URL or command line)
+            response: JSON-serializable response payload
+        """
+        entry = {"source": source, "request": request, "response": response}
+        with self._lock:
+            os.makedirs(self.session_dir, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+
+    def replay(self, source: str, request: str) -> dict:
+        """Get the next recorded response for a request.
+
+        Args:
+            source: Source name
+            request: Request identity (URL or command line)
+
+        Returns:
+            Recorded response payload
+
+        Raises:
+            ReplayMissError: If the request was never recorded
+        """
+        key = (source, request)
+        with self._lock:
+            responses = self._responses.get(key)
+            if not responses:
+                raise ReplayMissError(f"No recorded {source} response for: {request[:200]}")
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            return responses[min(index, len(responses) - 1)]
+
+    def activate(self) -> None:
+        """Route source calls in the current context through this recorder."""
+        self._token = _active_recorder.set(self)
+
+    def deactivate(self) -> None:
+        """Restore the recorder that was active before activate()."""
+        token, self._token = self._token, None
+        if token is None or _active_recorder.get() is not self:
+            return
+        try:
+            _active_recorder.reset(token)
+        except ValueError:  # Deactivated from another context
+            _active_recorder.set(None)
+
+    def __enter__(self) -> "SessionRecorder":
+        self.activate()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.deactivate()
+
+
+_active_recorder: contextvars.ContextVar[Optional[SessionRecorder]] = contextvars.ContextVar(
+    "active_recorder", default=None
+)
+
+
+def get_active_recorder() -> Optional[SessionRecorder]:
+    """Get the recorder capturing or replaying in the current context, if any."""
+    return _active_recorder.get()
+
+
+def is_replaying() -> bool:
+    """Check whether source calls are currently served from recordings."""
+    recorder = _active_recorder.get()
+    return recorder is not None and recorder.replaying
+
+
+def http_get(source: str, url: str, headers: dict, timeout: int = 30) -> str:
+    """GET a URL and return the decoded body, honoring record/replay.
+
+    Args:
+        source: Source name for the recording
+        url: Full request URL (must not contain secrets)
+        headers: Request headers (not recorded)
+        timeout: Socket timeout in seconds
+
+    Returns:
+        Response body text
+
+    Raises:
+        urllib.error.HTTPError: On HTTP errors (live or recorded)
+        ReplayMissError: In replay mode for unrecorded requests
+    """
+    recorder = _active_recorder.get()
+    if recorder is not None and recorder.replaying:
+        response = recorder.replay(source, url)
+        mark_cache_hit()
+        if "http_error" in response:
+            raise urllib.error.HTTPError(url, response["http_error"], "Recorded error", None, None)
+        return response["body"]
+
+    try:
+        req = urllib.request.Request(url, headers=headers)
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            body = response.read().decode()
+    except urllib.error.HTTPError as e:
+        if recorder is not None:
+            recorder.record(source, url, {"http_error": e.code})
+        raise
+
+    add_bytes(len(body))
+    if recorder is not None:
+        recorder.record(source, url, {"body": body})
+    return body
+
+
+def run_command(source: str, args: list[str], timeout: int = 60) -> subprocess.CompletedProcess:
+    """Run a CLI command (bq, snow) and capture its output, honoring record/replay.
+
+    Args:
+        source: Source name for the recording
+        args: Command and arguments
+        timeout: Timeout in seconds
+
+    Returns:
+        CompletedProcess with text stdout/stderr
+
+    Raises:
+        subprocess.TimeoutExpired, FileNotFoundError: As subprocess.run
+        ReplayMissError: In replay mode for unrecorded commands
+    """
+    request = json.dumps(args)
+    recorder = _active_recorder.get()
+    if recorder is not None and recorder.replaying:
+        response = recorder.replay(source, request)
+        mark_cache_hit()
+        return subprocess.CompletedProcess(
+            args, response["returncode"], response["stdout"], response["stderr"]
+        )
+
+    result = subprocess.run(args, capture_output=True, text=True, timeout=timeout)
+    add_bytes(len(result.stdout or ""))
+    if recorder is not None:
+        recorder.record(source, request, {
+            "returncode": result.returncode,
+            "stdout": result.stdout,
+            "stderr": result.stderr,
+        })
+    return result
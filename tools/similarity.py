@@ -0,0 +1,495 @@
+"""Near-duplicate and related-patent detection over titles and abstracts.
+
+Continuations and family members often appear as separate rows with nearly
+identical text. SimilarityIndex finds them without pairwise comparison:
+
+- MinHash signatures over word shingles, bucketed with LSH (banding), find
+  near-duplicate candidates in constant time per patent; candidates are
+  verified against the Jaccard threshold and merged into clusters.
+- A sparse TF-IDF inverted index answers "related patents to X" by scoring
+  only documents that share terms with the query.
+
+The index is built incrementally (the data loader adds every committed
+batch) and persisted to SQLite; the in-memory structures are rebuilt when
+it is opened and catch up with rows other processes have added before
+every add and query. Patents without any title or abstract text are not
+indexed:
+
+    data/similarity_index.db
+
+Usage:
+    index = get_similarity_index()
+    index.add_many(patents)
+    index.near_duplicates("US20240123456A1")
+    index.related("US20240123456A1", k=10)
+    index.related(text="fingerprint deadbolt with mobile credential")
+"""
+import heapq
+import json
+import math
+import os
+import random
+import re
+import sqlite3
+import zlib
+from array import array
+from collections import Counter
+from typing import Iterable, Optional
+
+
+# Default location of the shared similarity index
+DEFAULT_SIMILARITY_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "similarity_index.db"
+)
+
+# MinHash signature length and LSH bands (rows per band = NUM_PERM / NUM_BANDS)
+NUM_PERM = 64
+NUM_BANDS = 16
+
+# Estimated Jaccard similarity at or above which patents are near-duplicates
+DUPLICATE_THRESHOLD = 0.8
+
+# Corpus growth that triggers recomputing TF-IDF document norms
+NORM_REFRESH_RATIO = 0.05
+
+# Query terms used for related() (highest TF-IDF weight first)
+MAX_QUERY_TERMS = 32
+
+_MASK64 = (1 << 64) - 1
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "to with which wherein said such one more least first second plurality "
+    "method system device apparatus thereof".split()
+)
+
+
+def _tokens(patent: dict) -> list[str]:
+    """Lowercase word tokens of a patent's title and abstract."""
+    text = f"{patent.get('title') or ''} {patent.get('abstract') or ''}"
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _shingles(tokens: list[str], size: int = 3) -> set[str]:
+    """Word n-gram shingles (single words for very short texts)."""
+    if len(tokens) < size:
+        return set(tokens)
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+class _MinHasher:
+    """MinHash with multiply-shift hashing ((a*x + b) mod 2^64) >> 32 over CRC32 shingle hashes."""
+
+    # Shingle hashes processed per vectorized chunk (bounds temporary memory)
+    CHUNK = 1 << 16
+
+    def __init__(self, num_perm: int, seed: int = 1):
+        rng = random.Random(seed)
+        self.a = [rng.getrandbits(64) | 1 for _ in range(num_perm)]
+        self.b = [rng.getrandbits(64) for _ in range(num_perm)]
+        self._np = None
+        try:
+            import numpy as np
+        except ImportError:  # optional dependency - pure Python fallback
+            pass
+        else:
+            self._np = np
+            self._a = np.asarray(self.a, dtype=np.uint64)[:, None]
+            self._b = np.asarray(self.b, dtype=np.uint64)[:, None]
+
+    def signatures(self, shingle_sets: list[set[str]]) -> list[array]:
+        """Compute MinHash signatures for a batch of non-empty shingle sets.
+
+        With NumPy the batch is hashed in vectorized chunks.
+        """
+        hashed = [[zlib.crc32(s.encode()) for s in shingles] for shingles in shingle_sets]
+        if self._np is None:
+            return [
+                array("I", (min(((a * x + b) & _MASK64) >> 32 for x in hashes)
+                            for a, b in zip(self.a, self.b)))
+                for hashes in hashed
+            ]
+
+        np = self._np
+        results = []
+        start = 0
+        while start < len(hashed):
+            end, size = start, 0
+            while end < len(hashed) and (size == 0 or size + len(hashed[end]) <= self.CHUNK):
+                size += len(hashed[end])
+                end += 1
+            chunk = hashed[start:end]
+            x = np.fromiter((h for hashes in chunk for h in hashes), dtype=np.uint64, count=size)
+            offsets = np.cumsum([0] + [len(hashes) for hashes in chunk[:-1]])
+            values = (self._a * x[None, :] + self._b) >> np.uint64(32)
+            minima = np.minimum.reduceat(values, offsets, axis=1).T.astype(np.uint32)
+            results.extend(array("I", row.tobytes()) for row in minima)
+            start = end
+        return results
+
+
+class SimilarityIndex:
+    """Incremental MinHash LSH + TF-IDF index of patent texts.
+
+    Usage:
+        index = SimilarityIndex()              # data/similarity_index.db
+        index = SimilarityIndex(None)          # in-memory only
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = DEFAULT_SIMILARITY_PATH,
+        threshold: float = DUPLICATE_THRESHOLD,
+        num_perm: int = NUM_PERM,
+        num_bands: int = NUM_BANDS,
+        related: bool = True
+    ):
+        """Open (or create) an index.
+
+        Args:
+            path: SQLite file to persist to, or None for an in-memory index
+            threshold: Near-duplicate Jaccard threshold
+            num_perm: MinHash signature length
+            num_bands: LSH bands (must divide num_perm)
+            related: If False, skip the TF-IDF index (duplicates only)
+        """
+        if num_perm % num_bands:
+            raise ValueError("num_bands must divide num_perm")
+        self.path = path
+        self.threshold = threshold
+        self.num_bands = num_bands
+        self.rows_per_band = num_perm // num_bands
+        self.related_enabled = related
+        self._hasher = _MinHasher(num_perm)
+
+        self._ids: list[str] = []
+        self._index: dict[str, int] = {}
+        self._signatures: list[array] = []
+        self._buckets: list[dict[tuple, list[int]]] = [{} for _ in range(num_bands)]
+        self._parent: list[int] = []
+
+        self._postings: dict[str, dict[int, int]] = {}
+        self._norms: list[float] = []
+        self._norms_size = 0
+        self._pending_norms: list[dict] = []  # Terms of docs added since the last refresh
+        self._terms: list[dict] = []  # Only kept for in-memory indexes
+
+        self._conn = None
+        self._loaded_rowid = 0  # Highest SQLite doc_id loaded into memory
+        if path:
+            if path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS similarity_docs (
+                    doc_id INTEGER PRIMARY KEY,
+                    patent_number TEXT UNIQUE NOT NULL,
+                    signature BLOB NOT NULL,
+                    terms TEXT NOT NULL
+                )
+            """)
+            self._load()
+
+    def _load(self, added: Optional[dict] = None) -> None:
+        """Load rows added to the SQLite file since the last load (by any process).
+
+        SQLite assigns doc_ids, so rows load in the same order everywhere
+        and every process keeps the same cluster representatives.
+
+        Args:
+            added: Rows this process just wrote, patent number -> (signature,
+                terms), reused instead of being decoded again
+        """
+        if self._conn is None:
+            return
+        rows = self._conn.execute(
+            "SELECT doc_id, patent_number, signature, terms FROM similarity_docs"
+            " WHERE doc_id > ? ORDER BY doc_id",
+            (self._loaded_rowid,),
+        ).fetchall()
+        for rowid, patent_number, blob, terms in rows:
+            self._loaded_rowid = rowid
+            if patent_number in self._index:
+                continue
+            if added and patent_number in added:
+                signature, terms = added[patent_number]
+            else:
+                signature = array("I")
+                signature.frombytes(blob)
+                terms = json.loads(terms)
+            self._insert(patent_number, signature, terms)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, patent_number: str) -> bool:
+        return patent_number in self._index
+
+    def add(self, patent: dict) -> Optional[str]:
+        """Add one patent.
+
+        Args:
+            patent: Patent dict with patent_number, title and abstract
+
+        Returns:
+            Patent number of an earlier near-duplicate, or None
+        """
+        return self.add_many([patent])[0]
+
+    def add_many(self, patents: Iterable[dict]) -> list[Optional[str]]:
+        """Add patents (already indexed patent numbers are skipped).
+
+        Args:
+            patents: Patent dicts
+
+        Returns:
+            For each patent, the patent number of an earlier near-duplicate or None
+        """
+        self._load()
+        results: list[Optional[str]] = []
+        slots: dict[str, list[int]] = {}
+        pending = []  # (patent_number, tokens)
+        for patent in patents:
+            patent_number = patent.get("patent_number")
+            results.append(None)
+            if not patent_number:
+                continue
+            if patent_number in slots:
+                slots[patent_number].append(len(results) - 1)
+                continue
+            slots[patent_number] = [len(results) - 1]
+            if patent_number not in self._index:
+                tokens = _tokens(patent)
+                if tokens:  # Text-less patents would all share one signature
+                    pending.append((patent_number, tokens))
+
+        signatures = self._hasher.signatures([_shingles(tokens) for _, tokens in pending])
+        added = {}
+        for (patent_number, tokens), signature in zip(pending, signatures):
+            terms = dict(Counter(
+                t for t in tokens if len(t) > 2 and t not in _STOPWORDS
+            )) if self.related_enabled else {}
+            added[patent_number] = (signature, terms)
+
+        if self._conn is None:
+            for patent_number, (signature, terms) in added.items():
+                self._insert(patent_number, signature, terms)
+        elif added:
+            # Another process may have added the same patent meanwhile
+            self._conn.executemany(
+                "INSERT INTO similarity_docs (patent_number, signature, terms) VALUES (?, ?, ?)"
+                " ON CONFLICT (patent_number) DO NOTHING",
+                [(n, sig.tobytes(), json.dumps(terms)) for n, (sig, terms) in added.items()],
+            )
+            self._conn.commit()
+            self._load(added)
+
+        for patent_number, patent_slots in slots.items():
+            doc_id = self._index.get(patent_number)
+            if doc_id is not None:
+                results[patent_slots[0]] = self._duplicate_of(doc_id)
+        return results
+
+    def _insert(self, patent_number: str, signature: array, terms: dict) -> int:
+        """Add a document to the in-memory LSH buckets and postings."""
+        doc_id = len(self._ids)
+        self._ids.append(patent_number)
+        self._index[patent_number] = doc_id
+        self._signatures.append(signature)
+        self._parent.append(doc_id)
+
+        keys = self._band_keys(signature)
+        for candidate in self._candidates(keys):
+            if self._jaccard(signature, self._signatures[candidate]) >= self.threshold:
+                self._union(candidate, doc_id)
+        for bucket, key in zip(self._buckets, keys):
+            bucket.setdefault(key, []).append(doc_id)
+
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+        if self._conn is None:
+            self._terms.append(terms)
+        if self.related_enabled:
+            self._pending_norms.append(terms)
+        return doc_id
+
+    def _band_keys(self, signature: array) -> list[bytes]:
+        """LSH band keys: the raw bytes of each band of the signature."""
+        raw = signature.tobytes()
+        width = self.rows_per_band * signature.itemsize
+        return [raw[i:i + width] for i in range(0, len(raw), width)]
+
+    def _candidates(self, keys: list[bytes]) -> set[int]:
+        """Documents sharing at least one LSH band key."""
+        candidates = set()
+        for bucket, key in zip(self._buckets, keys):
+            candidates.update(bucket.get(key, ()))
+        return candidates
+
+    @staticmethod
+    def _jaccard(a: array, b: array) -> float:
+        """Estimated Jaccard similarity of two MinHash signatures."""
+        return sum(x == y for x, y in zip(a, b)) / len(a)
+
+    def _find(self, doc_id: int) -> int:
+        while self._parent[doc_id] != doc_id:
+            self._parent[doc_id] = self._parent[self._parent[doc_id]]
+            doc_id = self._parent[doc_id]
+        return doc_id
+
+    def _union(self, a: int, b: int) -> None:
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a != root_b:
+            # Keep the earliest document as the cluster representative
+            low, high = min(root_a, root_b), max(root_a, root_b)
+            self._parent[high] = low
+
+    def _duplicate_of(self, doc_id: int) -> Optional[str]:
+        """Patent number of the cluster representative, if it isn't doc_id."""
+        root = self._find(doc_id)
+        return self._ids[root] if root != doc_id else None
+
+    def near_duplicates(self, patent_number: str) -> list[tuple[str, float]]:
+        """Find indexed patents whose text nearly matches a patent's.
+
+        Args:
+            patent_number: Indexed patent number
+
+        Returns:
+            List of (patent_number, estimated Jaccard similarity), most similar first
+        """
+        self._load()
+        doc_id = self._index.get(patent_number)
+        if doc_id is None:
+            return []
+        signature = self._signatures[doc_id]
+        matches = []
+        for candidate in self._candidates(self._band_keys(signature)) - {doc_id}:
+            similarity = self._jaccard(signature, self._signatures[candidate])
+            if similarity >= self.threshold:
+                matches.append((self._ids[candidate], round(similarity, 4)))
+        return sorted(matches, key=lambda m: m[1], reverse=True)
+
+    def clusters(self, min_size: int = 2) -> list[list[str]]:
+        """Group indexed patents into near-duplicate clusters.
+
+        Args:
+            min_size: Smallest cluster to return
+
+        Returns:
+            Clusters of patent numbers, representative (earliest added) first
+        """
+        self._load()
+        groups: dict[int, list[str]] = {}
+        for doc_id, patent_number in enumerate(self._ids):
+            groups.setdefault(self._find(doc_id), []).append(patent_number)
+        return [members for members in groups.values() if len(members) >= min_size]
+
+    def _idf(self, term: str) -> float:
+        return math.log((len(self._ids) + 1) / (len(self._postings.get(term, ())) + 1)) + 1.0
+
+    def _refresh_norms(self) -> None:
+        """Bring TF-IDF document norms up to date before a query.
+
+        Documents added since the last refresh get norms under the current
+        IDF; all norms are recomputed once the corpus has grown by more than
+        NORM_REFRESH_RATIO, since IDF values drift as documents are added.
+        """
+        size = len(self._ids)
+        if self._norms_size and size - self._norms_size <= self._norms_size * NORM_REFRESH_RATIO:
+            for terms in self._pending_norms:
+                self._norms.append(
+                    math.sqrt(sum((tf * self._idf(t)) ** 2 for t, tf in terms.items())) or 1.0
+                )
+            self._pending_norms = []
+            return
+        sums = [0.0] * size
+        for term, docs in self._postings.items():
+            idf = self._idf(term)
+            for doc_id, tf in docs.items():
+                sums[doc_id] += (tf * idf) ** 2
+        self._norms = [math.sqrt(s) or 1.0 for s in sums]
+        self._norms_size = size
+        self._pending_norms = []
+
+    def related(
+        self,
+        patent_number: Optional[str] = None,
+        text: Optional[str] = None,
+        k: int = 10
+    ) -> list[tuple[str, float]]:
+        """Find the patents most related to an indexed patent or free text.
+
+        Scores are TF-IDF cosine similarities computed from the inverted
+        index, so only documents sharing query terms are touched.
+
+        Args:
+            patent_number: Indexed patent to find relatives of
+            text: Free-text query (used when patent_number is not given)
+            k: Number of results
+
+        Returns:
+            List of (patent_number, score), highest first
+        """
+        self._load()
+        if not self.related_enabled or not self._ids:
+            return []
+
+        exclude = None
+        if patent_number is not None:
+            exclude = self._index.get(patent_number)
+            if exclude is None:
+                return []
+            query = self._doc_terms(exclude)
+        else:
+            query = Counter(
+                t for t in _TOKEN_RE.findall((text or "").lower())
+                if len(t) > 2 and t not in _STOPWORDS
+            )
+
+        self._refresh_norms()
+        weights = {t: tf * self._idf(t) for t, tf in query.items() if t in self._postings}
+        top_terms = heapq.nlargest(MAX_QUERY_TERMS, weights.items(), key=lambda w: w[1])
+        query_norm = math.sqrt(sum(w * w for _, w in top_terms)) or 1.0
+
+        scores: dict[int, float] = {}
+        for term, weight in top_terms:
+            idf = self._idf(term)
+            for doc_id, tf in self._postings[term].items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * tf * idf
+        scores.pop(exclude, None)
+
+        norms = self._norms
+        best = heapq.nlargest(k, scores.items(), key=lambda s: s[1] / norms[s[0]])
+        return [
+            (self._ids[doc_id], round(score / (query_norm * norms[doc_id]), 4))
+            for doc_id, score in best
+        ]
+
+    def _doc_terms(self, doc_id: int) -> dict:
+        """Term counts of an indexed document."""
+        if self._conn is None:
+            return self._terms[doc_id]
+        row = self._conn.execute(
+            "SELECT terms FROM similarity_docs WHERE patent_number = ?", (self._ids[doc_id],)
+        ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def close(self) -> None:
+        """Close the SQLite connection."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+_similarity_index: Optional[SimilarityIndex] = None
+
+
+def get_similarity_index() -> SimilarityIndex:
+    """Get the shared similarity index at DEFAULT_SIMILARITY_PATH."""
+    global _similarity_index
+    if _similarity_index is None:
+        _similarity_index = SimilarityIndex()
+    return _similarity_index
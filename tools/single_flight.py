@@ -0,0 +1,172 @@
+"""Single-flight coalescing of identical in-flight searches.
+
+When several analyses or loader threads ask for the same assignee, title,
+CPC code or patent at the same moment, only the first caller fetches; the
+others wait for that fetch and receive its result. Nothing is cached after
+the fetch completes - a later identical call fetches again.
+
+Calls are identified by function and bound arguments (defaults applied),
+so search_by_assignee("Allegion") and search_by_assignee("Allegion", 50)
+share a fetch. Threads and asyncio tasks coalesce with each other:
+
+- sync callers block on the shared fetch
+- asyncio callers use fn.aio(...), which runs the fetch in the default
+  executor (it never blocks the event loop) and awaits shared fetches
+
+Waiting callers get their own deep copy of the result, so mutating one
+caller's patents never affects another's. Each shared result is recorded
+as a "single_flight" metrics span marked as a cache hit.
+
+Usage:
+    @coalesce
+    def search_by_assignee(company, limit=50): ...
+
+    results = search_by_assignee("Allegion")                  # threads
+    results = await search_by_assignee.aio("Allegion")        # asyncio
+"""
+import contextvars
+import copy
+import functools
+import inspect
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable
+
+from tools.metrics import trace
+
+
+class _Call:
+    """One in-flight fetch and the number of callers waiting on it."""
+
+    __slots__ = ("future", "waiters")
+
+    def __init__(self):
+        self.future: Future = Future()
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution.
+
+    Usage:
+        flights = SingleFlight()
+        result = flights.do(("assignee", "Allegion"), search, "Allegion")
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self.shared = 0
+
+    def _join(self, key: Hashable) -> tuple[_Call, bool]:
+        """Join the in-flight call for key, or start one (returns leader flag)."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.shared += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            return call, True
+
+    def _run(self, key: Hashable, call: _Call, fn: Callable, args: tuple, kwargs: dict) -> Any:
+        """Execute fn as the leader and publish its outcome to waiters."""
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                del self._calls[key]
+            call.future.set_exception(e)
+            raise
+        with self._lock:
+            del self._calls[key]
+            waiters = call.waiters
+        # Waiters copy from a private snapshot the leader's caller never sees
+        call.future.set_result(copy.deepcopy(result) if waiters else None)
+        return result
+
+    @staticmethod
+    def _shared_result(key: Hashable, snapshot: Any) -> Any:
+        with trace("single_flight", repr(key)) as span:
+            span.cache_hit = True
+            result = copy.deepcopy(snapshot)
+            span.rows = len(result) if isinstance(result, list) else int(result is not None)
+        return result
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """Call fn(*args, **kwargs), sharing the result with concurrent calls for key.
+
+        Args:
+            key: Hashable identity of the call
+            fn: Function to execute
+            *args, **kwargs: Arguments for fn
+
+        Returns:
+            fn's result (waiting callers get a deep copy)
+
+        Raises:
+            Whatever fn raised, in the leader and every waiter
+        """
+        call, leader = self._join(key)
+        if leader:
+            return self._run(key, call, fn, args, kwargs)
+        return self._shared_result(key, call.future.result())
+
+    async def do_async(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """Asyncio version of do(); fn runs in the default executor."""
+        import asyncio  # deferred: asyncio is slow to import and most callers are sync
+
+        call, leader = self._join(key)
+        if leader:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                None,
+                functools.partial(contextvars.copy_context().run, self._run, key, call, fn, args, kwargs),
+            )
+        return self._shared_result(key, await asyncio.wrap_future(call.future))
+
+
+_flights = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Get the process-wide SingleFlight used by @coalesce functions."""
+    return _flights
+
+
+def coalesce(fn: Callable) -> Callable:
+    """Decorate a function so concurrent identical calls share one execution.
+
+    The wrapped function gains an aio(...) coroutine for asyncio callers.
+    Calls with unhashable arguments are not coalesced.
+    """
+    signature = inspect.signature(fn)
+
+    def key_for(args: tuple, kwargs: dict) -> Hashable:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (fn.__module__, fn.__qualname__, tuple(bound.arguments.items()))
+        hash(key)
+        return key
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            key = key_for(args, kwargs)
+        except TypeError:
+            return fn(*args, **kwargs)
+        return _flights.do(key, fn, *args, **kwargs)
+
+    async def aio(*args, **kwargs):
+        import asyncio
+
+        try:
+            key = key_for(args, kwargs)
+        except TypeError:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+            )
+        return await _flights.do_async(key, fn, *args, **kwargs)
+
+    wrapper.aio = aio
+    return wrapper
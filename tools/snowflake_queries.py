@@ -2,18 +2,26 @@
 
 This module provides functions to generate Snowflake SQL queries for:
 - Patent search (by assignee or title)
-- Upserting patent records
-- Analyzing filing trends
+- Upserting patent records (or inserting definitely-new ones)
+- Analyzing filing trends (via the incremental trend rollup)
 - Cache staleness checking
 """
 import json
 from datetime import datetime, timedelta
 from typing import Optional
 
+from tools.trend_rollup import ALL_BUCKET, resolve_bucket, trend_keys
+
 
 # Cache staleness threshold (days)
 CACHE_STALE_DAYS = 7
 
+# Pre-aggregated filing counts by (assignee, year, bucket)
+TREND_ROLLUP_TABLE = "SNOWFLAKE_LEARNING_DB.PATENT_INTELLIGENCE.PATENT_TREND_ROLLUP"
+
+# Which rollup keys each patent currently contributes to
+TREND_MEMBERS_TABLE = "SNOWFLAKE_LEARNING_DB.PATENT_INTELLIGENCE.PATENT_TREND_MEMBERS"
+
 
 def is_cache_stale(updated_at: Optional[datetime], days: int = CACHE_STALE_DAYS) -> bool:
     """Check if cached data is stale.
@@ -62,6 +70,24 @@ def build_snowflake_query(
         """
 
 
+def _source_select(patent_data: dict, search_query: str, category: str) -> str:
+    """Build the SELECT producing one PATENTS row from patent data."""
+    inventors_json = json.dumps(patent_data.get("inventors", []))
+    cpc_json = json.dumps(patent_data.get("cpc_codes", []))
+
+    return f"""SELECT
+            '{patent_data["patent_number"]}' AS patent_number,
+            '{patent_data["title"].replace("'", "''")}' AS title,
+            '{(patent_data.get("abstract") or "").replace("'", "''")}' AS abstract,
+            '{patent_data["assignee"]}' AS assignee,
+            PARSE_JSON('{inventors_json}') AS inventors,
+            '{patent_data["filing_date"]}' AS filing_date,
+            {f"'{patent_data['grant_date']}'" if patent_data.get("grant_date") else "NULL"} AS grant_date,
+            PARSE_JSON('{cpc_json}') AS cpc_codes,
+            '{search_query}' AS search_query,
+            '{category}' AS category"""
+
+
 def build_upsert_query(patent_data: dict, search_query: str, category: str) -> str:
     """Build Snowflake MERGE query to upsert patent data.
 
@@ -73,22 +99,9 @@ def build_upsert_query(patent_data: dict, search_query: str, category: str) -> s
     Returns:
         SQL MERGE statement
     """
-    inventors_json = json.dumps(patent_data.get("inventors", []))
-    cpc_json = json.dumps(patent_data.get("cpc_codes", []))
-
     return f"""
         MERGE INTO SNOWFLAKE_LEARNING_DB.PATENT_INTELLIGENCE.PATENTS AS target
-        USING (SELECT
-            '{patent_data["patent_number"]}' AS patent_number,
-            '{patent_data["title"].replace("'", "''")}' AS title,
-            '{(patent_data.get("abstract") or "").replace("'", "''")}' AS abstract,
-            '{patent_data["assignee"]}' AS assignee,
-            PARSE_JSON('{inventors_json}') AS inventors,
-            '{patent_data["filing_date"]}' AS filing_date,
-            {f"'{patent_data['grant_date']}'" if patent_data.get("grant_date") else "NULL"} AS grant_date,
-            PARSE_JSON('{cpc_json}') AS cpc_codes,
-            '{search_query}' AS search_query,
-            '{category}' AS category
+        USING ({_source_select(patent_data, search_query, category)}
         ) AS source
         ON target.patent_number = source.patent_number
         WHEN MATCHED THEN UPDATE SET
@@ -114,19 +127,190 @@ def build_upsert_query(patent_data: dict, search_query: str, category: str) -> s
     """
 
 
-def get_trends_query(years: int = 5, technology_filter: Optional[str] = None) -> str:
+def build_insert_query(patent_data: dict, search_query: str, category: str) -> str:
+    """Build Snowflake INSERT query for a patent known not to be cached yet.
+
+    Skips the MERGE's match against PATENTS; only use it when the patent is
+    definitely new (see tools.known_patents).
+
+    Args:
+        patent_data: Dictionary with patent fields
+        search_query: Original search query used to find this patent
+        category: Category label (e.g., "competitor", "technology")
+
+    Returns:
+        SQL INSERT statement
+    """
+    return f"""
+        INSERT INTO SNOWFLAKE_LEARNING_DB.PATENT_INTELLIGENCE.PATENTS (
+            patent_number, title, abstract, assignee, inventors,
+            filing_date, grant_date, cpc_codes, search_query, category,
+            created_at, updated_at
+        )
+        SELECT *, CURRENT_TIMESTAMP(), CURRENT_TIMESTAMP() FROM ({_source_select(patent_data, search_query, category)}
+        );
+    """
+
+
+def build_rollup_upsert_query(patent_data: dict) -> str:
+    """Build Snowflake SQL that applies one upserted patent to the trend rollup.
+
+    Decrements whatever keys the patent contributed before (from the members
+    table), increments its new keys, then replaces its membership rows. Run
+    alongside build_upsert_query() for the same patent.
+
+    Args:
+        patent_data: Dictionary with patent fields
+
+    Returns:
+        SQL statements (MERGE, DELETE, INSERT), or an empty string if the
+        patent has no filing date
+    """
+    keys = trend_keys(patent_data)
+    if not keys:
+        return ""
+
+    patent_number = patent_data["patent_number"]
+    rows = []
+    for assignee, year, bucket in keys:
+        assignee = assignee.replace("'", "''")
+        bucket = bucket.replace("'", "''")
+        rows.append(f"('{assignee}', {year}, '{bucket}')")
+    values = ",\n                ".join(rows)
+
+    return f"""
+        MERGE INTO {TREND_ROLLUP_TABLE} AS target
+        USING (
+            SELECT assignee, year, bucket, SUM(delta) AS delta FROM (
+                SELECT assignee, year, bucket, -1 AS delta
+                FROM {TREND_MEMBERS_TABLE}
+                WHERE patent_number = '{patent_number}'
+                UNION ALL
+                SELECT column1, column2, column3, 1 FROM VALUES
+                {values}
+            )
+            GROUP BY assignee, year, bucket
+        ) AS source
+        ON target.assignee = source.assignee
+            AND target.year = source.year
+            AND target.bucket = source.bucket
+        WHEN MATCHED THEN UPDATE SET
+            patent_count = target.patent_count + source.delta,
+            updated_at = CURRENT_TIMESTAMP()
+        WHEN NOT MATCHED AND source.delta > 0 THEN INSERT (
+            assignee, year, bucket, patent_count, updated_at
+        ) VALUES (
+            source.assignee, source.year, source.bucket, source.delta, CURRENT_TIMESTAMP()
+        );
+        DELETE FROM {TREND_MEMBERS_TABLE} WHERE patent_number = '{patent_number}';
+        INSERT INTO {TREND_MEMBERS_TABLE} (patent_number, assignee, year, bucket)
+        SELECT '{patent_number}', column1, column2, column3 FROM VALUES
+                {values};
+    """
+
+
+def build_rollup_backfill_query(technologies: Optional[list[str]] = None) -> str:
+    """Build Snowflake SQL that backfills the trend rollup from existing PATENTS rows.
+
+    Patents upserted before the rollup existed have no membership rows, so
+    rollup trends would undercount them. This adds membership rows for
+    every patent that lacks them (same keys as trend_keys()), then
+    recomputes the rollup from the membership table. Safe to re-run.
+
+    Args:
+        technologies: Keywords to bucket by (default: tools.TECHNOLOGIES)
+
+    Returns:
+        SQL statements (INSERT, INSERT OVERWRITE)
+    """
+    if technologies is None:
+        from tools import TECHNOLOGIES
+        technologies = TECHNOLOGIES
+
+    escaped = [keyword.lower().replace("'", "''") for keyword in technologies]
+    keywords = ",\n                ".join(f"('{keyword}')" for keyword in escaped)
+    cpc_pattern = r"^([A-HY][0-9]{2}[A-Z])\\s*([0-9]+)"
+
+    return f"""
+        INSERT INTO {TREND_MEMBERS_TABLE} (patent_number, assignee, year, bucket)
+        WITH pending AS (
+            SELECT
+                p.patent_number,
+                COALESCE(NULLIF(p.assignee, ''), 'Unknown') AS assignee,
+                YEAR(p.filing_date) AS year,
+                p.cpc_codes,
+                LOWER(COALESCE(p.title, '') || ' ' || COALESCE(p.abstract, '')) AS text
+            FROM SNOWFLAKE_LEARNING_DB.PATENT_INTELLIGENCE.PATENTS p
+            WHERE p.filing_date IS NOT NULL
+                AND NOT EXISTS (
+                    SELECT 1 FROM {TREND_MEMBERS_TABLE} m
+                    WHERE m.patent_number = p.patent_number
+                )
+        )
+        SELECT patent_number, assignee, year, '{ALL_BUCKET}' FROM pending
+        UNION
+        SELECT patent_number, assignee, year,
+            'cpc:' || REGEXP_SUBSTR(UPPER(TRIM(c.value::STRING)), '{cpc_pattern}', 1, 1, 'e', 1)
+                || REGEXP_SUBSTR(UPPER(TRIM(c.value::STRING)), '{cpc_pattern}', 1, 1, 'e', 2)
+        FROM pending, LATERAL FLATTEN(input => pending.cpc_codes) c
+        WHERE REGEXP_LIKE(UPPER(TRIM(c.value::STRING)), '{cpc_pattern}.*')
+        UNION
+        SELECT patent_number, assignee, year, 'tech:' || k.column1
+        FROM pending, (SELECT column1 FROM VALUES
+                {keywords}) k
+        WHERE CONTAINS(pending.text, k.column1);
+        INSERT OVERWRITE INTO {TREND_ROLLUP_TABLE} (assignee, year, bucket, patent_count, updated_at)
+        SELECT assignee, year, bucket, COUNT(*), CURRENT_TIMESTAMP()
+        FROM {TREND_MEMBERS_TABLE}
+        GROUP BY assignee, year, bucket;
+    """
+
+
+def get_trends_query(
+    years: int = 5,
+    technology_filter: Optional[str] = None,
+    cpc_filter: Optional[str] = None,
+    use_rollup: bool = True
+) -> str:
     """Generate Snowflake query for patent filing trends.
 
+    Reads from the pre-aggregated trend rollup when the filter maps to a
+    rollup bucket (no filter, a TECHNOLOGIES keyword, or a CPC group).
+    Other free-text filters fall back to scanning the PATENTS table.
+
+    The rollup counts whole calendar years, so a rollup query covers the
+    current year and the years - 1 before it; the scan covers the rolling
+    years back from today, which also reaches into the year before those.
+
     Args:
         years: Number of years to analyze
         technology_filter: Optional technology keyword filter
+        cpc_filter: Optional CPC code/group filter (e.g., "E05B47")
+        use_rollup: If False, always scan the PATENTS table
 
     Returns:
         SQL query string
     """
+    bucket = resolve_bucket(technology_filter, cpc_filter) if use_rollup else None
+
+    if bucket is not None:
+        return f"""
+        SELECT
+            assignee,
+            year,
+            patent_count
+        FROM {TREND_ROLLUP_TABLE}
+        WHERE bucket = '{bucket}'
+            AND year > YEAR(CURRENT_DATE()) - {years}
+            AND patent_count > 0
+        ORDER BY year DESC, patent_count DESC;
+    """
+
     tech_clause = ""
     if technology_filter:
         tech_clause = f"AND (title ILIKE '%{technology_filter}%' OR abstract ILIKE '%{technology_filter}%')"
+    if cpc_filter:
+        tech_clause += f"\n        AND ARRAY_TO_STRING(cpc_codes, ',') ILIKE '%{cpc_filter}%'"
 
     return f"""
         SELECT
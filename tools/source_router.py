@@ -0,0 +1,245 @@
+"""Latency- and cost-aware routing across patent data sources.
+
+search_by_assignee, search_by_title and get_patent ask the router which
+sources to try, in order, for their query type. The router ranks the
+candidate sources from live statistics:
+
+- latency and failure rate per (query type, source), observed by the
+  searches themselves (a failure is an error; an empty answer is a success)
+- cache coverage per source (share of spans served from a cache, e.g.
+  session replay), from the process-wide metrics registry
+- cost per call: USPTO ODP and Google Patents are free. BigQuery is not
+  a candidate: without a CPC filter an assignee query scans the whole
+  publications table, so search_by_cpc remains the BigQuery entry point
+
+Sources without enough observations use prior latencies. Policies:
+
+    static               USPTO -> Google Patents (the original fallback chain)
+    fastest              lowest expected time to a successful answer
+    cheapest_within_sla  cheapest source whose p95 latency and failure rate
+                         meet the SLA; the rest follow, fastest first
+
+The policy comes from PATENT_AGENT_ROUTE_POLICY (default "static").
+
+Sample data is a demo fallback only: with PATENT_AGENT_MODE=production a
+search that no source can answer returns [] with an error message instead
+of SAMPLE_PATENTS.
+
+Usage:
+    router = get_router()
+    router.set_policy("cheapest_within_sla", sla_seconds=2.0)
+    router.order("assignee")       # e.g. ["google_patents", "uspto"]
+    router.explain("assignee")     # stats behind the ranking
+"""
+import os
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from tools.metrics import get_registry
+
+
+# Environment variables selecting the routing policy and run mode
+ROUTE_POLICY_ENV_VAR = "PATENT_AGENT_ROUTE_POLICY"
+MODE_ENV_VAR = "PATENT_AGENT_MODE"
+
+ROUTE_POLICIES = ("static", "fastest", "cheapest_within_sla")
+
+# Default SLA for cheapest_within_sla
+DEFAULT_SLA_SECONDS = 5.0
+DEFAULT_MAX_FAILURE_RATE = 0.5
+
+# Observations needed before live stats replace the priors
+MIN_OBSERVATIONS = 3
+
+# Weight of the newest latency observation in the moving average
+LATENCY_EWMA_ALPHA = 0.3
+
+
+@dataclass(frozen=True)
+class SourceProfile:
+    """Static facts about a source.
+
+    Attributes:
+        name: Source name (matches the metrics span source)
+        prior_latency: Assumed latency in seconds before any observation
+        cost_per_call: Estimated USD per call
+    """
+
+    name: str
+    prior_latency: float
+    cost_per_call: float = 0.0
+
+
+SOURCES = {
+    "uspto": SourceProfile("uspto", 1.0),
+    "google_patents": SourceProfile("google_patents", 2.0),
+}
+
+# Candidate sources per query type, in static (legacy) order
+ROUTES = {
+    "assignee": ("uspto", "google_patents"),
+    "title": ("uspto", "google_patents"),
+    "patent": ("uspto", "google_patents"),
+}
+
+# Sources the static policy uses per query type
+STATIC_ROUTES = {
+    "assignee": ("uspto", "google_patents"),
+    "title": ("uspto", "google_patents"),
+    "patent": ("uspto", "google_patents"),
+}
+
+
+def production_mode() -> bool:
+    """Check whether sample-data fallbacks are disabled (PATENT_AGENT_MODE=production)."""
+    return os.environ.get(MODE_ENV_VAR, "").strip().lower() == "production"
+
+
+class _RouteStats:
+    """Latency and failure observations for one (query type, source)."""
+
+    __slots__ = ("calls", "failures", "latency", "latency_max")
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.latency = 0.0
+        self.latency_max = 0.0
+
+    def add(self, latency: float, ok: bool) -> None:
+        self.latency = latency if not self.calls else (
+            LATENCY_EWMA_ALPHA * latency + (1 - LATENCY_EWMA_ALPHA) * self.latency
+        )
+        self.latency_max = max(self.latency_max, latency)
+        self.calls += 1
+        self.failures += not ok
+
+
+class SourceRouter:
+    """Orders data sources per query type from live stats and a policy.
+
+    Usage:
+        router = SourceRouter(policy="fastest")
+        for source in router.order("title"):
+            ...
+            router.observe("title", source, latency, ok=bool(results))
+    """
+
+    def __init__(
+        self,
+        policy: Optional[str] = None,
+        sla_seconds: float = DEFAULT_SLA_SECONDS,
+        max_failure_rate: float = DEFAULT_MAX_FAILURE_RATE
+    ):
+        """Initialize a router.
+
+        Args:
+            policy: One of ROUTE_POLICIES (default: PATENT_AGENT_ROUTE_POLICY or "static")
+            sla_seconds: Latency SLA for cheapest_within_sla
+            max_failure_rate: Highest failure rate that still meets the SLA
+        """
+        self._lock = threading.Lock()
+        self._stats: dict[tuple[str, str], _RouteStats] = {}
+        self.set_policy(policy or os.environ.get(ROUTE_POLICY_ENV_VAR) or "static",
+                        sla_seconds, max_failure_rate)
+
+    def set_policy(
+        self,
+        policy: str,
+        sla_seconds: Optional[float] = None,
+        max_failure_rate: Optional[float] = None
+    ) -> None:
+        """Change the routing policy (and optionally the SLA)."""
+        if policy not in ROUTE_POLICIES:
+            raise ValueError(f"Unknown route policy: {policy} (expected one of {ROUTE_POLICIES})")
+        self.policy = policy
+        if sla_seconds is not None:
+            self.sla_seconds = sla_seconds
+        if max_failure_rate is not None:
+            self.max_failure_rate = max_failure_rate
+
+    def observe(self, query_type: str, source: str, latency: float, ok: bool) -> None:
+        """Record the outcome of one source call.
+
+        Args:
+            query_type: Query type (see ROUTES)
+            source: Source name
+            latency: Seconds the call took
+            ok: False if the call failed (an empty answer is ok)
+        """
+        with self._lock:
+            self._stats.setdefault((query_type, source), _RouteStats()).add(latency, ok)
+
+    def reset(self) -> None:
+        """Forget all observations."""
+        with self._lock:
+            self._stats.clear()
+
+    def source_stats(self, query_type: str, source: str) -> dict:
+        """Get the stats the ranking uses for one source.
+
+        Returns:
+            Dictionary with calls, latency, latency_p95, failure_rate,
+            cache_hit_rate, cost_per_call and meets_sla
+        """
+        profile = SOURCES[source]
+        with self._lock:
+            stats = self._stats.get((query_type, source))
+            calls = stats.calls if stats else 0
+            observed = calls >= MIN_OBSERVATIONS
+            latency = stats.latency if observed else profile.prior_latency
+            failure_rate = stats.failures / calls if observed else 0.0
+
+        metrics = get_registry().summary().get(source, {})
+        cache_hit_rate = metrics["cache_hits"] / metrics["calls"] if metrics.get("calls") else 0.0
+        latency_p95 = metrics.get("latency_p95", latency) if observed else latency
+
+        return {
+            "source": source,
+            "calls": calls,
+            "latency": round(latency, 6),
+            "latency_p95": latency_p95,
+            "failure_rate": round(failure_rate, 4),
+            "cache_hit_rate": round(cache_hit_rate, 4),
+            # Cached responses cost nothing
+            "cost_per_call": round(profile.cost_per_call * (1 - cache_hit_rate), 6),
+            "meets_sla": latency_p95 <= self.sla_seconds and failure_rate <= self.max_failure_rate,
+        }
+
+    def order(self, query_type: str) -> list[str]:
+        """Get the sources to try for a query type, best first."""
+        if query_type not in ROUTES:
+            raise ValueError(f"Unknown query type: {query_type}")
+        if self.policy == "static":
+            return list(STATIC_ROUTES[query_type])
+
+        stats = [self.source_stats(query_type, source) for source in ROUTES[query_type]]
+
+        def expected_time(s: dict) -> float:
+            # Expected seconds to a successful answer, retrying the same source
+            return s["latency"] / max(1.0 - s["failure_rate"], 0.05)
+
+        if self.policy == "fastest":
+            ranked = sorted(stats, key=expected_time)
+        else:
+            meeting = sorted((s for s in stats if s["meets_sla"]),
+                             key=lambda s: (s["cost_per_call"], expected_time(s)))
+            missing = sorted((s for s in stats if not s["meets_sla"]), key=expected_time)
+            ranked = meeting + missing
+        return [s["source"] for s in ranked]
+
+    def explain(self, query_type: str) -> list[dict]:
+        """Get per-source stats in routing order (for debugging a policy)."""
+        return [self.source_stats(query_type, source) for source in self.order(query_type)]
+
+
+_router: Optional[SourceRouter] = None
+
+
+def get_router() -> SourceRouter:
+    """Get the shared router used by the search functions."""
+    global _router
+    if _router is None:
+        _router = SourceRouter()
+    return _router
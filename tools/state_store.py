@@ -0,0 +1,455 @@
+"""Append-only keyed store for workflow state.
+
+workflow_state.json keeps every named result (e.g. "recent_smart_locks")
+in one JSON document, so any update reads, parses and rewrites all of it.
+StateStore keeps the same states as an append-only log in SQLite instead:
+
+- Every write appends one row per changed entry, keyed by (state, key).
+  List states are keyed by patent number, dict states by their keys, so
+  an update costs O(change), not O(total state).
+- Reads take the newest row per key; a point lookup is one index probe.
+- Replacing or deleting a whole state starts a new generation instead of
+  touching its old rows.
+- compact() drops superseded rows, tombstones and old generations. It also
+  runs automatically once enough writes have accumulated and the log is
+  mostly garbage.
+
+State kinds mirror the JSON values: "list" (patent lists), "dict" and
+"value" (anything else, stored whole).
+
+State lives in SQLite:
+
+    data/workflow_state.db
+
+Usage:
+    store = StateStore()
+    store.import_json("workflow_state.json")              # one-time migration
+    store.append("recent_smart_locks", new_patents)      # upsert by patent number
+    store.get("recent_smart_locks", "US20250362098A1")   # point lookup
+    store.put("tech_keywords", "biometric", 3)
+    store.load("recent_smart_locks")                     # list, as in the JSON
+    store.compact()
+
+    python -m tools.state_store import workflow_state.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+from typing import Any, Iterable, Iterator, Optional
+
+
+# Default location of the state store and of the legacy JSON state
+DEFAULT_STATE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "workflow_state.db"
+)
+DEFAULT_WORKFLOW_STATE_JSON = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "workflow_state.json"
+)
+
+STATE_KINDS = ("list", "dict", "value")
+
+# Writes between automatic compaction checks
+COMPACT_CHECK_INTERVAL = 10_000
+
+# Compact automatically when the log holds more than this many rows per live entry
+COMPACT_GARBAGE_RATIO = 2.0
+
+# Key of the single entry of a "value" state
+_VALUE_KEY = ""
+
+# Prefix of the content-hash keys of list entries without a patent number
+_HASH_KEY_PREFIX = "sha1:"
+
+_NEWEST = (
+    "SELECT value, deleted FROM state_log"
+    " WHERE state = ? AND generation = ? AND key = ? ORDER BY seq DESC LIMIT 1"
+)
+
+# Keeps the ordinal of an existing key so updates don't reorder list states
+_INSERT = (
+    "INSERT INTO state_log (state, generation, key, ordinal, value, deleted) VALUES ("
+    " ?1, ?2, ?3,"
+    " COALESCE((SELECT ordinal FROM state_log WHERE state = ?1 AND generation = ?2 AND key = ?3"
+    "           ORDER BY seq DESC LIMIT 1),"
+    "          (SELECT IFNULL(MAX(seq), 0) + 1 FROM state_log)),"
+    " ?4, ?5)"
+)
+
+
+def patent_key(patent: dict) -> str:
+    """Get the key of a patent in a list state.
+
+    Patents without a number (some USPTO application results) are keyed by
+    a hash of their content.
+    """
+    number = patent.get("patent_number") if isinstance(patent, dict) else None
+    if number:
+        return str(number)
+    text = json.dumps(patent, sort_keys=True, default=str)
+    return _HASH_KEY_PREFIX + hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def _list_entries(values: list) -> list[tuple[str, Any]]:
+    """Key the entries of a whole list state.
+
+    Repeats of an entry without a patent number get their position appended
+    to the content-hash key, so replacing a list never drops them.
+    """
+    entries = []
+    seen = set()
+    for position, value in enumerate(values):
+        key = patent_key(value)
+        if key in seen and key.startswith(_HASH_KEY_PREFIX):
+            key = f"{key}#{position}"
+        seen.add(key)
+        entries.append((key, value))
+    return entries
+
+
+class StateStore:
+    """Keyed workflow state in an append-only SQLite log.
+
+    Usage:
+        store = StateStore(":memory:")
+        store.append("allegion_recent", patents)
+        store.load("allegion_recent")
+    """
+
+    def __init__(self, path: str = DEFAULT_STATE_PATH):
+        """Open (or create) the state store.
+
+        Args:
+            path: SQLite database path (":memory:" for tests)
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        if path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS states (
+                name TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                generation INTEGER NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS state_log (
+                seq INTEGER PRIMARY KEY,
+                state TEXT NOT NULL,
+                generation INTEGER NOT NULL,
+                key TEXT NOT NULL,
+                ordinal INTEGER NOT NULL,
+                value TEXT,
+                deleted INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS state_log_key ON state_log (state, generation, key, seq);
+        """)
+        self.conn.commit()
+        self._writes = 0
+
+    # -- State metadata -------------------------------------------------
+
+    def _state(self, name: str) -> Optional[tuple[str, int]]:
+        """Get (kind, generation) of a state, or None if it doesn't exist."""
+        return self.conn.execute(
+            "SELECT kind, generation FROM states WHERE name = ?", (name,)
+        ).fetchone()
+
+    def _new_generation(self, name: str, kind: str) -> int:
+        """Start a new, empty generation of a state (old rows become garbage)."""
+        # Above every generation still in the log, so rows of a deleted
+        # state can't reappear before they are compacted away
+        generation = self.conn.execute(
+            "SELECT MAX(g) FROM (SELECT MAX(generation) AS g FROM state_log"
+            " UNION ALL SELECT MAX(generation) FROM states)"
+        ).fetchone()[0] or 0
+        self.conn.execute(
+            "INSERT OR REPLACE INTO states (name, kind, generation, updated_at) VALUES (?, ?, ?, ?)",
+            (name, kind, generation + 1, datetime.utcnow().isoformat()),
+        )
+        return generation + 1
+
+    def _writable(self, name: str, kind: str) -> int:
+        """Get the generation to write to, creating the state if needed.
+
+        Raises:
+            ValueError: If the state exists with a different kind
+        """
+        state = self._state(name)
+        if state is None:
+            return self._new_generation(name, kind)
+        if state[0] != kind:
+            raise ValueError(f"State {name!r} is a {state[0]} state, not a {kind} state")
+        self.conn.execute(
+            "UPDATE states SET updated_at = ? WHERE name = ?", (datetime.utcnow().isoformat(), name)
+        )
+        return state[1]
+
+    def states(self) -> dict[str, str]:
+        """Get every state name and its kind."""
+        return dict(self.conn.execute("SELECT name, kind FROM states ORDER BY name"))
+
+    # -- Writes ----------------------------------------------------------
+
+    def _write(self, name: str, generation: int, entries: Iterable[tuple[str, Any]], deleted: int = 0) -> int:
+        """Append log rows for (key, value) entries and commit."""
+        rows = [
+            (name, generation, key, None if deleted else json.dumps(value, default=str), deleted)
+            for key, value in entries
+        ]
+        self.conn.executemany(_INSERT, rows)
+        self.conn.commit()
+        self._writes += len(rows)
+        if self._writes >= COMPACT_CHECK_INTERVAL:
+            self._writes = 0
+            self.maybe_compact()
+        return len(rows)
+
+    def append(self, name: str, patents: Iterable[dict]) -> int:
+        """Add patents to a list state, replacing entries with the same number.
+
+        Args:
+            name: State name (created as a list state if missing)
+            patents: Patents to add or update
+
+        Returns:
+            Number of entries written
+        """
+        generation = self._writable(name, "list")
+        return self._write(name, generation, ((patent_key(p), p) for p in patents))
+
+    def put(self, name: str, key: str, value: Any) -> None:
+        """Set one entry of a dict state (or replace one patent of a list state).
+
+        Args:
+            name: State name (created as a dict state if missing)
+            key: Entry key (patent number for list states)
+            value: JSON-serializable value
+        """
+        state = self._state(name)
+        kind = state[0] if state and state[0] == "list" else "dict"
+        self._write(name, self._writable(name, kind), [(str(key), value)])
+
+    def update(self, name: str, values: dict) -> int:
+        """Set several entries of a dict state.
+
+        Returns:
+            Number of entries written
+        """
+        generation = self._writable(name, "dict")
+        return self._write(name, generation, ((str(k), v) for k, v in values.items()))
+
+    def remove(self, name: str, key: str) -> bool:
+        """Remove one entry (appends a tombstone).
+
+        Returns:
+            True if the entry existed
+        """
+        state = self._state(name)
+        if state is None or self._newest(name, state[1], str(key)) is None:
+            return False
+        self._write(name, state[1], [(str(key), None)], deleted=1)
+        return True
+
+    def set(self, name: str, value: Any) -> int:
+        """Replace a whole state.
+
+        Lists become list states, dicts dict states and anything else a
+        value state. Costs O(size of value); prefer append() or put() for
+        incremental changes.
+
+        List entries sharing a patent number are one entry (the last value,
+        at the first position), as with append(). Repeated entries without
+        a patent number are all kept.
+
+        Returns:
+            Number of entries stored
+        """
+        if isinstance(value, list):
+            kind, entries = "list", _list_entries(value)
+        elif isinstance(value, dict):
+            kind, entries = "dict", [(str(k), v) for k, v in value.items()]
+        else:
+            kind, entries = "value", [(_VALUE_KEY, value)]
+        generation = self._new_generation(name, kind)
+        self._write(name, generation, entries)
+        return len({key for key, _ in entries})
+
+    def delete(self, name: str) -> bool:
+        """Delete a whole state (its rows are dropped by the next compaction).
+
+        Returns:
+            True if the state existed
+        """
+        deleted = self.conn.execute("DELETE FROM states WHERE name = ?", (name,)).rowcount
+        self.conn.commit()
+        return bool(deleted)
+
+    # -- Reads -----------------------------------------------------------
+
+    def _newest(self, name: str, generation: int, key: str) -> Optional[str]:
+        """Get the newest JSON value of a key, or None if missing or removed."""
+        row = self.conn.execute(_NEWEST, (name, generation, key)).fetchone()
+        return None if row is None or row[1] else row[0]
+
+    def get(self, name: str, key: str = _VALUE_KEY, default: Any = None) -> Any:
+        """Look up one entry.
+
+        Args:
+            name: State name
+            key: Entry key (patent number for list states; omit for value states)
+            default: Returned if the state or entry doesn't exist
+
+        Returns:
+            The entry's value
+        """
+        state = self._state(name)
+        value = self._newest(name, state[1], str(key)) if state else None
+        return default if value is None else json.loads(value)
+
+    def items(self, name: str) -> Iterator[tuple[str, Any]]:
+        """Iterate over the live (key, value) entries of a state, in insertion order."""
+        state = self._state(name)
+        if state is None:
+            return
+        rows = self.conn.execute(
+            "SELECT key, value FROM state_log AS l"
+            " WHERE state = ? AND generation = ? AND deleted = 0"
+            " AND seq = (SELECT MAX(seq) FROM state_log"
+            "            WHERE state = l.state AND generation = l.generation AND key = l.key)"
+            " ORDER BY ordinal",
+            (name, state[1]),
+        )
+        for key, value in rows:
+            yield key, json.loads(value)
+
+    def load(self, name: str, default: Any = None) -> Any:
+        """Get a whole state as the list, dict or value it would be in the JSON."""
+        state = self._state(name)
+        if state is None:
+            return default
+        kind = state[0]
+        if kind == "list":
+            return [value for _, value in self.items(name)]
+        if kind == "dict":
+            return dict(self.items(name))
+        return self.get(name, default=default)
+
+    def to_dict(self) -> dict:
+        """Get every state, shaped like workflow_state.json."""
+        return {name: self.load(name) for name in self.states()}
+
+    # -- Import / export -------------------------------------------------
+
+    def import_json(self, path: str = DEFAULT_WORKFLOW_STATE_JSON) -> dict[str, int]:
+        """Import a workflow_state.json file, replacing states of the same name.
+
+        Args:
+            path: JSON file with one top-level key per state
+
+        Returns:
+            Dictionary mapping state name to number of entries imported
+            (list entries sharing a patent number count once)
+        """
+        with open(path) as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError(f"Expected a JSON object of states in {path}")
+        counts = {}
+        for name, value in data.items():
+            counts[name] = self.set(name, value)
+        print(f"[State store: imported {len(counts)} states from {path}]")
+        return counts
+
+    def export_json(self, path: str) -> None:
+        """Write every state to a workflow_state.json-style file."""
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+
+    # -- Compaction ------------------------------------------------------
+
+    def stats(self) -> dict:
+        """Get log size and live entry count."""
+        total = self.conn.execute("SELECT COUNT(*) FROM state_log").fetchone()[0]
+        live = self.conn.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM state_log AS l JOIN states AS s"
+            " ON s.name = l.state AND s.generation = l.generation GROUP BY l.state, l.key)"
+        ).fetchone()[0]
+        return {"states": len(self.states()), "log_rows": total, "live_keys": live}
+
+    def compact(self) -> int:
+        """Drop superseded rows, tombstones and rows of replaced or deleted states.
+
+        Returns:
+            Number of log rows removed
+        """
+        removed = self.conn.execute(
+            "DELETE FROM state_log WHERE seq NOT IN ("
+            " SELECT MAX(l.seq) FROM state_log AS l JOIN states AS s"
+            " ON s.name = l.state AND s.generation = l.generation"
+            " GROUP BY l.state, l.key)"
+        ).rowcount
+        removed += self.conn.execute("DELETE FROM state_log WHERE deleted = 1").rowcount
+        self.conn.commit()
+        return removed
+
+    def maybe_compact(self, ratio: float = COMPACT_GARBAGE_RATIO) -> int:
+        """Compact if the log holds more than ratio rows per live entry.
+
+        Returns:
+            Number of log rows removed (0 if not compacted)
+        """
+        stats = self.stats()
+        if stats["log_rows"] <= ratio * max(stats["live_keys"], 1):
+            return 0
+        return self.compact()
+
+    def close(self) -> None:
+        """Close the database."""
+        self.conn.close()
+
+
+_store: Optional[StateStore] = None
+
+
+def get_state_store() -> StateStore:
+    """Get the shared state store."""
+    global _store
+    if _store is None:
+        _store = StateStore()
+    return _store
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Manage the workflow state store")
+    parser.add_argument("command", choices=("import", "export", "compact", "stats"))
+    parser.add_argument("json_path", nargs="?", default=DEFAULT_WORKFLOW_STATE_JSON,
+                        help="workflow_state.json to import from or export to")
+    parser.add_argument("--db", default=DEFAULT_STATE_PATH, help="State store path")
+    args = parser.parse_args(argv)
+
+    store = StateStore(args.db)
+    try:
+        if args.command == "import":
+            store.import_json(args.json_path)
+        elif args.command == "export":
+            store.export_json(args.json_path)
+        elif args.command == "compact":
+            print(f"[State store: removed {store.compact()} log rows]")
+        else:
+            print(json.dumps(store.stats()))
+    except (ValueError, FileNotFoundError) as e:
+        print(f"[State store error: {e}]")
+        return 1
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,304 @@
+"""Incremental filing-trend rollups for patent data.
+
+Trend analysis used to scan the whole PATENTS table on every run. This module
+keeps a small pre-aggregated rollup of patent counts keyed by
+(assignee, filing year, bucket) that is updated as patents are upserted:
+
+- bucket "all": every patent
+- bucket "cpc:<group>": one per distinct CPC main group (e.g. "cpc:E05B47")
+- bucket "tech:<keyword>": one per TECHNOLOGIES keyword found in title/abstract
+
+The rollup size depends only on assignees x years x buckets, so trend
+queries cost the same no matter how many patents have been cached.
+
+A local SQLite copy mirrors the Snowflake PATENT_TREND_ROLLUP table so trends
+can be answered offline. A membership table records which keys each patent
+contributed to, so re-upserting a patent (e.g. a corrected assignee) moves its
+counts instead of double counting.
+
+Usage:
+    rollup = TrendRollup()
+    rollup.apply(patent)
+    rows = rollup.trends(years=5, technology_filter="smart lock")
+"""
+import os
+import re
+import sqlite3
+from datetime import date
+from typing import Optional
+
+
+# Default location of the local rollup copy
+DEFAULT_ROLLUP_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "trend_rollup.db"
+)
+
+# Bucket counting every patent regardless of technology
+ALL_BUCKET = "all"
+
+_CPC_GROUP_RE = re.compile(r"^([A-HY]\d{2}[A-Z])\s*(\d+)")
+
+
+def cpc_group(code: str) -> Optional[str]:
+    """Reduce a CPC code to its main group.
+
+    Handles the spacing variants returned by the different sources,
+    e.g. "E05B47/00", "E05B  47/0001" and "E05B47" all map to "E05B47".
+
+    Args:
+        code: CPC classification code
+
+    Returns:
+        Main group string or None if the code is not recognized
+    """
+    match = _CPC_GROUP_RE.match((code or "").strip().upper())
+    if not match:
+        return None
+    return f"{match.group(1)}{match.group(2)}"
+
+
+def technology_bucket(keyword: str) -> str:
+    """Get the rollup bucket name for a technology keyword."""
+    return f"tech:{keyword.strip().lower()}"
+
+
+def cpc_bucket(code: str) -> Optional[str]:
+    """Get the rollup bucket name for a CPC code or group."""
+    group = cpc_group(code)
+    return f"cpc:{group}" if group else None
+
+
+def filing_year(patent: dict) -> Optional[int]:
+    """Extract the filing year from a patent dict."""
+    filing_date = str(patent.get("filing_date") or "")
+    if len(filing_date) >= 4 and filing_date[:4].isdigit():
+        return int(filing_date[:4])
+    return None
+
+
+def trend_keys(patent: dict, technologies: Optional[list[str]] = None) -> list[tuple]:
+    """Compute the rollup keys a patent contributes to.
+
+    Args:
+        patent: Patent dictionary in the standardized format
+        technologies: Keywords to bucket by (default: tools.TECHNOLOGIES)
+
+    Returns:
+        List of (assignee, year, bucket) tuples, empty if the patent
+        has no usable filing date
+    """
+    year = filing_year(patent)
+    if year is None:
+        return []
+
+    if technologies is None:
+        from tools import TECHNOLOGIES
+        technologies = TECHNOLOGIES
+
+    assignee = patent.get("assignee") or "Unknown"
+    buckets = [ALL_BUCKET]
+
+    for code in patent.get("cpc_codes") or []:
+        bucket = cpc_bucket(code)
+        if bucket and bucket not in buckets:
+            buckets.append(bucket)
+
+    text = f"{patent.get('title') or ''} {patent.get('abstract') or ''}".lower()
+    for keyword in technologies:
+        if keyword.lower() in text:
+            bucket = technology_bucket(keyword)
+            if bucket not in buckets:
+                buckets.append(bucket)
+
+    return [(assignee, year, bucket) for bucket in buckets]
+
+
+def resolve_bucket(
+    technology_filter: Optional[str] = None,
+    cpc_filter: Optional[str] = None,
+    technologies: Optional[list[str]] = None
+) -> Optional[str]:
+    """Map trend filters onto a rollup bucket.
+
+    Args:
+        technology_filter: Technology keyword filter
+        cpc_filter: CPC code or group filter
+        technologies: Keywords that have buckets (default: tools.TECHNOLOGIES)
+
+    Returns:
+        Bucket name, or None if the filter has no pre-aggregated bucket
+        (callers should fall back to scanning the patents)
+    """
+    if cpc_filter:
+        return cpc_bucket(cpc_filter)
+    if not technology_filter:
+        return ALL_BUCKET
+
+    if technologies is None:
+        from tools import TECHNOLOGIES
+        technologies = TECHNOLOGIES
+
+    wanted = technology_filter.strip().strip('"').lower()
+    for keyword in technologies:
+        if keyword.lower() == wanted:
+            return technology_bucket(keyword)
+    return None
+
+
+class TrendRollup:
+    """Local SQLite copy of the filing-trend rollup.
+
+    Usage:
+        rollup = TrendRollup()
+        for patent in patents:
+            rollup.apply(patent)
+        rollup.trends(years=5)
+    """
+
+    def __init__(self, path: str = DEFAULT_ROLLUP_PATH):
+        """Open (or create) the local rollup database.
+
+        Args:
+            path: SQLite file path, or ":memory:" for a throwaway rollup
+        """
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS trend_rollup (
+                assignee TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                bucket TEXT NOT NULL,
+                patent_count INTEGER NOT NULL,
+                PRIMARY KEY (bucket, year, assignee)
+            );
+            CREATE TABLE IF NOT EXISTS trend_members (
+                patent_number TEXT NOT NULL,
+                assignee TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                bucket TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_trend_members_patent
+                ON trend_members (patent_number);
+        """)
+        self._conn.commit()
+
+    def apply(self, patent: dict, technologies: Optional[list[str]] = None) -> int:
+        """Apply one upserted patent to the rollup.
+
+        Any keys the patent contributed previously are decremented first,
+        so applying the same patent twice leaves counts unchanged.
+
+        Args:
+            patent: Patent dictionary in the standardized format
+            technologies: Keywords to bucket by (default: tools.TECHNOLOGIES)
+
+        Returns:
+            Number of rollup keys the patent now contributes to
+        """
+        patent_number = patent.get("patent_number")
+        if not patent_number:
+            return 0
+
+        keys = trend_keys(patent, technologies)
+        with self._conn:
+            old_keys = self._conn.execute(
+                "SELECT assignee, year, bucket FROM trend_members WHERE patent_number = ?",
+                (patent_number,),
+            ).fetchall()
+            for key in old_keys:
+                self._conn.execute(
+                    "UPDATE trend_rollup SET patent_count = patent_count - 1 "
+                    "WHERE assignee = ? AND year = ? AND bucket = ?",
+                    key,
+                )
+            self._conn.execute(
+                "DELETE FROM trend_members WHERE patent_number = ?", (patent_number,)
+            )
+            for assignee, year, bucket in keys:
+                self._conn.execute(
+                    "INSERT INTO trend_rollup (assignee, year, bucket, patent_count) "
+                    "VALUES (?, ?, ?, 1) ON CONFLICT (bucket, year, assignee) "
+                    "DO UPDATE SET patent_count = patent_count + 1",
+                    (assignee, year, bucket),
+                )
+                self._conn.execute(
+                    "INSERT INTO trend_members (patent_number, assignee, year, bucket) "
+                    "VALUES (?, ?, ?, ?)",
+                    (patent_number, assignee, year, bucket),
+                )
+            self._conn.execute("DELETE FROM trend_rollup WHERE patent_count <= 0")
+        return len(keys)
+
+    def rebuild(self, patents: list[dict], technologies: Optional[list[str]] = None) -> int:
+        """Rebuild the rollup from scratch from a full set of cached patents.
+
+        Args:
+            patents: All cached patent dictionaries
+            technologies: Keywords to bucket by (default: tools.TECHNOLOGIES)
+
+        Returns:
+            Number of patents applied
+        """
+        with self._conn:
+            self._conn.execute("DELETE FROM trend_rollup")
+            self._conn.execute("DELETE FROM trend_members")
+        count = 0
+        for patent in patents:
+            if self.apply(patent, technologies):
+                count += 1
+        return count
+
+    def trends(
+        self,
+        years: int = 5,
+        technology_filter: Optional[str] = None,
+        cpc_filter: Optional[str] = None,
+        current_year: Optional[int] = None
+    ) -> list[dict]:
+        """Get filing trends from the rollup.
+
+        Returns rows in the same shape as get_trends_query() output.
+
+        Args:
+            years: Number of calendar years to analyze, the current one included
+            technology_filter: Optional technology keyword (must be a TECHNOLOGIES entry)
+            cpc_filter: Optional CPC code or group
+            current_year: Override the current year (for testing)
+
+        Returns:
+            List of {"assignee", "year", "patent_count"} dicts, newest year first.
+            Empty if the filter has no rollup bucket.
+        """
+        bucket = resolve_bucket(technology_filter, cpc_filter)
+        if bucket is None:
+            print(f"[No trend rollup bucket for '{technology_filter or cpc_filter}']")
+            return []
+
+        min_year = (current_year or date.today().year) - years
+        rows = self._conn.execute(
+            "SELECT assignee, year, patent_count FROM trend_rollup "
+            "WHERE bucket = ? AND year > ? "
+            "ORDER BY year DESC, patent_count DESC",
+            (bucket, min_year),
+        ).fetchall()
+        return [
+            {"assignee": assignee, "year": year, "patent_count": patent_count}
+            for assignee, year, patent_count in rows
+        ]
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self._conn.close()
+
+
+_local_rollup: Optional[TrendRollup] = None
+
+
+def get_local_rollup() -> TrendRollup:
+    """Get the shared local rollup at DEFAULT_ROLLUP_PATH."""
+    global _local_rollup
+    if _local_rollup is None:
+        _local_rollup = TrendRollup()
+    return _local_rollup
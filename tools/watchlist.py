@@ -0,0 +1,399 @@
+"""Watchlist monitor for new competitor filings.
+
+A watch is any combination of competitor, technology keyword and CPC code,
+e.g. ("Allegion", "smart lock", None) or (None, None, "E05B47"). The monitor
+polls every watch periodically and records only patents it has not seen:
+
+- Delta queries: each watch keeps a cursor (latest publication date seen).
+  Publication dates only grow as patents arrive, whereas a patent filed
+  long ago can be published tomorrow, so a filing-date cursor would skip
+  it. CPC watches query BigQuery with publication_date >= cursor, oldest
+  first; keyword and competitor watches page USPTO results
+  newest-published first and stop at the cursor. Polling cost follows
+  the number of new publications, not the size of the portfolio.
+- A poll checks at most WATCH_MAX_RESULTS patents per query and never
+  moves a cursor past publications it did not check: CPC cursors stop at
+  the end of the checked window (the next poll continues from there),
+  keyword and competitor cursors stay put.
+- Failed searches skip the query's watches for that poll; they never
+  fall back to sample data or move a cursor.
+- Coalescing: watches sharing a CPC code, technology phrase or competitor
+  share one query per poll; each watch then filters the shared results.
+- The first poll of a watch records a baseline that is not reported as new.
+
+State lives in SQLite:
+
+    data/watchlist.db
+
+Usage:
+    monitor = WatchlistMonitor()
+    monitor.add_default_watches()             # COMPETITORS x TECHNOLOGIES
+    monitor.add_watch("assa-e05b47", competitor="ASSA ABLOY", cpc="E05B47")
+    new = monitor.poll()                      # {watch name: [new patents]}
+    monitor.run(interval=3600)                # poll forever
+"""
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional
+
+
+# Default location of the watchlist state
+DEFAULT_WATCHLIST_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "watchlist.db"
+)
+
+# Results per page when paging keyword/competitor searches
+WATCH_PAGE_SIZE = 100
+
+# Maximum results fetched per shared query in one poll
+WATCH_MAX_RESULTS = 1000
+
+
+@dataclass
+class Watch:
+    """One monitored (competitor, technology, CPC) combination.
+
+    Attributes:
+        name: Unique watch name
+        competitor: Assignee substring to match (case-insensitive)
+        technology: Keyword phrase to match in title or abstract
+        cpc: CPC code prefix to match (e.g., "E05B47")
+        cursor: Latest publication date seen (YYYY-MM-DD), None before the first poll
+    """
+
+    name: str
+    competitor: Optional[str] = None
+    technology: Optional[str] = None
+    cpc: Optional[str] = None
+    cursor: Optional[str] = None
+
+    def query_key(self) -> tuple[str, str]:
+        """Key of the shared query this watch is served by."""
+        if self.cpc:
+            return ("cpc", self.cpc)
+        if self.technology:
+            return ("title", self.technology)
+        return ("assignee", self.competitor or "")
+
+    def matches(self, patent: dict) -> bool:
+        """Check whether a patent from the shared query belongs to this watch."""
+        if self.competitor and self.competitor.lower() not in (patent.get("assignee") or "").lower():
+            return False
+        if self.technology:
+            text = f"{patent.get('title') or ''} {patent.get('abstract') or ''}".lower()
+            if self.technology.lower() not in text:
+                return False
+        if self.cpc:
+            prefix = self.cpc.replace(" ", "").upper()
+            codes = [c.replace(" ", "").upper() for c in patent.get("cpc_codes") or []]
+            if not any(code.startswith(prefix) for code in codes):
+                return False
+        return True
+
+
+class WatchlistMonitor:
+    """Polls watches with coalesced delta queries and records new patents.
+
+    Usage:
+        monitor = WatchlistMonitor(":memory:")
+        monitor.add_watch("allegion-smart-lock", competitor="Allegion", technology="smart lock")
+        monitor.poll()
+    """
+
+    def __init__(self, path: str = DEFAULT_WATCHLIST_PATH):
+        """Open (or create) the watchlist state.
+
+        Args:
+            path: SQLite database path (":memory:" for tests)
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS watches (
+                name TEXT PRIMARY KEY,
+                competitor TEXT,
+                technology TEXT,
+                cpc TEXT,
+                cursor TEXT,
+                polled_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS watch_hits (
+                watch TEXT NOT NULL,
+                patent_number TEXT NOT NULL,
+                filing_date TEXT,
+                found_at TEXT NOT NULL,
+                baseline INTEGER NOT NULL,
+                patent TEXT NOT NULL,
+                PRIMARY KEY (watch, patent_number)
+            );
+            CREATE INDEX IF NOT EXISTS watch_hits_found ON watch_hits (watch, baseline, found_at);
+        """)
+        self.conn.commit()
+
+    def add_watch(
+        self,
+        name: str,
+        competitor: Optional[str] = None,
+        technology: Optional[str] = None,
+        cpc: Optional[str] = None
+    ) -> Watch:
+        """Add (or update) a watch.
+
+        Args:
+            name: Unique watch name
+            competitor: Assignee substring to match
+            technology: Keyword phrase to match
+            cpc: CPC code prefix to match
+
+        Returns:
+            The watch
+        """
+        if not (competitor or technology or cpc):
+            raise ValueError("A watch needs a competitor, technology or CPC code")
+        self.conn.execute(
+            """
+            INSERT INTO watches (name, competitor, technology, cpc) VALUES (?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                competitor = excluded.competitor,
+                technology = excluded.technology,
+                cpc = excluded.cpc
+            """,
+            (name, competitor, technology, cpc),
+        )
+        self.conn.commit()
+        return Watch(name, competitor, technology, cpc)
+
+    def add_default_watches(self) -> list[Watch]:
+        """Add a watch for every tracked competitor and technology."""
+        from tools import COMPETITORS, TECHNOLOGIES
+
+        return [
+            self.add_watch(f"{company} / {tech}", competitor=company, technology=tech)
+            for company in COMPETITORS
+            for tech in TECHNOLOGIES
+        ]
+
+    def remove_watch(self, name: str) -> None:
+        """Remove a watch and its recorded patents."""
+        self.conn.execute("DELETE FROM watches WHERE name = ?", (name,))
+        self.conn.execute("DELETE FROM watch_hits WHERE watch = ?", (name,))
+        self.conn.commit()
+
+    def watches(self) -> list[Watch]:
+        """List all watches."""
+        rows = self.conn.execute(
+            "SELECT name, competitor, technology, cpc, cursor FROM watches ORDER BY name"
+        )
+        return [Watch(*row) for row in rows]
+
+    def poll(self) -> dict[str, list[dict]]:
+        """Poll every watch once.
+
+        Returns:
+            Dictionary mapping watch name to newly found patents (baseline
+            polls and watches without new patents are omitted)
+        """
+        groups: dict[tuple, list[Watch]] = {}
+        for watch in self.watches():
+            groups.setdefault(watch.query_key(), []).append(watch)
+
+        from tools.patent_search import SearchError
+
+        new: dict[str, list[dict]] = {}
+        for key, watches in groups.items():
+            cursors = [w.cursor for w in watches]
+            since = None if None in cursors else min(cursors)
+            try:
+                results, checked_through = self._fetch(key, watches, since)
+            except SearchError as e:
+                print(f"[Watchlist: {e} - skipped {len(watches)} watches this poll]")
+                continue
+            for watch in watches:
+                found = self._record(watch, results, checked_through)
+                if found:
+                    new[watch.name] = found
+
+        total = sum(len(found) for found in new.values())
+        print(f"[Watchlist: polled {len(groups)} queries for {sum(len(w) for w in groups.values())} "
+              f"watches, {total} new patents]")
+        return new
+
+    def _fetch(
+        self,
+        key: tuple[str, str],
+        watches: list[Watch],
+        since: Optional[str]
+    ) -> tuple[list[dict], Optional[str]]:
+        """Run one shared delta query.
+
+        Args:
+            key: Query key (kind, value)
+            watches: Watches served by this query
+            since: Earliest cursor among the watches (None = baseline poll)
+
+        Returns:
+            Patents published on or after since (or the newest page for a
+            baseline), and the publication date through which every
+            publication was checked (None if none were cut off at
+            WATCH_MAX_RESULTS)
+
+        Raises:
+            SearchError: If no source could answer
+        """
+        from tools.patent_search import search_by_assignee, search_by_cpc, search_by_title
+
+        kind, value = key
+        if kind == "cpc":
+            competitors = {w.competitor for w in watches}
+            assignee = competitors.pop() if len(competitors) == 1 else None
+            if since is None:
+                return search_by_cpc(value, WATCH_PAGE_SIZE, assignee_filter=assignee,
+                                     newest_first=True, strict=True), None
+            # One scan, oldest first; the extra row tells whether the window was cut off
+            results = search_by_cpc(
+                value,
+                WATCH_MAX_RESULTS + 1,
+                assignee_filter=assignee,
+                min_publication_date=since.replace("-", ""),
+                oldest_first=True,
+                strict=True,
+            )
+            if len(results) <= WATCH_MAX_RESULTS:
+                return results, None
+            results = results[:WATCH_MAX_RESULTS]
+            # Later publications on the last date may be cut off too; >= refetches them
+            checked_through = _arrival_date(results[-1])
+            print(f"[Watchlist: CPC {value} has over {WATCH_MAX_RESULTS} new patents since {since}, "
+                  f"checked through {checked_through}]")
+            return results, checked_through
+
+        search = search_by_title if kind == "title" else search_by_assignee
+        query = f'"{value}"' if kind == "title" else value
+        results = []
+        offset = 0
+        while True:
+            page = search(query, WATCH_PAGE_SIZE, offset, newest_first=True, strict=True)
+            fresh = [p for p in page if since is None or _arrival_date(p) >= since]
+            results.extend(fresh)
+            # Newest first: stop at the cursor, on a short page, or after a baseline page
+            if since is None or len(fresh) < len(page) or len(page) < WATCH_PAGE_SIZE:
+                return results, None
+            offset += WATCH_PAGE_SIZE
+            if offset >= WATCH_MAX_RESULTS:
+                # Newest first, so the unchecked publications are the oldest ones
+                print(f"[Watchlist: '{value}' has over {WATCH_MAX_RESULTS} new patents since {since}, "
+                      f"cursor kept - raise WATCH_MAX_RESULTS to check the rest]")
+                return results, since
+
+    def _record(
+        self,
+        watch: Watch,
+        results: list[dict],
+        checked_through: Optional[str] = None
+    ) -> list[dict]:
+        """Record a watch's unseen patents from shared results and advance its cursor.
+
+        Args:
+            watch: Watch served by the shared query
+            results: Shared query results
+            checked_through: If the results were cut off, the publication
+                date through which they are complete; the cursor never moves
+                past it, so unchecked publications are fetched by a later poll
+
+        Returns:
+            Newly found patents (empty for a baseline poll)
+        """
+        baseline = watch.cursor is None
+        now = datetime.utcnow().isoformat() + "Z"
+        cursor = watch.cursor
+        found = []
+        for patent in results:
+            arrival = _arrival_date(patent)
+            if arrival and (cursor is None or arrival > cursor):
+                cursor = arrival
+            if not patent.get("patent_number") or not watch.matches(patent):
+                continue
+            if watch.cursor and arrival < watch.cursor:
+                continue
+            inserted = self.conn.execute(
+                """
+                INSERT OR IGNORE INTO watch_hits
+                    (watch, patent_number, filing_date, found_at, baseline, patent)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (watch.name, patent["patent_number"], patent.get("filing_date") or "", now, int(baseline),
+                 json.dumps(patent, default=str)),
+            ).rowcount
+            if inserted and not baseline:
+                found.append(patent)
+
+        if checked_through is not None and cursor and cursor > checked_through:
+            cursor = max(checked_through, watch.cursor or checked_through)
+        self.conn.execute(
+            "UPDATE watches SET cursor = ?, polled_at = ? WHERE name = ?",
+            (cursor or datetime.utcnow().strftime("%Y-%m-%d"), now, watch.name),
+        )
+        self.conn.commit()
+        return found
+
+    def new_patents(self, name: str, since: Optional[str] = None) -> list[dict]:
+        """Get the new (non-baseline) patents recorded for a watch.
+
+        Args:
+            name: Watch name
+            since: Only patents found at or after this ISO timestamp
+
+        Returns:
+            Patent dictionaries, most recently found first
+        """
+        rows = self.conn.execute(
+            """
+            SELECT patent FROM watch_hits
+            WHERE watch = ? AND baseline = 0 AND found_at >= ?
+            ORDER BY found_at DESC, filing_date DESC
+            """,
+            (name, since or ""),
+        )
+        return [json.loads(row[0]) for row in rows]
+
+    def run(
+        self,
+        interval: float = 3600,
+        iterations: Optional[int] = None,
+        on_new: Optional[Callable[[dict[str, list[dict]]], None]] = None
+    ) -> None:
+        """Poll on a fixed schedule.
+
+        Args:
+            interval: Seconds between polls
+            iterations: Number of polls (None = forever)
+            on_new: Called with poll() results whenever new patents are found
+        """
+        count = 0
+        while iterations is None or count < iterations:
+            started = time.monotonic()
+            new = self.poll()
+            if new and on_new is not None:
+                on_new(new)
+            count += 1
+            if iterations is None or count < iterations:
+                time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self.conn.close()
+
+
+def _arrival_date(patent: dict) -> str:
+    """Date a patent became visible to searches (YYYY-MM-DD, "" if unknown).
+
+    The publication date where the source has one, else the grant or
+    filing date (sample data).
+    """
+    return patent.get("publication_date") or patent.get("grant_date") or patent.get("filing_date") or ""